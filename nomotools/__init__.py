@@ -0,0 +1,22 @@
+"""
+    __init__.py
+
+    Build tooling for the MyNomos nomogram scripts.  The scripts themselves
+    stay plain pynomo scripts; everything here loads their main_params and
+    renders them in bulk.
+
+    Copyright (C) 2026  Daniel Boulet
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
@@ -0,0 +1,290 @@
+"""
+    align.py
+
+    Block alignment planned on the tag graph.
+
+    pynomo's Nomo_Wrapper.align_blocks walks block_params pairwise in list
+    order and moves every block onto the first earlier block it shares a tag
+    with.  A block whose only partners come later in the list is left where
+    it is, and tags that link blocks a second time are never looked at.
+
+    AlignmentPlan indexes the tags of all axes once, keeps pynomo's choice of
+    partner (and of the 'dtag' pair for double alignment) wherever there is
+    one, attaches the remaining blocks through a later partner and orders
+    the steps so that every block is moved exactly once, after the block it
+    is aligned to.  Every tag is looked at once, so planning is linear in
+    the number of axes.  A tag that links two blocks already placed through
+    other tags closes a cycle: it is reported while planning, before any
+    block is moved, and how far its axes miss each other is checked once
+    the blocks are in place.
+
+        python -m nomotools.align true_vswr_lmr400.py   # print the plan
+
+    Copyright (C) 2026  Daniel Boulet
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+import argparse
+import sys
+import warnings
+
+TOLERANCE = 1e-6  # relative misfit of a tag link that counts as a conflict
+
+
+def _is_identity(atom):
+    """
+    True if the atom aligns its own u values without align_func or offsets,
+    so that aligning the other way round gives the same layout
+    """
+    p = atom.params
+    if p.get('align_x_offset', 0.0) or p.get('align_y_offset', 0.0):
+        return False
+    u_min, u_max = min(p['u_min'], p['u_max']), max(p['u_min'], p['u_max'])
+    try:
+        return all(abs(p['align_func'](u) - u) <= 1e-12 * (1.0 + abs(u))
+                   for u in [u_min, (u_min + u_max) / 2.0, u_max])
+    except Exception:
+        return False
+
+
+class Step:
+    """
+    block moved onto parent by tag: atom of block onto parent_atom and, for
+    a double alignment, d_atom onto d_parent_atom; reverse steps move an
+    earlier block onto a later one
+    """
+
+    def __init__(self, block, parent, atom, parent_atom, tag, d_atom=None, d_parent_atom=None,
+                 reverse=False):
+        self.block = block
+        self.parent = parent
+        self.atom = atom
+        self.parent_atom = parent_atom
+        self.tag = tag
+        self.d_atom = d_atom
+        self.d_parent_atom = d_parent_atom
+        self.reverse = reverse
+
+
+class AlignmentPlan:
+    """
+    order in which the blocks of a Nomo_Wrapper are aligned, found from
+    the 'tag' and 'dtag' of their axes
+    """
+
+    def __init__(self, blocks):
+        self.blocks = blocks
+        self.steps = []
+        self.links = []  # (earlier, later, atom, later atom, tag) closing a cycle
+        self.roots = []  # first block of every group of linked blocks
+        self.problems = []
+        self._plan()
+
+    def _plan(self):
+        n = len(self.blocks)
+        tags, dtags = {}, {}  # tag -> [(block number, atom)] in pynomo's loop order
+        first_atom = []  # per block, tag -> first atom carrying it
+        for b, block in enumerate(self.blocks):
+            own = {}
+            for atom in block.atom_stack:
+                tag, dtag = atom.params['tag'], atom.params['dtag']
+                if tag != 'none':
+                    if tag in own:
+                        self.problems.append("block %d has tag %r on more than one axis, "
+                                             "only the first one is aligned" % (b, tag))
+                    else:
+                        own[tag] = atom
+                        tags.setdefault(tag, []).append((b, atom))
+                if dtag != 'none':
+                    dtags.setdefault(dtag, []).append((b, atom))
+            first_atom.append(own)
+
+        # pynomo's partner: the first earlier block sharing a tag
+        parent = [None] * n
+        for j in range(1, n):
+            earlier = [tags[tag][0][0] for tag in first_atom[j] if tags[tag][0][0] < j]
+            if not earlier:
+                continue
+            i = min(earlier)
+            for atom in self.blocks[i].atom_stack:
+                tag = atom.params['tag']
+                if tag != 'none' and tag in first_atom[j] and first_atom[i].get(tag) is atom:
+                    parent[j] = Step(j, i, first_atom[j][tag], atom, tag)
+                    break
+            d_atom, d_parent_atom = self._double_partner(j, i, dtags)
+            parent[j].d_atom, parent[j].d_parent_atom = d_atom, d_parent_atom
+        for tag, dtag_atoms in dtags.items():
+            if len(set(b for b, atom in dtag_atoms)) < 2:
+                self.problems.append("dtag %r is used by block %d only" % (tag, dtag_atoms[0][0]))
+
+        # breadth first from every block without an earlier partner.  A block
+        # pynomo would leave where it is although a later block shares a tag
+        # with it is moved onto the first placed block carrying that tag;
+        # every tag is looked at once.
+        children = [[] for dummy in range(n)]
+        for j in range(n):
+            if parent[j] is not None:
+                children[parent[j].parent].append(j)
+        placed = [False] * n
+        scanned = set()
+        stuck = set()
+        for root in range(n):
+            if placed[root]:
+                continue
+            self.roots.append(root)
+            placed[root] = True
+            queue = [root]
+            for b in queue:
+                for tag, atom in first_atom[b].items():
+                    if tag in scanned:
+                        continue
+                    scanned.add(tag)
+                    for r, other in tags[tag]:
+                        if parent[r] is not None or placed[r]:
+                            continue
+                        if _is_identity(other) and _is_identity(atom):
+                            parent[r] = Step(r, b, other, atom, tag, reverse=True)
+                            children[b].append(r)
+                        else:
+                            stuck.add(r)
+                for child in children[b]:
+                    placed[child] = True
+                    self.steps.append(parent[child])
+                    queue.append(child)
+        for r in sorted(stuck):
+            if parent[r] is None:
+                self.problems.append("block %d shares tags only with later blocks that it cannot "
+                                     "be aligned to (align_func or offsets set)" % r)
+
+        # every other pair of blocks sharing a tag closes a cycle.  It only
+        # repeats a constraint if the steps joining the two blocks all go
+        # by that same tag, so that their axes of that tag already coincide;
+        # otherwise both blocks are placed by other tags before it is seen.
+        used = set((step.block, step.parent, step.tag) for step in self.steps)
+        same_tag = {}  # (tag, block) -> first block of the steps by tag leading to it
+        for step in self.steps:
+            same_tag[step.tag, step.block] = same_tag.get((step.tag, step.parent), step.parent)
+        for tag, tag_atoms in tags.items():
+            first, first_atom_of_tag = tag_atoms[0]
+            for b, atom in tag_atoms[1:]:
+                if (b, first, tag) in used or (first, b, tag) in used:
+                    continue
+                self.links.append((first, b, first_atom_of_tag, atom, tag))
+                if b in stuck and parent[b] is None or first in stuck and parent[first] is None:
+                    continue
+                if same_tag.get((tag, b), b) != same_tag.get((tag, first), first):
+                    self.problems.append("tag %r links blocks %d and %d, which other tags "
+                                         "already place: a cycle that may conflict"
+                                         % (tag, first, b))
+
+    def _double_partner(self, j, i, dtags):
+        """
+        dtag pair to align block j onto its parent block i with; only a
+        dtag of block i itself, which is placed before j
+        """
+        for d_atom in self.blocks[j].atom_stack:
+            dtag = d_atom.params['dtag']
+            if dtag == 'none':
+                continue
+            for b, other in dtags[dtag]:
+                if b == i:
+                    return d_atom, other
+        return None, None
+
+    def describe(self):
+        """
+        one line per step, link and problem
+        """
+        lines = []
+        for step in self.steps:
+            how = 'double aligned' if step.d_atom is not None else 'aligned'
+            lines.append("block %d %s to block %d by tag %r%s" %
+                         (step.block, how, step.parent, step.tag,
+                          ' (later block, list order reversed)' if step.reverse else ''))
+        for first, b, atom, other, tag in self.links:
+            lines.append("tag %r links blocks %d and %d again (cycle)" % (tag, first, b))
+        lines.extend(self.problems)
+        return lines
+
+    def misfits(self):
+        """
+        largest distance between the two axes of every cycle closing link,
+        relative to the size of the axes, after the blocks are aligned
+        """
+        result = []
+        for first, b, atom, other, tag in self.links:
+            p = other.params
+            u_start, u_stop = min(p['u_min'], p['u_max']), max(p['u_min'], p['u_max'])
+            worst = 0.0
+            points = []
+            for u in [u_start, (u_start + u_stop) / 2.0, u_stop]:
+                x, y = other.give_x(u), other.give_y(u)
+                xa = atom.give_x(p['align_func'](u)) + atom.params['align_x_offset']
+                ya = atom.give_y(p['align_func'](u)) + atom.params['align_y_offset']
+                worst = max(worst, ((x - xa) ** 2 + (y - ya) ** 2) ** 0.5)
+                points.append((x, y))
+            size = max(((points[0][0] - points[2][0]) ** 2 + (points[0][1] - points[2][1]) ** 2) ** 0.5,
+                       1e-12)
+            result.append((tag, first, b, worst / size))
+        return result
+
+
+def align_blocks(wrapper, plan=None):
+    """
+    Nomo_Wrapper.align_blocks following an AlignmentPlan; problems of the
+    plan and tag links that do not fit are reported as warnings
+    """
+    plan = plan or AlignmentPlan(wrapper.block_stack)
+    for problem in plan.problems:
+        warnings.warn(problem)
+    for step in plan.steps:
+        block = wrapper.block_stack[step.block]
+        if step.d_atom is not None:
+            trafo = wrapper._find_trafo_4_atoms_(step.parent_atom, step.d_parent_atom,
+                                                 step.atom, step.d_atom)
+        else:
+            trafo = wrapper._find_trafo_2_atoms_(step.parent_atom, step.atom)
+        block.add_transformation(*trafo)
+        block.aligned = True
+    # identity that the transformations of the paper fit change later
+    for block in wrapper.block_stack:
+        block.add_transformation()
+    for tag, first, b, misfit in plan.misfits():
+        if misfit > TOLERANCE:
+            warnings.warn("tag %r of blocks %d and %d does not line up after alignment "
+                          "(off by %.2g of the axis length)" % (tag, first, b, misfit))
+    return plan
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m nomotools.align',
+                                     description=__doc__.split('\n\n')[1].strip())
+    parser.add_argument('scripts', nargs='+')
+    args = parser.parse_args(argv)
+
+    from .loader import load_script
+    from .staged import StagedNomographer
+    for path in args.scripts:
+        nomo = StagedNomographer(dict(load_script(path).main_params), draw=False)
+        print(path)
+        for line in nomo.alignment.describe():
+            print('    ' + line)
+        for tag, first, b, misfit in nomo.alignment.misfits():
+            print('    tag %r of blocks %d and %d off by %.2g of the axis length' %
+                  (tag, first, b, misfit))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
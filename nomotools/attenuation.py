@@ -0,0 +1,105 @@
+"""
+    attenuation.py
+
+    Cable loss for whole arrays of feedline runs.
+
+    losses() works out rows of mixed cables at once: the k1 and k2 of
+    every row's cable (nomotools.coax.Cable) are gathered into arrays and
+    the datasheet formula is evaluated on them.  For a two-term model that
+    is exact and cheaper than reading any table, so nothing is tabulated.
+
+        python -m nomotools.attenuation LMR400 144 30
+        python -m nomotools.attenuation --csv runs.csv > losses.csv
+
+    The csv needs the columns cable, freq (MHz) and length (m); every row is
+    written back with loss_db added.
+
+    Copyright (C) 2026  Daniel Boulet
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+import argparse
+import csv
+import sys
+
+import numpy as np
+
+from . import coax
+
+
+def losses(names, freq, length, cable_table=None):
+    """
+    loss in dB for arrays of cable names, freq and length, from the
+    coefficients of the cables of cable_table (default coax.CABLES); nan
+    for unknown cables and negative frequencies
+    """
+    if cable_table is None:
+        cable_table = coax.CABLES
+    names, freq, length = np.broadcast_arrays(np.asarray(names), np.asarray(freq, dtype=float),
+                                              np.asarray(length, dtype=float))
+    known, code = np.unique(names, return_inverse=True)
+    code = code.reshape(names.shape)
+    found = [cable_table.get(name) for name in known]
+    k1 = np.array([cable.k1 if cable else np.nan for cable in found] or [np.nan])[code]
+    k2 = np.array([cable.k2 if cable else np.nan for cable in found] or [np.nan])[code]
+    with np.errstate(invalid='ignore'):
+        return length * coax.loss_per_metre(freq, k1, k2)
+
+
+def read_runs(path):
+    """
+    rows of a csv file with the columns cable, freq and length
+    """
+    with open(path, newline='') as f:
+        rows = list(csv.DictReader(f))
+    if rows and not {'cable', 'freq', 'length'} <= set(rows[0]):
+        raise ValueError("%s needs columns cable, freq and length" % path)
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m nomotools.attenuation',
+                                     description=__doc__.split('\n\n')[1].strip())
+    parser.add_argument('cable', nargs='?')
+    parser.add_argument('freq', nargs='?', type=float, help='MHz')
+    parser.add_argument('length', nargs='?', type=float, help='m')
+    parser.add_argument('--csv', help='runs from the cable, freq and length columns of this file')
+    parser.add_argument('--table', action='append', default=[],
+                        help='CSV file of more cables (see nomotools.coax), may be repeated')
+    args = parser.parse_args(argv)
+
+    cable_table = dict(coax.CABLES)
+    for path in args.table:
+        cable_table.update((cable.name, cable) for cable in coax.read_table(path))
+    if args.csv:
+        rows = read_runs(args.csv)
+    elif None not in (args.cable, args.freq, args.length):
+        rows = [{'cable': args.cable, 'freq': args.freq, 'length': args.length}]
+    else:
+        parser.error('give CABLE FREQ LENGTH or --csv')
+    unknown = sorted(set(row['cable'] for row in rows) - set(cable_table))
+    if unknown:
+        parser.error("unknown cable %s" % ', '.join(unknown))
+    loss = losses([row['cable'] for row in rows], [float(row['freq']) for row in rows],
+                  [float(row['length']) for row in rows], cable_table)
+    fields = list(rows[0]) + ['loss_db'] if rows else ['cable', 'freq', 'length', 'loss_db']
+    writer = csv.DictWriter(sys.stdout, fields)
+    writer.writeheader()
+    for row, value in zip(rows, loss):
+        writer.writerow(dict(row, loss_db='%.4f' % value))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
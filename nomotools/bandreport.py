@@ -0,0 +1,257 @@
+"""
+    bandreport.py
+
+    Antenna VSWR of many station installations, from their measured VSWR.
+
+    Rows of (band, cable, length, vswr) are read from a CSV in chunks and
+    worked out as arrays with the conversions of ghpage_src/return_loss.py:
+    the return loss measured at the feedpoint loses twice the cable loss on
+    its way to the antenna and back, so RL_ant = RL_meas - 2 * loss.  Cable
+    loss comes from nomotools.attenuation at the upper edge of the band,
+    where it is highest, as the band arrows of return_loss.py are.
+
+        python -m nomotools.bandreport installs.csv
+        python -m nomotools.bandreport installs.csv -o results.csv --overlay-dir out
+
+    A summary per station group (the 'station' column unless --group-column
+    says otherwise) is printed; -o writes every row back with the results,
+    and --overlay-dir draws the isopleths of each group on return_loss.py,
+    one PDF per group.
+
+    Copyright (C) 2026  Daniel Boulet
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+import argparse
+import csv
+import os
+import re
+import sys
+
+import numpy as np
+
+from . import attenuation, coax, labelcache, overlay, sampling, type5
+from .loader import load_script
+from .staged import StagedNomographer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RETURN_LOSS = os.path.join(ROOT, 'ghpage_src', 'return_loss.py')
+CHUNK_ROWS = 50000
+LIMIT = 2.0  # antenna VSWR counted as too high in the summary
+COLUMNS = ['band', 'cable', 'length', 'vswr']
+RESULTS = ['freq', 'loss_db', 'measured_rl', 'antenna_rl', 'antenna_vswr', 'status']
+
+# upper band edge in MHz (IARU region 2)
+BANDS = {
+    '160m': 2.0, '80m': 4.0, '60m': 5.405, '40m': 7.3, '30m': 10.15, '20m': 14.35,
+    '17m': 18.168, '15m': 21.45, '12m': 24.99, '10m': 29.7, '6m': 54.0, '2m': 148.0,
+    '1.25m': 225.0, '70cm': 450.0, '33cm': 928.0, '23cm': 1300.0,
+}
+
+
+def conversions(script=None):
+    """
+    (vswr2rl, rl2vswr) of return_loss.py, loaded unless script is given
+    """
+    namespace = (script or load_script(RETURN_LOSS)).namespace
+    return namespace['vswr2rl'], namespace['rl2vswr']
+
+
+def read_chunks(path, group_column, chunk_rows=CHUNK_ROWS):
+    """
+    yields lists of row dicts of the csv at path, chunk_rows at a time
+    """
+    with open(path, newline='') as f:
+        reader = csv.DictReader(f)
+        missing = [c for c in COLUMNS + [group_column] if c not in (reader.fieldnames or [])]
+        if missing:
+            raise ValueError("%s has no column(s) %s" % (path, ', '.join(missing)))
+        while True:
+            rows = [row for _, row in zip(range(chunk_rows), reader)]
+            if not rows:
+                return
+            yield rows
+
+
+def _numbers(rows, column):
+    values = np.empty(len(rows))
+    for i, row in enumerate(rows):
+        try:
+            values[i] = float(row[column])
+        except (TypeError, ValueError):
+            values[i] = np.nan
+    return values
+
+
+def evaluate(band, cable, length, vswr, vswr2rl, rl2vswr, cable_table=None):
+    """
+    dict of RESULTS arrays for arrays of band names, cable names, lengths
+    in m and measured VSWR
+    """
+    if cable_table is None:
+        cable_table = coax.CABLES
+    band, cable = np.asarray(band), np.asarray(cable)
+    names, code = np.unique(band, return_inverse=True)
+    freq = np.array([BANDS.get(name, np.nan) for name in names])[code.reshape(band.shape)]
+    loss = attenuation.losses(cable, freq, length, cable_table)
+    vswr = np.asarray(vswr, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        measured = np.where(vswr > 1.0, vswr2rl(vswr), np.nan)
+        antenna = measured - 2.0 * loss
+        antenna_vswr = np.where(antenna > 0.0, rl2vswr(antenna), np.nan)
+    status = np.full(band.shape, 'ok', dtype=object)
+    status[antenna <= 0.0] = 'loss exceeds measurement'
+    status[~np.isfinite(measured) | ~(np.asarray(length, dtype=float) >= 0.0)] = 'bad value'
+    status[~np.isin(cable, list(cable_table))] = 'unknown cable'
+    status[np.isnan(freq)] = 'unknown band'
+    return {'freq': freq, 'loss_db': loss, 'measured_rl': measured, 'antenna_rl': antenna,
+            'antenna_vswr': antenna_vswr, 'status': status}
+
+
+class Summary:
+    """
+    per group counts and extremes, added to one chunk at a time
+    """
+
+    def __init__(self, limit=LIMIT):
+        self.limit = limit
+        self.groups = {}  # name -> [rows, failed, over limit, loss sum, worst vswr]
+
+    def add(self, groups, results):
+        ok = results['status'] == 'ok'
+        names, code = np.unique(np.asarray(groups), return_inverse=True)
+        n = len(names)
+        rows = np.bincount(code, minlength=n)
+        good = np.bincount(code, weights=ok, minlength=n)
+        over = np.bincount(code, weights=ok & (results['antenna_vswr'] > self.limit), minlength=n)
+        loss = np.bincount(code, weights=np.where(ok, results['loss_db'], 0.0), minlength=n)
+        worst = np.full(n, -np.inf)
+        np.maximum.at(worst, code[ok], results['antenna_vswr'][ok])
+        for i, name in enumerate(names):
+            entry = self.groups.setdefault(name, [0, 0, 0, 0.0, -np.inf])
+            entry[0] += int(rows[i])
+            entry[1] += int(rows[i] - good[i])
+            entry[2] += int(over[i])
+            entry[3] += loss[i]
+            entry[4] = max(entry[4], worst[i])
+
+    def format_table(self):
+        lines = ["%-24s %7s %7s %9s %12s %11s" % ("group", "rows", "failed", "VSWR>%g" % self.limit,
+                                                  "mean loss dB", "worst VSWR")]
+        totals = [0, 0, 0, 0.0, -np.inf]
+        for name in sorted(self.groups):
+            rows, failed, over, loss, worst = self.groups[name]
+            good = rows - failed
+            lines.append("%-24s %7d %7d %9d %12s %11s"
+                         % (name, rows, failed, over, '%.2f' % (loss / good) if good else '-',
+                            '%.2f' % worst if good else '-'))
+            totals = [totals[0] + rows, totals[1] + failed, totals[2] + over,
+                      totals[3] + loss, max(totals[4], worst)]
+        lines.append("-" * len(lines[0]))
+        good = totals[0] - totals[1]
+        lines.append("%-24s %7d %7d %9d %12s %11s"
+                     % ("all", totals[0], totals[1], totals[2],
+                        '%.2f' % (totals[3] / good) if good else '-',
+                        '%.2f' % totals[4] if good else '-'))
+        return "\n".join(lines)
+
+
+def _filename(group):
+    return re.sub(r'[^\w.-]+', '_', str(group)) or 'group'
+
+
+def report(path, group_column='station', output=None, overlay_dir=None, limit=LIMIT,
+           cable_table=None, chunk_rows=CHUNK_ROWS, label_cache=labelcache.DEFAULT_PATH):
+    """
+    works out every row of the csv at path; writes them to output and the
+    isopleths of each group to overlay_dir if given; returns the Summary
+    """
+    if cable_table is None:
+        cable_table = coax.CABLES
+    script = load_script(RETURN_LOSS)
+    vswr2rl, rl2vswr = conversions(script)
+    marks = {}
+    if overlay_dir:
+        sampling.install()
+        type5.install()
+        nomo = StagedNomographer(dict(script.main_params), draw=False)
+        styles = {}
+    summary = Summary(limit)
+    out = writer = None
+    try:
+        for rows in read_chunks(path, group_column, chunk_rows):
+            length = _numbers(rows, 'length')
+            cable = [row['cable'] for row in rows]
+            results = evaluate([row['band'] for row in rows], cable, length,
+                               _numbers(rows, 'vswr'), vswr2rl, rl2vswr, cable_table)
+            groups = [row[group_column] for row in rows]
+            summary.add(groups, results)
+            if output:
+                if writer is None:
+                    out = open(output, 'w', newline='')
+                    writer = csv.DictWriter(out, list(rows[0]) + RESULTS)
+                    writer.writeheader()
+                for i, row in enumerate(rows):
+                    writer.writerow(dict(row, **{key: '%.4g' % results[key][i]
+                                                 for key in RESULTS[:-1]},
+                                         status=results['status'][i]))
+            if overlay_dir:
+                ok = results['status'] == 'ok'
+                style = np.array([styles.setdefault(name, len(styles)) for name in cable])
+                groups = np.asarray(groups)
+                # rows off the scales of the chart come out nan and are not drawn
+                for group in np.unique(groups[ok]):
+                    rows_g = ok & (groups == group)
+                    # the cable_type scale of return_loss.py is in dB per 100 m
+                    marks.setdefault(group, overlay.Overlay(nomo)).add(
+                        {'measured': results['measured_rl'][rows_g],
+                         'cable_type': 100.0 * results['loss_db'][rows_g] / length[rows_g],
+                         'clength': length[rows_g]}, style[rows_g])
+    finally:
+        if out is not None:
+            out.close()
+    if overlay_dir:
+        os.makedirs(overlay_dir, exist_ok=True)
+        for group, group_marks in sorted(marks.items()):
+            filename = os.path.join(overlay_dir, _filename(group) + '_overlay.pdf')
+            overlay.draw(nomo, script, group_marks, filename, isopleths=False,
+                         label_cache=label_cache)
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m nomotools.bandreport',
+                                     description=__doc__.split('\n\n')[1].strip())
+    parser.add_argument('csv', help='rows with the columns band, cable, length (m) and vswr')
+    parser.add_argument('-o', '--output', help='write every row with its results here')
+    parser.add_argument('--group-column', default='station',
+                        help='column naming the station group (default station)')
+    parser.add_argument('--overlay-dir', help='draw one return_loss.py overlay per group here')
+    parser.add_argument('--limit', type=float, default=LIMIT,
+                        help='antenna VSWR counted as too high (default %g)' % LIMIT)
+    parser.add_argument('--table', action='append', default=[],
+                        help='CSV file of more cables (see nomotools.coax), may be repeated')
+    args = parser.parse_args(argv)
+
+    cable_table = dict(coax.CABLES)
+    for path in args.table:
+        cable_table.update((cable.name, cable) for cable in coax.read_table(path))
+    summary = report(args.csv, args.group_column, args.output, args.overlay_dir, args.limit,
+                     cable_table)
+    print(summary.format_table())
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,206 @@
+"""
+    batch.py
+
+    Render several nomogram scripts in a single Python process.
+
+    Every script is loaded with nomotools.loader and drawn through the warm
+    text engines of nomotools.engine, so numpy/scipy/pyx/pynomo are imported
+    once and LaTeX is started once per distinct preamble instead of once per
+    script.
+
+    usage: python -m nomotools.batch [--compare] [--profile] [--workers N]
+                                     [--report FILE] [script or dir ...]
+
+    Typeset labels are kept in the nomotools.labelcache store, so a label
+    seen in an earlier run does not reach LaTeX again, and computed
+    geometry in nomotools.geometry archives, so a script whose last edit
+    only touched titles, texts or isopleth styles is just drawn again.
+
+    With --compare every script is first run standalone (one interpreter
+    each, as before) and a before/after timing report is printed.
+
+    Copyright (C) 2026  Daniel Boulet
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+import time
+
+_start = time.perf_counter()
+
+import argparse
+import os
+import subprocess
+import sys
+import traceback
+
+from . import engine, geometry, labelcache, sampling, type5
+from .loader import discover_scripts, load_script, output_path
+from .staged import StagedNomographer
+
+_import_time = time.perf_counter() - _start
+
+
+def render(script, filename=None, label_cache=labelcache.DEFAULT_PATH, profile=False,
+           workers=1, geometry_dir=geometry.DEFAULT_DIR, shared=None):
+    """
+    draws a loaded NomoScript into filename with the matching warm engine;
+    typeset labels are shared through label_cache and computed geometry
+    through geometry_dir unless they are None; profile=True times the
+    build phases (see nomotools.instrument); workers threads compute the
+    blocks of the script; shared is a staged.SharedBlocks to take blocks
+    from
+    """
+    if label_cache:
+        labelcache.install(label_cache)
+    sampling.install()
+    type5.install()
+    engine.engine_for(script)
+    params = dict(script.main_params)
+    params['filename'] = filename or output_path(script)
+    if profile:
+        params['debug'] = 'profile'
+    geometry_file = None
+    if geometry_dir:
+        geometry_file = geometry.GeometryStore(geometry_dir).file_for(script)
+    return StagedNomographer(params, workers=workers, geometry=geometry_file, shared=shared)
+
+
+def run_standalone(path):
+    """
+    runs script the traditional way and returns (seconds, error or None)
+    """
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, os.path.basename(path)],
+                          cwd=os.path.dirname(path),
+                          stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                          universal_newlines=True)
+    seconds = time.perf_counter() - start
+    if proc.returncode != 0:
+        return seconds, proc.stdout.strip().splitlines()[-1:] or ['failed']
+    return seconds, None
+
+
+def build_all(paths, outdir=None, label_cache=labelcache.DEFAULT_PATH, profile=False,
+              workers=1, geometry_dir=geometry.DEFAULT_DIR):
+    """
+    loads and renders all scripts, returns list of (path, seconds, error)
+    """
+    results = []
+    loaded = []
+    # before loading, so that grids the scripts build are kept for render()
+    sampling.install()
+    type5.install()
+    for path in paths:
+        start = time.perf_counter()
+        try:
+            loaded.append((load_script(path), time.perf_counter() - start))
+        except Exception:
+            results.append((path, time.perf_counter() - start,
+                            traceback.format_exc().strip().splitlines()[-1]))
+    # group scripts sharing a texrunner so engines are switched rarely
+    loaded.sort(key=lambda item: repr(item[0].engine_key()))
+    for script, load_seconds in loaded:
+        start = time.perf_counter()
+        error = None
+        try:
+            render(script, output_path(script, outdir), label_cache, profile, workers,
+                   geometry_dir)
+        except Exception:
+            error = traceback.format_exc().strip().splitlines()[-1]
+        results.append((script.path, load_seconds + time.perf_counter() - start, error))
+    return results
+
+
+def format_report(batch_results, batch_wall, standalone=None, root=None):
+    """
+    before/after table as a string
+    """
+    root = root or os.getcwd()
+    lines = []
+    if standalone is not None:
+        lines.append("%-40s %12s %12s" % ("script", "standalone", "batch"))
+    else:
+        lines.append("%-40s %12s" % ("script", "batch"))
+    for path, seconds, error in sorted(batch_results):
+        name = os.path.relpath(path, root)
+        row = "%-40s" % name
+        if standalone is not None:
+            before, before_error = standalone[path]
+            row += " %11.2fs" % before if before_error is None else " %12s" % "FAILED"
+        row += " %11.2fs" % seconds if error is None else " %12s" % "FAILED"
+        lines.append(row)
+        if error is not None:
+            lines.append("    " + error)
+    lines.append("-" * len(lines[0]))
+    total = "%-40s" % "wall clock (incl. imports)"
+    if standalone is not None:
+        standalone_wall = sum(seconds for seconds, error in standalone.values())
+        total += " %11.2fs" % standalone_wall
+    total += " %11.2fs" % batch_wall
+    lines.append(total)
+    if standalone is not None and batch_wall > 0:
+        failed = sum(1 for path, seconds, error in batch_results
+                     if error is not None or standalone[path][1] is not None)
+        if failed:
+            # failed runs stop early, so their times compare nothing
+            lines.append("speedup: not computed, %d of %d scripts failed"
+                         % (failed, len(batch_results)))
+        else:
+            lines.append("speedup: %.1fx" % (standalone_wall / batch_wall))
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m nomotools.batch',
+                                     description=__doc__.split('\n\n')[1].strip())
+    parser.add_argument('paths', nargs='*', help='scripts or directories (default ghpage_src)')
+    parser.add_argument('--outdir', help='write all output here instead of next to each script')
+    parser.add_argument('--compare', action='store_true',
+                        help='also time every script run standalone')
+    parser.add_argument('--report', help='write timing report to this file')
+    parser.add_argument('--no-label-cache', action='store_true',
+                        help='typeset every label instead of reusing .nomocache/labels')
+    parser.add_argument('--no-geometry-cache', action='store_true',
+                        help='compute every nomogram instead of reusing .nomocache/geometry')
+    parser.add_argument('--profile', action='store_true',
+                        help="time every build phase as with 'debug': 'profile'")
+    parser.add_argument('--workers', type=int, default=1,
+                        help='threads computing the blocks of each nomogram (default 1)')
+    parser.add_argument('--tolerance', type=float, default=sampling.TOLERANCE_MM,
+                        help='axis line chord tolerance in mm, 0 for equal spacing '
+                             '(default %g)' % sampling.TOLERANCE_MM)
+    args = parser.parse_args(argv)
+    sampling.set_tolerance(args.tolerance)
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    paths = discover_scripts(args.paths or [os.path.join(root, 'ghpage_src')])
+    standalone = None
+    if args.compare:
+        standalone = {path: run_standalone(path) for path in paths}
+    start = time.perf_counter()
+    results = build_all(paths, args.outdir,
+                        None if args.no_label_cache else labelcache.DEFAULT_PATH,
+                        args.profile, args.workers,
+                        None if args.no_geometry_cache else geometry.DEFAULT_DIR)
+    batch_wall = _import_time + time.perf_counter() - start
+    report = format_report(results, batch_wall, standalone, root)
+    print(report)
+    if args.report:
+        with open(args.report, 'w') as f:
+            f.write(report + "\n")
+    return 1 if any(error for path, seconds, error in results) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,281 @@
+"""
+    bench.py
+
+    Benchmarks of the block type templates at growing problem sizes.
+
+    Every templates/ex_type*_nomo_1.py is built at each size given with
+    --sizes.  Size 1 is the template itself; larger sizes add tick levels
+    to every axis, axes to the type_3 block (up to 50) and grid lines to
+    the type_5 and type_9 grids.  Each build is profiled phase by phase
+    with nomotools.instrument and appended to a history file, so that runs
+    under different pynomo/PyX versions can be compared.
+
+    usage: python -m nomotools.bench [--sizes 1 3 9] [--only type_3 ...] [--no-draw]
+
+    Copyright (C) 2026  Daniel Boulet
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+import argparse
+import datetime
+import glob
+import json
+import os
+import re
+import sys
+import tempfile
+import traceback
+
+import numpy as np
+
+from . import engine, sampling, type5
+from .cache import DEFAULT_DIR as CACHE_DIR, tool_versions
+from .instrument import Instrument
+from .loader import load_script
+from .staged import StagedNomographer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TEMPLATE_DIR = os.path.join(ROOT, 'templates')
+DEFAULT_HISTORY = os.path.join(CACHE_DIR, 'bench_history.jsonl')
+DEFAULT_SIZES = [1, 3, 9]
+MAX_TYPE_3_AXES = 50
+MAX_TICK_LEVELS = 5
+MAX_TICK_TEXT_LEVELS = 4
+
+
+def templates(only=None):
+    """
+    {block type: template path}, optionally only for the types in only
+    """
+    found = {}
+    for path in glob.glob(os.path.join(TEMPLATE_DIR, 'ex_type*_nomo_1.py')):
+        number = int(re.search(r'ex_type(\d+)_nomo', path).group(1))
+        block_type = 'type_%i' % number
+        if only is None or block_type in only:
+            found[number] = (block_type, path)
+    return dict(found[number] for number in sorted(found))
+
+
+def _extra_levels(size):
+    return int(round(np.log(size) / np.log(3))) if size > 1 else 0
+
+
+def _more_ticks(obj, extra):
+    """
+    raises every *tick_levels / *tick_text_levels found in obj by extra
+    """
+    if isinstance(obj, list):
+        for item in obj:
+            _more_ticks(item, extra)
+    elif isinstance(obj, dict):
+        for key, value in obj.items():
+            if key.endswith('tick_text_levels') and isinstance(value, int):
+                obj[key] = min(value + extra, MAX_TICK_TEXT_LEVELS)
+            elif key.endswith('tick_levels') and isinstance(value, int):
+                obj[key] = min(value + extra, MAX_TICK_LEVELS)
+            elif isinstance(value, (dict, list)):
+                _more_ticks(value, extra)
+
+
+def _denser(values, count):
+    """
+    count values spread over the range of values
+    """
+    return [round(float(x), 4) for x in np.linspace(min(values), max(values), count)]
+
+
+def _more_type_3_axes(block, count):
+    """
+    u_1 + ... + u_count = 0 from the template's first and last axis
+    """
+    first, last = block['f_params'][0], block['f_params'][-1]
+    axes = [dict(first, title=r'$u_{%i}$' % (i + 1)) for i in range(count - 1)]
+    axes.append(dict(last, title=r'$u_{%i}$' % count,
+                     u_min=-(count - 1) * first['u_max'],
+                     u_max=-(count - 1) * first['u_min']))
+    block['f_params'] = axes
+    rows = []
+    for row in block['isopleth_values']:
+        known = [value for value in row if value != 'x']
+        rows.append([known[i % len(known)] for i in range(count - 1)] + ['x'])
+    block['isopleth_values'] = rows
+
+
+def scale_params(main_params, size):
+    """
+    main_params of a template grown to size (1 leaves them unchanged)
+    """
+    if size == 1:
+        return main_params
+    _more_ticks(main_params['block_params'], _extra_levels(size))
+    for block in main_params['block_params']:
+        block_type = block['block_type']
+        if block_type == 'type_3':
+            _more_type_3_axes(block, min(len(block['f_params']) * size, MAX_TYPE_3_AXES))
+        elif block_type == 'type_5':
+            for key in ['u_values', 'v_values']:
+                block[key] = _denser(block[key], len(block[key]) * size)
+        elif block_type == 'type_9':
+            for name in ['f1_params', 'f2_params', 'f3_params']:
+                axis = block[name]
+                if axis.get('grid'):
+                    for key in ['u_values', 'v_values']:
+                        axis[key] = _denser(axis[key], (len(axis[key]) - 1) * size + 1)
+    return main_params
+
+
+def run_case(path, size, outdir, draw=True, repeat=1):
+    """
+    builds template at path grown to size, returns the history record of
+    the fastest of repeat runs
+    """
+    best = None
+    for _ in range(repeat):
+        script = load_script(path)
+        params = scale_params(script.main_params, size)
+        params['filename'] = os.path.join(outdir, '%s_s%i.pdf' % (script.name, size))
+        if draw:
+            engine.engine_for(script)
+        instrument = Instrument()
+        StagedNomographer(params, draw=draw, instrument=instrument)
+        if best is None or instrument.total_seconds < best.total_seconds:
+            best = instrument
+    report = best.report()
+    phases = {}
+    for p in report['phases']:
+        phases[p['phase']] = phases.get(p['phase'], 0.0) + p['seconds']
+    return {'case': os.path.basename(path),
+            'size': size,
+            'draw': draw,
+            'total_seconds': report['total_seconds'],
+            'latex_seconds': report['latex_seconds'],
+            'labels': report['labels'],
+            'calls': sum(f['calls'] for f in report['functions']),
+            'peak_mb': report['peak_mb'],
+            'phases': phases}
+
+
+def read_history(path):
+    history = []
+    if os.path.exists(path):
+        with open(path) as f:
+            for line in f:
+                if line.strip():
+                    history.append(json.loads(line))
+    return history
+
+
+def append_history(path, records):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'a') as f:
+        for record in records:
+            f.write(json.dumps(record, sort_keys=True) + "\n")
+
+
+def previous_record(history, record):
+    """
+    latest earlier record of the same case, size, draw and sampling setting
+    """
+    key = ['case', 'size', 'draw', 'sampling']
+    for old in reversed(history):
+        if [old.get(k) for k in key] == [record.get(k) for k in key]:
+            return old
+    return None
+
+
+def format_report(records, history):
+    """
+    table of the new records against the previous ones in history
+    """
+    lines = ["%-22s %5s %10s %10s %9s %10s %9s" % (
+        "template", "size", "seconds", "latex", "peak MB", "previous", "change")]
+    version_changes = set()
+    for record in records:
+        old = previous_record(history, record)
+        row = "%-22s %5i %10.3f %10.3f %9.2f" % (
+            record['case'], record['size'], record['total_seconds'],
+            record['latex_seconds'], record['peak_mb'])
+        if old is None:
+            row += " %10s %9s" % ('-', '-')
+        else:
+            change = record['total_seconds'] / old['total_seconds'] - 1.0
+            row += " %10.3f %+8.0f%%" % (old['total_seconds'], 100.0 * change)
+            for dist, version in record['versions'].items():
+                if old['versions'].get(dist) != version:
+                    version_changes.add("%s %s -> %s" % (dist, old['versions'].get(dist), version))
+        lines.append(row)
+    if version_changes:
+        lines.append("versions changed since previous run: " + ", ".join(sorted(version_changes)))
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m nomotools.bench',
+                                     description=__doc__.split('\n\n')[1].strip())
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+                        help='problem sizes (default: 1 3 9)')
+    parser.add_argument('--only', nargs='+', help='block types to run, e.g. type_3 type_5')
+    parser.add_argument('--no-draw', action='store_true',
+                        help='stop after the geometry (no ticks, LaTeX or output file)')
+    parser.add_argument('--repeat', type=int, default=1, help='keep the fastest of N runs')
+    parser.add_argument('--history', default=DEFAULT_HISTORY,
+                        help='history file (default: .nomocache/bench_history.jsonl)')
+    parser.add_argument('--outdir', help='keep the drawn nomograms here')
+    parser.add_argument('--scalar-sampling', action='store_true',
+                        help="sample axis lines with pynomo's own point by point code")
+    parser.add_argument('--tolerance', type=float, default=sampling.TOLERANCE_MM,
+                        help='axis line chord tolerance in mm, 0 for equal spacing')
+    args = parser.parse_args(argv)
+
+    if not args.scalar_sampling:
+        sampling.install()
+        type5.install()
+        sampling.set_tolerance(args.tolerance)
+    else:
+        # keeps type_5 contours on pynomo's code too
+        sampling.set_tolerance(0)
+
+    outdir = args.outdir or tempfile.mkdtemp(prefix='nomo-bench-')
+    os.makedirs(outdir, exist_ok=True)
+    history = read_history(args.history)
+    stamp = datetime.datetime.now().isoformat(timespec='seconds')
+    records = []
+    failed = []
+    try:
+        for block_type, path in templates(args.only).items():
+            for size in args.sizes:
+                try:
+                    record = run_case(path, size, outdir, not args.no_draw, args.repeat)
+                except Exception:
+                    failed.append((os.path.basename(path), size,
+                                   traceback.format_exc().strip().splitlines()[-1]))
+                    continue
+                record['date'] = stamp
+                record['sampling'] = 'scalar' if args.scalar_sampling else \
+                    'array %g mm' % args.tolerance
+                record['versions'] = tool_versions()
+                records.append(record)
+    finally:
+        engine.close_all()
+    append_history(args.history, records)
+    print(format_report(records, history))
+    for case, size, error in failed:
+        print("%-22s %5i FAILED: %s" % (case, size, error))
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,165 @@
+"""
+    build.py
+
+    Build all nomogram scripts on a pool of worker processes.
+
+    Scripts are discovered in ghpage_src/, templates/, tutorials/ and the
+    top level.  Every job runs in its own temporary directory (used for the
+    LaTeX aux files and as working directory) and writes to an explicit
+    output path, so scripts that derive their filename from sys.argv[0] or
+    hard-code it can run side by side.
+
+    Unless --no-cache is given, outputs are reused from the render cache of
+    nomotools.cache when a script's definition has not changed.
+
+    usage: python -m nomotools.build [-j N] [--outdir DIR] [--no-cache] [script or dir ...]
+
+    Copyright (C) 2026  Daniel Boulet
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+import argparse
+import concurrent.futures
+import os
+import shutil
+import sys
+import tempfile
+import time
+import traceback
+
+from .cache import DEFAULT_DIR, DEFAULT_MAX_BYTES, RenderCache, fingerprint
+from .loader import discover_scripts, load_script, output_path
+
+
+def build_job(path, outdir=None, cache_dir=None, cache_bytes=DEFAULT_MAX_BYTES):
+    """
+    worker: loads and renders one script in a private temp directory,
+    returns (path, output, seconds, error, cached)
+    """
+    # pyx and pynomo are only needed when something has to be drawn
+    from . import engine, sampling, type5
+    from .batch import render
+
+    start = time.perf_counter()
+    jobdir = tempfile.mkdtemp(prefix='nomo-')
+    saved_tempdir, cwd = tempfile.tempdir, os.getcwd()
+    output = None
+    error = None
+    cached = False
+    try:
+        tempfile.tempdir = jobdir
+        os.chdir(jobdir)
+        sampling.install()
+        type5.install()
+        script = load_script(path)
+        output = output_path(script, outdir)
+        cache = key = None
+        if cache_dir:
+            cache = RenderCache(cache_dir, cache_bytes)
+            key = fingerprint(script)
+            cached = cache.fetch(key, output)
+        if not cached:
+            render(script, output,
+                   cache_dir and os.path.join(cache_dir, 'labels', 'labels.sqlite'),
+                   geometry_dir=cache_dir and os.path.join(cache_dir, 'geometry'))
+            if cache:
+                cache.store(key, output)
+        if cache:
+            cache.remember_source(path, key, os.path.splitext(output)[1])
+    except Exception:
+        error = traceback.format_exc().strip().splitlines()[-1]
+    finally:
+        engine.close_all()
+        tempfile.tempdir = saved_tempdir
+        os.chdir(cwd)
+        shutil.rmtree(jobdir, ignore_errors=True)
+    return path, output, time.perf_counter() - start, error, cached
+
+
+def build(paths, jobs=None, outdir=None, cache_dir=DEFAULT_DIR, cache_bytes=DEFAULT_MAX_BYTES):
+    """
+    renders paths on jobs worker processes, returns list of job results;
+    scripts whose source is unchanged since a cached build are copied
+    from the cache without starting a worker
+    """
+    if outdir:
+        os.makedirs(outdir, exist_ok=True)
+    results = []
+    todo = []
+    cache = RenderCache(cache_dir, cache_bytes) if cache_dir else None
+    for path in paths:
+        start = time.perf_counter()
+        hit = cache and cache.key_for_source(path)
+        if hit:
+            key, ext = hit
+            output = output_path(path, outdir, ext)
+            if cache.fetch(key, output):
+                results.append((path, output, time.perf_counter() - start, None, True))
+                continue
+        todo.append(path)
+    if todo:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as pool:
+            futures = [pool.submit(build_job, path, outdir, cache_dir, cache_bytes)
+                       for path in todo]
+            for future in concurrent.futures.as_completed(futures):
+                results.append(future.result())
+    return results
+
+
+def format_summary(results, wall, root=None):
+    """
+    per-script wall time and failures, slowest first
+    """
+    root = root or os.getcwd()
+    lines = ["%-40s %10s  %s" % ("script", "seconds", "status")]
+    for path, output, seconds, error, cached in sorted(results, key=lambda r: -r[2]):
+        if error is not None:
+            status = "FAILED: " + error
+        else:
+            status = "cached" if cached else "ok"
+        lines.append("%-40s %10.2f  %s" % (os.path.relpath(path, root), seconds, status))
+    failed = sum(1 for result in results if result[3] is not None)
+    cached = sum(1 for result in results if result[4])
+    lines.append("-" * 60)
+    lines.append("%d scripts, %d failed, %d cached, %.2fs cpu, %.2fs wall clock"
+                 % (len(results), failed, cached, sum(r[2] for r in results), wall))
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m nomotools.build',
+                                     description=__doc__.split('\n\n')[1].strip())
+    parser.add_argument('paths', nargs='*',
+                        help='scripts or directories (default: all script directories)')
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count(),
+                        help='number of worker processes (default: cpu count)')
+    parser.add_argument('--outdir', help='write all output here instead of next to each script')
+    parser.add_argument('--cache-dir', default=DEFAULT_DIR,
+                        help='render cache directory (default: .nomocache)')
+    parser.add_argument('--cache-size', type=int, default=DEFAULT_MAX_BYTES // 2 ** 20,
+                        help='render cache size limit in MB')
+    parser.add_argument('--no-cache', action='store_true', help='always render')
+    args = parser.parse_args(argv)
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    paths = discover_scripts(args.paths)
+    start = time.perf_counter()
+    results = build(paths, args.jobs, args.outdir and os.path.abspath(args.outdir),
+                    None if args.no_cache else args.cache_dir, args.cache_size * 2 ** 20)
+    print(format_summary(results, time.perf_counter() - start, root))
+    return 1 if any(result[3] for result in results) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
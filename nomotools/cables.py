@@ -0,0 +1,274 @@
+"""
+    cables.py
+
+    Per-cable true VSWR nomograms from a table of coax loss coefficients.
+
+    true_vswr_lmr400.py and ghpage_src/true_vswr_lmr195.py differ only in
+    the loss coefficients of the cable, the range of the length scale and
+    the texts.  Here the cable is a row of nomotools.coax.CABLES (or of a
+    CSV file with the columns name, k1, k2 and optionally label, length_min,
+    length_max, length_count, example_length, example_freq), and every
+    variant is made from the template script by swapping its type_5 cable
+    loss block.  A variant is written next to the script it stands for if
+    there is one (ghpage_src/true_vswr_lmr195.pdf), else next to the
+    template.
+
+    The other blocks of the template do not depend on the cable.  They are
+    built and aligned once (staged.SharedBlocks) before the worker
+    processes are forked, so a variant only builds its type_5 grid, fits
+    the paper and draws:
+
+        python -m nomotools.cables --list
+        python -m nomotools.cables -j 8 --outdir out
+        python -m nomotools.cables --table coax.csv RG213 LMR600
+
+    Copyright (C) 2026  Daniel Boulet
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+import argparse
+import concurrent.futures
+import multiprocessing
+import os
+import sys
+import time
+import traceback
+
+import numpy as np
+
+from . import engine, geometry, labelcache, sampling, type5
+from .batch import render
+from .build import format_summary
+from .coax import CABLES, DEFAULT_FREQ, read_table
+from .loader import NomoScript, load_script, output_path
+from .staged import SharedBlocks, StagedNomographer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TEMPLATE = os.path.join(ROOT, 'true_vswr_lmr400.py')
+# a variant of a cable that already has a script here is written next to it
+SCRIPT_DIRS = [ROOT, os.path.join(ROOT, 'ghpage_src')]
+TEMPLATE_CABLE = 'LMR400'  # cable drawn by TEMPLATE, its label is replaced in the texts
+EXAMPLE_POWER = (60.0, 5.0)  # forward and reflected W of the example isopleth of TEMPLATE
+
+EXAMPLE = r"""\noindent \textbf{Example:} \
+				\par \noindent Measured forward and reflected power are \
+				%(forward)gW and %(reflected)gW respectively thus measured VSWR is %(measured).2f:1. \
+				However %(length)gm of %(label)s will attenuate \
+				a %(freq)gMHz signal by %(loss).2f dB therefore true VSWR is %(true).2f:1."""
+
+
+def example_text(cable, rl2vswr):
+    """
+    the example of TEMPLATE worked out for cable; rl2vswr is the
+    conversion the template script defines
+    """
+    forward, reflected = EXAMPLE_POWER
+    length, freq = cable.example_point()
+    measured_rl = 10 * np.log10(forward / reflected)
+    loss = length * cable.loss(freq)
+    return EXAMPLE % {'forward': forward, 'reflected': reflected,
+                      'measured': rl2vswr(measured_rl), 'length': length,
+                      'label': cable.label, 'freq': freq, 'loss': loss,
+                      'true': rl2vswr(measured_rl - 2.0 * loss)}
+
+
+def script_dir(name, default):
+    """
+    directory of the script name.py of SCRIPT_DIRS, default if there is
+    none
+    """
+    for directory in SCRIPT_DIRS:
+        if os.path.exists(os.path.join(directory, name + '.py')):
+            return directory
+    return default
+
+
+def cable_block_index(block_params):
+    """
+    index of the one type_5 block, the cable loss grid
+    """
+    found = [i for i, p in enumerate(block_params) if p.get('block_type') == 'type_5']
+    if len(found) != 1:
+        raise ValueError("template needs exactly one type_5 block, has %d" % len(found))
+    return found[0]
+
+
+def variant(script, cable, template_cable=TEMPLATE_CABLE):
+    """
+    NomoScript for cable made from the loaded template script; its
+    block_params holds the very dicts of the template except for the
+    cable loss block
+    """
+    old_label = CABLES[template_cable].label if template_cable in CABLES else template_cable
+    rl2vswr = script.namespace['rl2vswr']
+    params = dict(script.main_params)
+    block_params = list(params['block_params'])
+    index = cable_block_index(block_params)
+    block = dict(block_params[index])
+    length, freq = cable.example_point()
+    block['u_values'] = cable.length_values()
+    block['v_func'] = lambda x, v: x / cable.loss(v)
+    block['wd_title'] = block.get('wd_title', '').replace(old_label, cable.label)
+    block['isopleth_values'] = [[length, freq, 'x']]
+    block_params[index] = block
+    params['block_params'] = block_params
+    params['title_str'] = params.get('title_str', '').replace(old_label, cable.label)
+    params['extra_texts'] = [dict(extra, text=example_text(cable, rl2vswr))
+                             if r'\textbf{Example:}' in extra.get('text', '') else extra
+                             for extra in params.get('extra_texts', [])]
+    if template_cable.lower() in script.name:
+        name = script.name.replace(template_cable.lower(), cable.name.lower())
+    else:
+        name = script.name + '_' + cable.name.lower()
+    path = os.path.join(script_dir(name, os.path.dirname(script.path)), name + '.py')
+    return NomoScript(path, params, script.engine, script.preambles, script.namespace)
+
+
+def shared_blocks(script):
+    """
+    SharedBlocks of every block of the template except the cable loss one
+    """
+    block_params = script.main_params['block_params']
+    index = cable_block_index(block_params)
+    return SharedBlocks([p for i, p in enumerate(block_params) if i != index])
+
+
+# per process: cable name -> variant NomoScript, and the SharedBlocks;
+# forked workers inherit both
+_state = {}
+
+
+def prepare(cables, template=TEMPLATE, geometry_dir=geometry.DEFAULT_DIR):
+    """
+    loads template, makes the variants and computes the first one without
+    drawing it so that the shared blocks are built and aligned
+    """
+    sampling.install()
+    type5.install()
+    script = load_script(template)
+    _state['variants'] = {cable.name: variant(script, cable) for cable in cables}
+    _state['shared'] = shared_blocks(script)
+    if cables:
+        first = _state['variants'][cables[0].name]
+        geometry_file = None
+        if geometry_dir:
+            geometry_file = geometry.GeometryStore(geometry_dir).file_for(first)
+        StagedNomographer(dict(first.main_params), draw=False, geometry=geometry_file,
+                          shared=_state['shared'])
+
+
+def _init_worker(cables, template, geometry_dir):
+    # only a spawned worker starts empty
+    if not _state:
+        prepare(cables, template, geometry_dir)
+
+
+def render_job(name, outdir=None, label_cache=labelcache.DEFAULT_PATH,
+               geometry_dir=geometry.DEFAULT_DIR):
+    """
+    worker: draws the variant of cable name, returns
+    (path, output, seconds, error, cached) like nomotools.build
+    """
+    start = time.perf_counter()
+    script = _state['variants'][name]
+    output = output_path(script, outdir)
+    error = None
+    try:
+        render(script, output, label_cache, geometry_dir=geometry_dir,
+               shared=_state['shared'])
+    except Exception:
+        error = traceback.format_exc().strip().splitlines()[-1]
+    finally:
+        engine.close_all()
+    return script.path, output, time.perf_counter() - start, error, False
+
+
+def build_cables(cables, template=TEMPLATE, outdir=None, jobs=None,
+                 label_cache=labelcache.DEFAULT_PATH, geometry_dir=geometry.DEFAULT_DIR):
+    """
+    renders the variant of template for every cable, on jobs worker
+    processes; returns list of render_job results
+    """
+    if outdir:
+        os.makedirs(outdir, exist_ok=True)
+    prepare(cables, template, geometry_dir)
+    names = [cable.name for cable in cables]
+    if jobs == 1 or len(names) < 2:
+        return [render_job(name, outdir, label_cache, geometry_dir) for name in names]
+    context = None
+    if 'fork' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('fork')
+    with concurrent.futures.ProcessPoolExecutor(max_workers=jobs, mp_context=context,
+                                                initializer=_init_worker,
+                                                initargs=(cables, template,
+                                                          geometry_dir)) as pool:
+        futures = [pool.submit(render_job, name, outdir, label_cache, geometry_dir)
+                   for name in names]
+        return [future.result() for future in concurrent.futures.as_completed(futures)]
+
+
+def format_table(cables):
+    """
+    one line per cable: coefficients, loss at DEFAULT_FREQ and lengths
+    """
+    lines = ["%-12s %10s %10s %14s  %s" % ("cable", "k1", "k2",
+                                             "dB/100m@%gMHz" % DEFAULT_FREQ, "lengths (m)")]
+    for cable in cables:
+        values = cable.length_values()
+        lines.append("%-12s %10.6f %10.6f %14.2f  %g..%g (%d)"
+                     % (cable.name, cable.k1, cable.k2, 100.0 * cable.loss(DEFAULT_FREQ),
+                        values[0], values[-1], len(values)))
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m nomotools.cables',
+                                     description=__doc__.split('\n\n')[1].strip())
+    parser.add_argument('names', nargs='*', help='cables to draw (default all)')
+    parser.add_argument('--table', action='append', default=[],
+                        help='CSV file of more cables, may be repeated')
+    parser.add_argument('--template', default=TEMPLATE,
+                        help='script the variants are made from (default %(default)s)')
+    parser.add_argument('--outdir',
+                        help='write here instead of next to the script of the cable, '
+                             'if it has one, or else the template')
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help='worker processes (default: number of CPUs)')
+    parser.add_argument('--list', action='store_true', help='print the table and exit')
+    parser.add_argument('--no-label-cache', action='store_true',
+                        help='typeset every label instead of reusing .nomocache/labels')
+    parser.add_argument('--no-geometry-cache', action='store_true',
+                        help='compute every nomogram instead of reusing .nomocache/geometry')
+    args = parser.parse_args(argv)
+
+    table = dict(CABLES)
+    for path in args.table:
+        table.update((cable.name, cable) for cable in read_table(path))
+    unknown = [name for name in args.names if name not in table]
+    if unknown:
+        parser.error("unknown cable %s (see --list)" % ', '.join(unknown))
+    cables = [table[name] for name in args.names or table]
+    if args.list:
+        print(format_table(cables))
+        return 0
+    start = time.perf_counter()
+    results = build_cables(cables, args.template, args.outdir, args.jobs,
+                           None if args.no_label_cache else labelcache.DEFAULT_PATH,
+                           None if args.no_geometry_cache else geometry.DEFAULT_DIR)
+    print(format_summary(results, time.perf_counter() - start))
+    return 1 if any(result[3] for result in results) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,314 @@
+"""
+    cache.py
+
+    Content-addressed cache of rendered nomograms.
+
+    A script's output is keyed on a fingerprint of its main_params (block
+    dicts, numeric ranges and a sampled signature of every function such as
+    'function', 'align_func' or 'v_func'), its text engine settings and the
+    pynomo/PyX/LaTeX versions, the sources of nomotools itself and the
+    sampling tolerance.  A second, cheaper key on the script source lets an
+    untouched script skip loading altogether.  The store is a plain
+    directory trimmed to a size limit, least recently used first; only
+    files named by a fingerprint count, so other state kept in the same
+    directory is left alone.
+
+    Copyright (C) 2026  Daniel Boulet
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+import hashlib
+import importlib.metadata
+import inspect
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import warnings
+
+DEFAULT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                           '.nomocache')
+DEFAULT_MAX_BYTES = 200 * 1024 * 1024
+
+# points used to sample functions when the dict holding them gives no range
+PROBES = [-2.5, -0.5, 0.1, 0.5, 1.0, 2.0, 7.5, 33.0]
+SAMPLES = 9
+
+# keys that only name the output, not what is drawn
+IGNORED_KEYS = ['filename']
+
+# rendered files and .src entries: a sha256 digest and an extension
+ENTRY_NAME = re.compile(r'^[0-9a-f]{64}\.[^.]+$')
+
+_versions = None
+_package = None
+
+
+def tool_versions():
+    """
+    versions of everything that changes the rendered output
+    """
+    global _versions
+    if _versions is None:
+        _versions = {'python': sys.version.split()[0]}
+        for dist in ['pynomo', 'pyx', 'numpy', 'scipy']:
+            try:
+                _versions[dist] = importlib.metadata.version(dist)
+            except importlib.metadata.PackageNotFoundError:
+                _versions[dist] = None
+        try:
+            out = subprocess.run(['latex', '--version'], stdout=subprocess.PIPE,
+                                 stderr=subprocess.DEVNULL, universal_newlines=True).stdout
+            _versions['latex'] = out.splitlines()[0] if out else None
+        except OSError:
+            _versions['latex'] = None
+    return _versions
+
+
+def package_digest():
+    """
+    digest of the nomotools sources, which patch pynomo and are imported
+    by some scripts
+    """
+    global _package
+    if _package is None:
+        directory = os.path.dirname(os.path.abspath(__file__))
+        h = hashlib.sha256()
+        for name in sorted(os.listdir(directory)):
+            if name.endswith('.py'):
+                h.update(name.encode() + b'\0')
+                with open(os.path.join(directory, name), 'rb') as f:
+                    h.update(f.read())
+        _package = h.hexdigest()
+    return _package
+
+
+def tools_state():
+    """
+    everything on the tools' side that changes what a script renders to
+    """
+    from . import sampling  # imports pynomo, so only when a key is needed
+    return [tool_versions(), package_digest(), sampling.get_tolerance()]
+
+
+def _number(x):
+    return '%.12g' % x
+
+
+def _sample_points(context, arg_name):
+    """
+    points to evaluate a function at, taken from the dict defining it
+    """
+    if arg_name == 'u':
+        low, high = context.get('u_min'), context.get('u_max')
+        if isinstance(low, (int, float)) and isinstance(high, (int, float)):
+            step = (high - low) / (SAMPLES - 1)
+            return [low + step * i for i in range(SAMPLES)]
+        values = context.get('u_values')
+    else:
+        values = context.get(arg_name + '_values')
+    if isinstance(values, (list, tuple)) and values:
+        return list(values[::max(1, len(values) // SAMPLES)])
+    return PROBES
+
+
+def _sample(func, context):
+    """
+    sampled signature of func: its results on points from context
+    """
+    try:
+        names = list(inspect.signature(func).parameters)
+    except (TypeError, ValueError):
+        names = ['u']
+    axes = [_sample_points(context, name) for name in names] or [[]]
+    points = [[]]
+    for axis in axes:
+        points = [p + [value] for p in points for value in axis[:SAMPLES]]
+    results = []
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        for point in points:
+            try:
+                value = func(*point)
+                results.append(_canonical(value, context))
+            except Exception as e:
+                results.append(type(e).__name__)
+    return results
+
+
+def _code(code):
+    consts = [_code(c) if inspect.iscode(c) else repr(c) for c in code.co_consts]
+    return [code.co_code.hex(), consts, list(code.co_names)]
+
+
+def _canonical(obj, context, depth=0, ignored=IGNORED_KEYS):
+    """
+    json-able structure that is equal for equal nomogram definitions,
+    leaving out dict keys listed in ignored
+    """
+    if depth > 30:
+        return '...'
+    if obj is None or isinstance(obj, (bool, str)):
+        return obj
+    if isinstance(obj, (int, float)):
+        return _number(obj)
+    if isinstance(obj, dict):
+        return [[str(key), _canonical(obj[key], obj, depth + 1, ignored)]
+                for key in sorted(obj, key=str) if key not in ignored]
+    if isinstance(obj, (list, tuple)):
+        return [_canonical(item, context, depth + 1, ignored) for item in obj]
+    if type(obj).__module__ == 'numpy' and hasattr(obj, 'tolist'):
+        return _canonical(obj.tolist(), context, depth + 1, ignored)
+    if inspect.isclass(obj):
+        return obj.__module__ + '.' + obj.__qualname__
+    if inspect.isfunction(obj):
+        return ['function', _code(obj.__code__), _sample(obj, context)]
+    if callable(obj) and not hasattr(obj, '__dict__'):
+        return ['callable', getattr(obj, '__qualname__', repr(obj)), _sample(obj, context)]
+    if hasattr(obj, '__dict__'):
+        return [type(obj).__module__ + '.' + type(obj).__qualname__,
+                _canonical(vars(obj), context, depth + 1, ignored)]
+    return repr(obj)
+
+
+def _digest(data):
+    return hashlib.sha256(json.dumps(data, separators=(',', ':')).encode()).hexdigest()
+
+
+def fingerprint(script, ignored=IGNORED_KEYS):
+    """
+    key for the rendered output of a loaded NomoScript; with more
+    ignored keys it keys only part of it (see nomotools.watch)
+    """
+    filename = script.main_params.get('filename', '')
+    ext = os.path.splitext(filename)[1] if isinstance(filename, str) else ''
+    return _digest([_canonical(script.main_params, {}, ignored=ignored),
+                    _canonical(script.engine, {}), script.preambles,
+                    ext, tools_state()])
+
+
+def source_digest(path):
+    """
+    key on the script text itself and the tools, valid as long as the
+    helpers it imports from outside nomotools do not change
+    """
+    with open(path, 'rb') as f:
+        source = hashlib.sha256(f.read()).hexdigest()
+    return _digest(['source', source, tools_state()])
+
+
+class RenderCache:
+    """
+    directory of rendered files named by fingerprint, plus small .src
+    files mapping a source digest to the fingerprint it produced
+    """
+
+    def __init__(self, directory=DEFAULT_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def _artifact(self, key, ext):
+        return os.path.join(self.directory, key + ext)
+
+    def _source_entry(self, digest):
+        return os.path.join(self.directory, digest + '.src')
+
+    def key_for_source(self, path):
+        """
+        (fingerprint, output extension) recorded for the current text of
+        path, or None
+        """
+        try:
+            with open(self._source_entry(source_digest(path))) as f:
+                key, ext = f.read().split()
+        except (OSError, ValueError):
+            return None
+        return key, ext
+
+    def remember_source(self, path, key, ext):
+        self._write(self._source_entry(source_digest(path)), ('%s %s' % (key, ext)).encode())
+
+    def fetch(self, key, dest):
+        """
+        copies cached output for key to dest, returns False on a miss
+        """
+        src = self._artifact(key, os.path.splitext(dest)[1])
+        try:
+            shutil.copyfile(src, dest)
+        except OSError:
+            return False
+        os.utime(src)  # mark as recently used
+        return True
+
+    def store(self, key, src):
+        """
+        adds rendered file src under key and trims the cache
+        """
+        with open(src, 'rb') as f:
+            self._write(self._artifact(key, os.path.splitext(src)[1]), f.read())
+        self.trim()
+
+    def _write(self, dest, data):
+        # write and rename so concurrent workers never see partial files
+        tmp = '%s.%d.tmp' % (dest, os.getpid())
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, dest)
+
+    def trim(self):
+        """
+        removes least recently used outputs until under max_bytes, each
+        with the .src entries pointing at it; .src entries whose output
+        is gone are removed as well
+        """
+        outputs = {}
+        sources = {}
+        for name in os.listdir(self.directory):
+            if not ENTRY_NAME.match(name):
+                continue  # labels/, bench history, daemon files, .tmp files
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            if name.endswith('.src'):
+                try:
+                    with open(path) as f:
+                        key, ext = f.read().split()
+                except (OSError, ValueError):
+                    key, ext = '', ''
+                sources.setdefault(key + ext, []).append((stat.st_size, path))
+            else:
+                outputs[name] = (stat.st_mtime, stat.st_size, path)
+        total = sum(size for mtime, size, path in outputs.values())
+        total += sum(size for entries in sources.values() for size, path in entries)
+        for name, (mtime, size, path) in sorted(outputs.items(), key=lambda item: item[1]):
+            if total <= self.max_bytes:
+                break
+            self._remove(path)
+            del outputs[name]
+            total -= size
+        for name, entries in sources.items():
+            if name not in outputs:
+                for size, path in entries:
+                    self._remove(path)
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
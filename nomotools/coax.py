@@ -0,0 +1,125 @@
+"""
+    coax.py
+
+    Loss coefficients of coax cables.
+
+    A Cable loses k1 * sqrt(f) + k2 * f dB per 100 ft at f MHz, the form
+    the LMR datasheets give.  CABLES holds the cables of the charts in the
+    repository; read_table() adds more from CSV files.  Only numpy is
+    needed here, so the headless tools (nomotools.attenuation,
+    nomotools.bandreport) and the chart builder (nomotools.cables) share
+    the table without the headless ones importing pyx or pynomo.
+
+    Copyright (C) 2026  Daniel Boulet
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+import csv
+import math
+
+import numpy as np
+
+DEFAULT_FREQ = 144.0  # MHz, example frequency and reference of the default lengths
+DEFAULT_LOSS = 6.0  # dB at DEFAULT_FREQ over the longest default length
+DEFAULT_COUNT = 21  # values on the default length scale
+
+
+def loss_per_metre(freq, k1, k2):
+    """
+    loss in dB per metre at freq MHz of cables with coefficients k1 and k2,
+    for arrays of all three
+    """
+    return (np.sqrt(freq) * k1 + freq * k2) / 100.0 / 0.3048
+
+
+def _nice(x):
+    """
+    x rounded to a multiple of a quarter of its decade
+    """
+    step = 10 ** math.floor(math.log10(x)) / 4.0
+    return round(x / step) * step
+
+
+class Cable:
+    """
+    coax cable losing k1 * sqrt(f) + k2 * f dB per 100 ft at f MHz, the
+    form the LMR datasheets give; label is the TeX name used in the texts
+    """
+
+    def __init__(self, name, k1, k2, label=None, lengths=None, example=None):
+        self.name = name
+        self.k1 = k1
+        self.k2 = k2
+        self.label = label or name
+        self.lengths = lengths  # (first, last, count) of the length scale in m
+        self.example = example  # (length in m, MHz) of the example isopleth
+
+    def loss(self, freq):
+        """
+        loss in dB per metre at freq MHz (scalar or array)
+        """
+        return loss_per_metre(freq, self.k1, self.k2)
+
+    def length_values(self):
+        """
+        values of the length scale; by default up to about DEFAULT_LOSS dB
+        at DEFAULT_FREQ, starting at a fifth of that
+        """
+        if self.lengths is not None:
+            first, last, count = self.lengths
+        else:
+            last = _nice(DEFAULT_LOSS / self.loss(DEFAULT_FREQ))
+            first, count = last / 5.0, DEFAULT_COUNT
+        return list(np.linspace(first, last, int(count)))
+
+    def example_point(self):
+        """
+        (length, freq) of the example isopleth
+        """
+        if self.example is not None:
+            return self.example
+        values = self.length_values()
+        return values[len(values) // 2], DEFAULT_FREQ
+
+
+# coefficients of the charts already in the repository; more come from
+# --table files
+CABLES = {cable.name: cable for cable in [
+    Cable('LMR195', 0.356859, 0.000470, r'LMR195\textsuperscript{\textregistered}',
+          (10.0, 40.0, 16), (28.0, 50.0)),
+    Cable('LMR400', 0.122290, 0.000260, r'LMR400\textsuperscript{\textregistered}',
+          (25.0, 125.0, 21), (75.0, 144.0)),
+]}
+
+
+def read_table(path):
+    """
+    cables of a CSV file, one row per cable; empty optional columns take
+    the defaults of Cable
+    """
+    def number(row, key):
+        value = (row.get(key) or '').strip()
+        return float(value) if value else None
+
+    cables = []
+    with open(path, newline='') as f:
+        for row in csv.DictReader(f):
+            lengths = [number(row, key) for key in
+                       ['length_min', 'length_max', 'length_count']]
+            example = [number(row, key) for key in ['example_length', 'example_freq']]
+            cables.append(Cable(row['name'].strip(), float(row['k1']), float(row['k2']),
+                                (row.get('label') or '').strip() or None,
+                                lengths if None not in lengths else None,
+                                example if None not in example else None))
+    return cables
@@ -0,0 +1,158 @@
+"""
+    daemon.py
+
+    Local build daemon that keeps pynomo, PyX, numpy and scipy imported.
+
+    The server imports everything once and forks a child for each request,
+    so a render costs only the script itself (plus a LaTeX start from the
+    precompiled format).  A small client submits scripts over a Unix socket.
+
+    usage: python -m nomotools.daemon start           # serve in foreground
+           python -m nomotools.daemon submit SCRIPT... [--outdir DIR]
+           python -m nomotools.daemon stop
+
+    Copyright (C) 2026  Daniel Boulet
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+import argparse
+import json
+import os
+import signal
+import socket
+import socketserver
+import sys
+import time
+import traceback
+
+from .cache import DEFAULT_DIR as CACHE_DIR
+
+DEFAULT_SOCKET = os.path.join(CACHE_DIR, 'daemon.sock')
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    """
+    runs in the forked child: one JSON request line in, one JSON line out
+    """
+
+    def handle(self):
+        request = json.loads(self.rfile.readline().decode())
+        start = time.perf_counter()
+        response = {'script': request['script'], 'output': None, 'error': None}
+        try:
+            from .batch import render
+            from .loader import load_script, output_path
+            script = load_script(request['script'])
+            response['output'] = output_path(script, request.get('outdir'))
+            render(script, response['output'])
+        except Exception:
+            response['error'] = traceback.format_exc().strip().splitlines()[-1]
+        response['seconds'] = time.perf_counter() - start
+        self.wfile.write((json.dumps(response) + '\n').encode())
+
+
+class _Server(socketserver.ForkingMixIn, socketserver.UnixStreamServer):
+    pass
+
+
+def preload():
+    """
+    imports that every child would otherwise pay for
+    """
+    import numpy
+    import pyx
+    import pynomo.nomographer
+    import scipy.stats
+    from . import batch, loader
+
+
+def serve(socket_path=DEFAULT_SOCKET):
+    """
+    serves build requests on socket_path until terminated
+    """
+    preload()
+    os.makedirs(os.path.dirname(socket_path), exist_ok=True)
+    if os.path.exists(socket_path):
+        os.remove(socket_path)
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    server = _Server(socket_path, _Handler)
+    with open(socket_path + '.pid', 'w') as f:
+        f.write(str(os.getpid()))
+    print("nomotools daemon listening on %s" % socket_path)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        for path in [socket_path, socket_path + '.pid']:
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def submit(scripts, outdir=None, socket_path=DEFAULT_SOCKET):
+    """
+    sends all scripts at once (the daemon builds them concurrently) and
+    returns the responses in order
+    """
+    connections = []
+    for script in scripts:
+        conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        conn.connect(socket_path)
+        request = {'script': os.path.abspath(script),
+                   'outdir': outdir and os.path.abspath(outdir)}
+        conn.sendall((json.dumps(request) + '\n').encode())
+        connections.append(conn)
+    responses = []
+    for conn in connections:
+        with conn, conn.makefile('rb') as f:
+            responses.append(json.loads(f.readline().decode()))
+    return responses
+
+
+def stop(socket_path=DEFAULT_SOCKET):
+    with open(socket_path + '.pid') as f:
+        os.kill(int(f.read()), signal.SIGTERM)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m nomotools.daemon',
+                                     description=__doc__.split('\n\n')[1].strip())
+    parser.add_argument('--socket', default=DEFAULT_SOCKET, help='Unix socket path')
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('start', help='run the daemon in the foreground')
+    commands.add_parser('stop', help='terminate a running daemon')
+    submit_parser = commands.add_parser('submit', help='render scripts with the daemon')
+    submit_parser.add_argument('scripts', nargs='+')
+    submit_parser.add_argument('--outdir', help='write output here instead of next to each script')
+    args = parser.parse_args(argv)
+
+    if args.command == 'start':
+        serve(args.socket)
+    elif args.command == 'stop':
+        stop(args.socket)
+    else:
+        failed = 0
+        for response in submit(args.scripts, args.outdir, args.socket):
+            if response['error']:
+                failed += 1
+                print("%-40s %8.2fs  FAILED: %s" % (response['script'], response['seconds'],
+                                                    response['error']))
+            else:
+                print("%-40s %8.2fs  %s" % (response['script'], response['seconds'],
+                                            response['output']))
+        return 1 if failed else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,86 @@
+"""
+    engine.py
+
+    Persistent PyX text engines shared by every nomogram rendered in one
+    process.
+
+    PyX normally finishes its TeX run the first time a canvas is written,
+    so the next script pays LaTeX startup again.  With texipc the dvi pages
+    are read as they are produced and the same TeX process keeps running
+    across writePDFfile calls.  One engine is kept per distinct engine class
+    and preamble; LaTeX engines start from a precompiled format of that
+    preamble (nomotools.texformat) when one can be dumped.
+
+    Copyright (C) 2026  Daniel Boulet
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+from pyx import text
+
+from . import texformat
+
+_engines = {}
+
+
+def install(engine):
+    """
+    makes engine the module level pyx text engine
+    """
+    text.defaulttextengine = engine
+    text.preamble = engine.preamble
+    text.text_pt = engine.text_pt
+    text.text = engine.text
+    text.reset = engine.reset
+
+
+def warm_engine(engine_cls=None, preambles=(), formats=True):
+    """
+    installs and returns the shared engine for engine_cls and preambles,
+    starting it on first use
+    """
+    if engine_cls is None:
+        engine_cls = text.TexEngine
+    key = (engine_cls, tuple(preambles))
+    engine = _engines.get(key)
+    if engine is None:
+        if formats and engine_cls is text.LatexEngine:
+            try:
+                engine = texformat.FormatLatexEngine(preambles, texipc=True)
+            except (OSError, RuntimeError):
+                pass  # no usable 'latex -ini', start the usual way
+        if engine is None:
+            engine = engine_cls(texipc=True)
+            for expr in preambles:
+                engine.preamble(expr)
+        _engines[key] = engine
+    install(engine)
+    return engine
+
+
+def engine_for(script, formats=True):
+    """
+    warm engine matching the text settings recorded for a NomoScript
+    """
+    return warm_engine(script.engine, script.preambles, formats)
+
+
+def close_all():
+    """
+    finishes every shared engine and removes its temporary directory
+    """
+    for engine in _engines.values():
+        single = engine.instance
+        if text.STATE_START < single.state < text.STATE_DONE:
+            single.do_finish()
+    _engines.clear()
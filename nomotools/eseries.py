@@ -0,0 +1,235 @@
+"""
+    eseries.py
+
+    Best E-series resistor pairs for voltage dividers.
+
+    The voltdiv nomograms read Rb / (Ra + Rb) = Vout / Vin off a grid of
+    E-series values.  DividerIndex holds every (Ra, Rb) pair of a series over
+    a few decades sorted by that ratio, so the pairs nearest a target are
+    found by binary search, for whole arrays of (Vin, Vout) at once, with
+    optional limits on the Vout error and on the power in each resistor:
+
+        python -m nomotools.eseries 12 3.3 --series E96 -k 5 --power 0.125
+        python -m nomotools.eseries --csv targets.csv --series E24 > pairs.csv
+
+    Copyright (C) 2026  Daniel Boulet
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+import argparse
+import csv
+import sys
+
+import numpy as np
+
+# decade values of IEC 60063; E48 and up are 10**(i/n) to three figures
+SERIES = {
+    'E6': [1.0, 1.5, 2.2, 3.3, 4.7, 6.8],
+    'E12': [1.0, 1.2, 1.5, 1.8, 2.2, 2.7, 3.3, 3.9, 4.7, 5.6, 6.8, 8.2],
+    'E24': [1.0, 1.1, 1.2, 1.3, 1.5, 1.6, 1.8, 2.0, 2.2, 2.4, 2.7, 3.0,
+            3.3, 3.6, 3.9, 4.3, 4.7, 5.1, 5.6, 6.2, 6.8, 7.5, 8.2, 9.1],
+}
+for _n in [48, 96, 192]:
+    SERIES['E%d' % _n] = [round(10 ** (i / float(_n)), 2) for i in range(_n)]
+SERIES['E192'][SERIES['E192'].index(9.19)] = 9.20
+
+DECADES = range(1, 6)  # 10 ohm to 910 kohm
+WINDOW = 16  # pairs looked at on each side of a target before widening
+DIGITS = 12  # ratios equal to this many digits are the same divider
+
+
+def decade_values(series):
+    """
+    decade values of series, given as 'E24', 24 or a list
+    """
+    if isinstance(series, int):
+        series = 'E%d' % series
+    if isinstance(series, str):
+        if series.upper() not in SERIES:
+            raise ValueError("unknown series %r, use one of %s" % (series, ', '.join(SERIES)))
+        return SERIES[series.upper()]
+    return list(series)
+
+
+def resistor_values(series='E24', decades=DECADES):
+    """
+    sorted array of the values of series in every decade 10**d, d in decades
+    """
+    base = np.array(decade_values(series), dtype=float)
+    values = [np.round(base * 10.0 ** d, max(0, 2 - d)) for d in decades]
+    return np.unique(np.concatenate(values))
+
+
+class Pairs:
+    """
+    k best pairs per target; arrays of shape target shape + (k,), nan
+    where fewer than k pairs pass the limits
+    """
+
+    def __init__(self, ra, rb, vout, error):
+        self.ra = ra  # top resistor
+        self.rb = rb  # bottom resistor, Vout across it
+        self.vout = vout  # Vout the pair gives
+        self.error = error  # relative error of that Vout
+
+    def rows(self, vin, vout):
+        """
+        (vin, vout, rank, ra, rb, vout of pair, error) tuples of the
+        pairs found
+        """
+        vin, vout = np.broadcast_arrays(np.asarray(vin, dtype=float),
+                                        np.asarray(vout, dtype=float))
+        k = self.ra.shape[-1]
+        for i, (target_vin, target_vout) in enumerate(zip(vin.ravel(), vout.ravel())):
+            for rank in range(k):
+                ra = self.ra.reshape(-1, k)[i, rank]
+                if not np.isnan(ra):
+                    yield (target_vin, target_vout, rank + 1, ra, self.rb.reshape(-1, k)[i, rank],
+                           self.vout.reshape(-1, k)[i, rank], self.error.reshape(-1, k)[i, rank])
+
+
+class DividerIndex:
+    """
+    all (Ra, Rb) pairs of an E-series sorted by Rb / (Ra + Rb)
+    """
+
+    def __init__(self, series='E24', decades=DECADES):
+        self.values = resistor_values(series, decades)
+        n = len(self.values)
+        ra = np.repeat(np.arange(n, dtype=np.int32), n)
+        rb = np.tile(np.arange(n, dtype=np.int32), n)
+        ratio = self.values[rb] / (self.values[ra] + self.values[rb])
+        key = np.round(ratio, DIGITS)
+        # equal ratios (the same divider a decade up) by total resistance
+        order = np.lexsort((self.values[ra] + self.values[rb], key))
+        self.ratio = ratio[order]
+        self.key = key[order]
+        self.ra = ra[order]
+        self.rb = rb[order]
+
+    def __len__(self):
+        return len(self.ratio)
+
+    def query(self, vin, vout, k=1, tolerance=None, power=None, distinct=True):
+        """
+        the k pairs whose Vout comes nearest vout for input vin, for arrays
+        of vin and vout.  tolerance limits the relative Vout error, power the
+        watts dissipated in either resistor.  With distinct, a ratio counts
+        once, with the lowest total resistance that passes the limits.
+        """
+        vin, vout = np.broadcast_arrays(np.asarray(vin, dtype=float),
+                                        np.asarray(vout, dtype=float))
+        shape = vin.shape
+        vin, target = vin.ravel(), (vout / vin).ravel()
+        size = len(self.ratio)
+        if tolerance is None:
+            low = np.zeros(len(target), dtype=int)
+            high = np.full(len(target), size)
+        else:
+            low = np.searchsorted(self.key, target * (1.0 - tolerance), 'left')
+            high = np.searchsorted(self.key, target * (1.0 + tolerance), 'right')
+        position = np.searchsorted(self.key, target)
+        best = np.full((len(target), k), -1)
+        best_error = np.full((len(target), k), np.inf)
+        rows = np.arange(len(target))
+        window = max(WINDOW, k)
+        while len(rows):
+            index = position[rows, None] + np.arange(-window, window)
+            inside = (index >= low[rows, None]) & (index < high[rows, None])
+            index = np.clip(index, 0, size - 1)
+            error = np.abs(self.ratio[index] - target[rows, None]) / target[rows, None]
+            error[~inside] = np.inf
+            if power is not None:
+                ra, rb = self.values[self.ra[index]], self.values[self.rb[index]]
+                current = vin[rows, None] / (ra + rb)
+                error[current ** 2 * np.maximum(ra, rb) > power] = np.inf
+            if distinct:
+                # drop a pair if the previous one left in the window has its ratio
+                passed = np.isfinite(error)
+                columns = np.arange(index.shape[1])
+                previous = np.maximum.accumulate(np.where(passed, columns, -1), axis=1)
+                previous = np.concatenate([np.full((len(rows), 1), -1), previous[:, :-1]], axis=1)
+                previous_key = self.key[np.take_along_axis(index, np.maximum(previous, 0), axis=1)]
+                error[passed & (previous >= 0) & (previous_key == self.key[index])] = np.inf
+            order = np.argsort(error, axis=1, kind='stable')[:, :k]
+            best[rows] = np.take_along_axis(index, order, axis=1)
+            best_error[rows] = np.take_along_axis(error, order, axis=1)
+            # a pair outside the window can only be as near as the k-th
+            # pair found if the window has not reached the limits yet
+            below = position[rows] - window - 1
+            above = position[rows] + window
+            bound = np.full(len(rows), np.inf)
+            for edge in [below, above]:
+                valid = (edge >= low[rows]) & (edge < high[rows])
+                edge_error = np.abs(self.ratio[np.clip(edge, 0, size - 1)] - target[rows]) / target[rows]
+                bound = np.where(valid, np.minimum(bound, edge_error), bound)
+            rows = rows[np.isfinite(bound) & (best_error[rows, -1] >= bound)]
+            window *= 4
+        found = np.isfinite(best_error)
+        ra = np.where(found, self.values[self.ra[best]], np.nan)
+        rb = np.where(found, self.values[self.rb[best]], np.nan)
+        ratio = np.where(found, self.ratio[best], np.nan)
+        error = (ratio - target[:, None]) / target[:, None]
+        return Pairs(ra.reshape(shape + (k,)), rb.reshape(shape + (k,)),
+                     (ratio * vin[:, None]).reshape(shape + (k,)), error.reshape(shape + (k,)))
+
+
+def read_targets(path):
+    """
+    vin and vout arrays from the columns of that name of a csv file
+    """
+    with open(path, newline='') as f:
+        rows = list(csv.DictReader(f))
+    if rows and not {'vin', 'vout'} <= set(rows[0]):
+        raise ValueError("%s needs columns vin and vout" % path)
+    return (np.array([float(row['vin']) for row in rows]),
+            np.array([float(row['vout']) for row in rows]))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m nomotools.eseries',
+                                     description=__doc__.split('\n\n')[1].strip())
+    parser.add_argument('vin', nargs='?', type=float)
+    parser.add_argument('vout', nargs='?', type=float)
+    parser.add_argument('--csv', help='targets from the vin and vout columns of this file')
+    parser.add_argument('--series', default='E24', help='E6 to E192 (default E24)')
+    parser.add_argument('--decades', type=int, nargs=2, default=[DECADES[0], DECADES[-1]],
+                        metavar=('FIRST', 'LAST'),
+                        help='powers of ten to use values from (default 1 5, 10 ohm to 910 kohm)')
+    parser.add_argument('-k', type=int, default=3, help='pairs per target (default 3)')
+    parser.add_argument('--tolerance', type=float, help='largest Vout error in percent')
+    parser.add_argument('--power', type=float, help='resistor power rating in watts')
+    parser.add_argument('--repeats', action='store_true',
+                        help='also list the same ratio in other decades')
+    args = parser.parse_args(argv)
+
+    if args.csv:
+        vin, vout = read_targets(args.csv)
+    elif args.vin is not None and args.vout is not None:
+        vin, vout = np.array([args.vin]), np.array([args.vout])
+    else:
+        parser.error('give VIN VOUT or --csv')
+    index = DividerIndex(args.series, range(args.decades[0], args.decades[1] + 1))
+    tolerance = args.tolerance / 100.0 if args.tolerance is not None else None
+    pairs = index.query(vin, vout, args.k, tolerance, args.power, not args.repeats)
+    writer = csv.writer(sys.stdout)
+    writer.writerow(['vin', 'vout', 'rank', 'ra', 'rb', 'pair_vout', 'error_percent'])
+    for row in pairs.rows(vin, vout):
+        writer.writerow(['%g' % x for x in row[:3]] + ['%g' % row[3], '%g' % row[4],
+                                                         '%.6g' % row[5], '%.4f' % (100 * row[6])])
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
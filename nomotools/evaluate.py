@@ -0,0 +1,379 @@
+"""
+    evaluate.py
+
+    Numeric evaluation of nomogram definitions without drawing them.
+
+    A block's equation is solved for its 'x' unknown directly from the
+    functions in the block params, for whole numpy arrays of inputs:
+
+        type_1  F1(u1) + F2(u2) + F3(u3) = 0
+        type_2  F1(u1) = F2(u2) * F3(u3)
+        type_3  F1(u1) + F2(u2) + ... + FN(uN) = 0
+        type_4  F1(u1) / F2(u2) = F3(u3) / F4(u4)
+        type_5  u_func(u) = v_func(wd_func(wd), v)
+        type_8  single scale, only passes values on through its tag
+
+    Blocks of a whole main_params are chained through their 'tag'/'dtag'
+    fields and 'align_func' exactly as the drawn nomogram aligns them, so
+    solve(main_params) gives what a reader gets from the isopleths.  As on
+    paper, a value that falls outside its scale reads as nan.
+
+    Copyright (C) 2026  Daniel Boulet
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+import numpy as np
+
+SUPPORTED_TYPES = ['type_1', 'type_2', 'type_3', 'type_4', 'type_5', 'type_8']
+
+# points of the table used to bracket the inverse of a scale function
+TABLE_SIZE = 4097
+TOLERANCE = 1e-10
+SECANT_STEPS = 3
+ITERATIONS = 60
+
+_scalar_funcs = set()
+
+
+def call(func, *args):
+    """
+    func evaluated on numpy arrays args; functions that only take scalars
+    (math.log and friends) are called point by point, errors give nan
+    """
+    shape = np.broadcast(*args).shape
+    if func not in _scalar_funcs:
+        try:
+            with np.errstate(all='ignore'):
+                result = np.asarray(func(*args), dtype=float)
+            if result.shape == shape:
+                return result
+            if result.shape == ():
+                return np.full(shape, float(result))
+        except (TypeError, ValueError):
+            pass
+        _scalar_funcs.add(func)
+
+    def scalar(*point):
+        try:
+            return float(func(*point))
+        except (ValueError, ZeroDivisionError, OverflowError):
+            return np.nan
+
+    if shape == ():
+        return np.asarray(scalar(*args))
+    return np.vectorize(scalar, otypes=[float])(*args)
+
+
+def find_root(residual, a, b, *args):
+    """
+    t in [a, b] with residual(t, *args) = 0 for arrays a, b and args, by
+    Illinois false position; nan where residual does not change sign
+    over the bracket.  Converged points are dropped from the iteration.
+    """
+    arrays = np.broadcast_arrays(a, b, *args)
+    shape = arrays[0].shape
+    a, b, *args = [np.array(x, dtype=float).ravel() for x in arrays]
+    root = np.full(a.shape, np.nan)
+    with np.errstate(all='ignore'):
+        fa, fb = residual(a, *args), residual(b, *args)
+        valid = np.isfinite(fa) & np.isfinite(fb) & (np.sign(fa) * np.sign(fb) <= 0)
+        root[valid & (fb == 0)] = b[valid & (fb == 0)]
+        root[valid & (fa == 0)] = a[valid & (fa == 0)]
+        active = np.flatnonzero(valid & (fa != 0) & (fb != 0))
+        a, b, fa, fb = a[active], b[active], fa[active], fb[active]
+        args = [x[active] for x in args]
+        side = np.zeros(a.shape, dtype=int)
+        c = b.copy()
+        for _ in range(ITERATIONS):
+            if not len(active):
+                break
+            previous = c
+            c = b - fb * (b - a) / (fb - fa)
+            c = np.where(np.isfinite(c), c, 0.5 * (a + b))
+            fc = residual(c, *args)
+            sign = np.sign(fc)
+            move_b = sign == np.sign(fb)
+            move_a = sign == np.sign(fa)
+            fa[move_b & (side == -1)] *= 0.5
+            fb[move_a & (side == 1)] *= 0.5
+            b[move_b] = c[move_b]
+            fb[move_b] = fc[move_b]
+            a[move_a] = c[move_a]
+            fa[move_a] = fc[move_a]
+            side[:] = 0
+            side[move_b] = -1
+            side[move_a] = 1
+            done = (sign == 0) | (np.abs(c - previous) <= TOLERANCE * np.abs(c))
+            root[active[done]] = c[done]
+            keep = ~done
+            active, a, b, fa, fb, c, side = (active[keep], a[keep], b[keep], fa[keep],
+                                             fb[keep], c[keep], side[keep])
+            args = [x[keep] for x in args]
+        root[active] = c
+    return root.reshape(shape)
+
+
+class Scale:
+    """
+    scale function with its u range, invertible for arrays of values
+    """
+
+    def __init__(self, func, u_min, u_max):
+        self.func = func
+        self.u_min = min(u_min, u_max)
+        self.u_max = max(u_min, u_max)
+        self._table = None
+
+    def __call__(self, u):
+        return call(self.func, u)
+
+    def inverse(self, value):
+        """
+        u with func(u) = value, nan outside the scale
+        """
+        if self._table is None:
+            u = np.linspace(self.u_min, self.u_max, TABLE_SIZE)
+            f = self(u)
+            keep = np.isfinite(f)
+            u, f = u[keep], f[keep]
+            if len(f) > 1 and f[-1] < f[0]:
+                u, f = u[::-1], f[::-1]
+            self._table = (u, f)
+        u, f = self._table
+        value = np.asarray(value, dtype=float)
+        if len(f) < 2:
+            return np.full(value.shape, np.nan)
+        idx = np.clip(np.searchsorted(f, value), 1, len(f) - 1)
+        u0, u1, f0, f1 = u[idx - 1], u[idx], f[idx - 1], f[idx]
+        with np.errstate(all='ignore'):
+            # linear interpolation in the table, then secant steps from the
+            # nearer table point; the bracket is small enough for them
+            t = u0 + (value - f0) * (u1 - u0) / (f1 - f0)
+            t = np.where(np.isfinite(t), t, u0)
+            t_prev, f_prev = u0, f0 - value
+            for _ in range(SECANT_STEPS):
+                f_t = self(t) - value
+                step = f_t * (t - t_prev) / (f_t - f_prev)
+                t_prev, f_prev = t, f_t
+                t = np.clip(t - np.where(np.isfinite(step), step, 0.0),
+                            np.minimum(u0, u1), np.maximum(u0, u1))
+        return np.where((value >= f[0]) & (value <= f[-1]), t, np.nan)
+
+
+def _axis_scale(axis_params):
+    return Scale(axis_params['function'], axis_params['u_min'], axis_params['u_max'])
+
+
+def _align(params, prefix=''):
+    """
+    (tag, dtag, align scale or None) of one axis of a block
+    """
+    tag = params.get(prefix + 'tag', 'none')
+    dtag = params.get(prefix + 'dtag', 'none')
+    align = params.get(prefix + 'align_func')
+    return tag, dtag, align
+
+
+class Block:
+    """
+    equation of one block params dict, solvable for any one position
+    """
+
+    def __init__(self, block_params):
+        self.params = block_params
+        self.type = block_params['block_type']
+        if self.type not in SUPPORTED_TYPES:
+            raise ValueError("block_type %r cannot be evaluated" % self.type)
+        p = block_params
+        if self.type in ['type_1', 'type_2']:
+            axes = [p['f1_params'], p['f2_params'], p['f3_params']]
+        elif self.type == 'type_4':
+            axes = [p['f1_params'], p['f2_params'], p['f3_params'], p['f4_params']]
+        elif self.type == 'type_3':
+            axes = p['f_params']
+        elif self.type == 'type_8':
+            axes = [p['f_params']]
+        if self.type == 'type_5':
+            u = p['u_values']
+            v = p['v_values']
+            self.scales = [Scale(p['u_func'], min(u), max(u)), None, None]
+            self.v_range = (min(v), max(v))
+            self._x_range = None
+            self.links = [_align(p, 'u_'), ('none', 'none', None), _align(p, 'wd_')]
+            self.wd_func = p.get('wd_func', lambda x: x)
+            self.wd_func_inv = p.get('wd_func_inv', lambda x: x)
+        elif self.type == 'type_8':
+            self.scales = [None]
+            self.links = [_align(axes[0])]
+            self.u_range = (min(axes[0]['u_min'], axes[0]['u_max']),
+                            max(axes[0]['u_min'], axes[0]['u_max']))
+        else:
+            self.scales = [_axis_scale(axis) for axis in axes]
+            self.links = [_align(axis) for axis in axes]
+        self.size = len(self.scales)
+
+    def x_range(self):
+        """
+        range of the horizontal grid coordinate of a type_5 block, the
+        same one the wd scale is drawn over
+        """
+        if self._x_range is None:
+            from .type5 import type_5_x_range
+            self._x_range = type_5_x_range(self.params)
+        return self._x_range
+
+    def solve(self, values, k):
+        """
+        value at position k from the known values at the other positions
+        """
+        known = [np.asarray(v, dtype=float) if i != k else None
+                 for i, v in enumerate(values)]
+        f = [self.scales[i](v) if v is not None and self.scales[i] is not None else None
+             for i, v in enumerate(known)]
+        with np.errstate(all='ignore'):
+            if self.type in ['type_1', 'type_3']:
+                return self.scales[k].inverse(-sum(x for x in f if x is not None))
+            if self.type == 'type_2':
+                targets = [lambda: f[1] * f[2], lambda: f[0] / f[2], lambda: f[0] / f[1]]
+                return self.scales[k].inverse(targets[k]())
+            if self.type == 'type_4':
+                targets = [lambda: f[1] * f[2] / f[3], lambda: f[0] * f[3] / f[2],
+                           lambda: f[0] * f[3] / f[1], lambda: f[1] * f[2] / f[0]]
+                return self.scales[k].inverse(targets[k]())
+            if self.type == 'type_5':
+                return self._solve_type_5(known, k)
+        raise ValueError("%s block has nothing to solve" % self.type)
+
+    def _solve_type_5(self, known, k):
+        u, v, wd = known
+        v_func = self.params['v_func']
+        if k == 0:
+            return self.scales[0].inverse(call(v_func, call(self.wd_func, wd), v))
+        fu = self.scales[0](u)
+        if k == 1:
+            x = call(self.wd_func, wd)
+            v_min, v_max = self.v_range
+            return find_root(lambda t, x, fu: call(v_func, x, t) - fu, v_min, v_max, x, fu)
+        x_min, x_max = self.x_range()
+        x = find_root(lambda t, v, fu: call(v_func, t, v) - fu, x_min, x_max, v, fu)
+        return call(self.wd_func_inv, x)
+
+
+class Evaluator:
+    """
+    all blocks of a main_params, chained through their tags
+    """
+
+    def __init__(self, main_params):
+        self.block_params = main_params['block_params']
+        self.blocks = [Block(p) for p in self.block_params]
+        # first axis carrying a tag defines the value of that tag, later
+        # ones map onto it through their align_func like in align_blocks
+        self.owner = {}
+        for b, block in enumerate(self.blocks):
+            for k, (tag, dtag, align) in enumerate(block.links):
+                for name in [tag, dtag]:
+                    if name != 'none' and name not in self.owner:
+                        self.owner[name] = (b, k)
+        self._align_scales = {}
+
+    def _align_scale(self, b, k):
+        key = (b, k)
+        if key not in self._align_scales:
+            block = self.blocks[b]
+            if block.type == 'type_5':
+                prefix = ['u_', 'v_', 'wd_'][k]
+                values = block.params['u_values'] if k == 0 else None
+                if values is not None:
+                    low, high = min(values), max(values)
+                else:
+                    x_min, x_max = block.x_range()
+                    low, high = sorted([block.wd_func_inv(x_min), block.wd_func_inv(x_max)])
+                func = block.params.get(prefix + 'align_func')
+            elif block.type == 'type_8':
+                low, high = block.u_range
+                func = block.params['f_params'].get('align_func')
+            else:
+                low, high = block.scales[k].u_min, block.scales[k].u_max
+                func = block.links[k][2]
+            self._align_scales[key] = Scale(func, low, high)
+        return self._align_scales[key]
+
+    def _to_tag(self, b, k, name, value):
+        if self.owner[name] == (b, k) or self.blocks[b].links[k][2] is None:
+            return value
+        return self._align_scale(b, k)(value)
+
+    def _from_tag(self, b, k, name, value):
+        if self.owner[name] == (b, k) or self.blocks[b].links[k][2] is None:
+            return value
+        return self._align_scale(b, k).inverse(value)
+
+    def solve(self, rows=None):
+        """
+        rows holds one isopleth_values style list per block, numbers or
+        arrays for known values and 'x' for unknowns (default: the first
+        isopleth of every block); returns them with every 'x' solved
+        """
+        if rows is None:
+            rows = [p.get('isopleth_values', [[]])[0] if p.get('isopleth_values')
+                    else ['x'] * block.size
+                    for p, block in zip(self.block_params, self.blocks)]
+        values = [[None if isinstance(v, str) else np.asarray(v, dtype=float) for v in row]
+                  for row in rows]
+        tags = {}
+        progress = True
+        while progress:
+            progress = False
+            for b, block in enumerate(self.blocks):
+                row = values[b]
+                for k, (tag, dtag, align) in enumerate(block.links):
+                    for name in [tag, dtag]:
+                        if name == 'none':
+                            continue
+                        if row[k] is None and name in tags:
+                            row[k] = self._from_tag(b, k, name, tags[name])
+                            progress = True
+                        elif row[k] is not None and name not in tags:
+                            tags[name] = self._to_tag(b, k, name, row[k])
+                            progress = True
+                unknown = [k for k, v in enumerate(row) if v is None]
+                if len(unknown) == 1 and block.type != 'type_8':
+                    row[unknown[0]] = block.solve(row, unknown[0])
+                    progress = True
+        for b, row in enumerate(values):
+            if any(v is None for v in row):
+                raise ValueError("block %d (%s) is underdetermined"
+                                 % (b, self.blocks[b].type))
+        return values
+
+
+def solve_block(block_params, values):
+    """
+    isopleth_values style list of one block with its single 'x' solved
+    """
+    unknown = [k for k, v in enumerate(values) if isinstance(v, str)]
+    if len(unknown) != 1:
+        raise ValueError("exactly one 'x' expected in %r" % (values,))
+    block = Block(block_params)
+    row = [None if isinstance(v, str) else np.asarray(v, dtype=float) for v in values]
+    row[unknown[0]] = block.solve(row, unknown[0])
+    return row
+
+
+def solve(main_params, rows=None):
+    """
+    shortcut for Evaluator(main_params).solve(rows)
+    """
+    return Evaluator(main_params).solve(rows)
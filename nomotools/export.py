@@ -0,0 +1,377 @@
+"""
+    export.py
+
+    Nomogram geometry as JSON for the browser viewer in viewer/.
+
+    The computed nomogram is painted onto a RecordingCanvas instead of a PyX
+    canvas: strokes and fills become polylines grouped by style, texts are
+    grouped by angle, alignment, size and color with the TeX turned into
+    plain text, and nothing is typeset, so no LaTeX is needed.  Every scale that can be
+    read also gets its line with the value of each point, which is all the
+    viewer needs to read off a straight edge laid across the chart.
+
+    To keep the files small, lines are thinned to points that are more than
+    STEP off the chord, and stored as integer multiples of STEP, each point
+    as its difference from the one before.  Attributes at their defaults
+    (solid, not filled, black, upright text, left and baseline aligned,
+    normalsize) are left out, as are empty texts.
+
+    usage: python -m nomotools.export [--outdir DIR] script.py ...
+
+    Copyright (C) 2026  Daniel Boulet
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+import argparse
+import json
+import math
+import os
+import re
+import sys
+import traceback
+
+import numpy as np
+import pyx
+from pyx import normpath
+
+from . import sampling, type5
+from .loader import discover_scripts, load_script, output_path
+from .staged import StagedNomographer
+
+FORMAT = 2
+DIGITS = 3  # decimals of a coordinate in cm
+STEP = 10.0 ** -DIGITS  # cm per unit of the encoded lines: 0.01 mm
+SCALE_TOLERANCE_MM = 0.05  # readable scales: largest error of a linearly interpolated value
+CURVE_STEPS = 8  # chords per Bezier curve (circles, arrow heads)
+# point sizes of LaTeX's size commands at 10pt
+SIZES = {'tiny': 5.0, 'scriptsize': 7.0, 'footnotesize': 8.0, 'small': 9.0,
+         'normalsize': 10.0, 'large': 12.0, 'Large': 14.4, 'LARGE': 17.28,
+         'huge': 20.74, 'Huge': 24.88}
+SYMBOLS = {'circ': '\u00b0', 'degree': '\u00b0', 'Omega': '\u03a9', 'omega': '\u03c9',
+           'mu': '\u00b5', 'pi': '\u03c0', 'alpha': '\u03b1', 'beta': '\u03b2',
+           'gamma': '\u03b3', 'Delta': '\u0394', 'delta': '\u03b4', 'lambda': '\u03bb',
+           'theta': '\u03b8', 'sigma': '\u03c3', 'chi': '\u03c7', 'rho': '\u03c1',
+           'phi': '\u03c6', 'epsilon': '\u03b5', 'eta': '\u03b7', 'tau': '\u03c4',
+           'cdot': '\u00b7', 'times': '\u00d7', 'pm': '\u00b1', 'sqrt': '\u221a',
+           'infty': '\u221e', 'le': '\u2264', 'leq': '\u2264', 'ge': '\u2265',
+           'geq': '\u2265', 'rightarrow': '\u2192', 'copyright': '\u00a9',
+           'textregistered': '\u00ae', 'newline': '\n', 'par': '\n'}
+# a size command opening a label
+SIZE_COMMAND = re.compile(r'\s*\\(%s)\b' % '|'.join(SIZES))
+# text attributes left out of the JSON when they have these values
+TEXT_DEFAULTS = {'a': 0.0, 'h': 0.0, 'v': None, 's': SIZES['normalsize'], 'c': '#000000'}
+# \frac{a}{b} whose a and b may hold braces one level deep, e.g. V_{out}
+BRACED = r'\{((?:[^{}]|\{[^{}]*\})*)\}'
+FRACTION = re.compile(r'\\[dt]?frac' + BRACED + BRACED)
+SUPERSCRIPTS = str.maketrans('0123456789+-', '\u2070\u00b9\u00b2\u00b3\u2074\u2075\u2076'
+                                             '\u2077\u2078\u2079\u207a\u207b')
+
+
+def _operand(text):
+    """
+    text of a fraction part, in parentheses if it is a sum
+    """
+    text = text.strip()
+    return '(%s)' % text if re.search(r'.[-+]', text) else text
+
+
+def plain_text(tex):
+    """
+    readable approximation of a TeX label: symbols become unicode,
+    \\frac{a}{b} becomes a/b, other commands and braces are dropped
+    """
+    text = tex.replace('\\\\', '\n')
+    text = re.sub(r'\\(?:begin|end|usepackage|color|hspace|vspace)\{[^}]*\}', '', text)
+    text = re.sub(r'\\[,;:\s]', ' ', text)
+    text = re.sub(r'\\([%&$#_{}])', lambda m: '\x00' + m.group(1), text)
+    for dummy in range(3):  # nested fractions, outermost first
+        text = FRACTION.sub(lambda m: '/'.join(_operand(part) for part in m.groups()), text)
+    text = re.sub(r'\^\{?([0-9+-]+)\}?', lambda m: m.group(1).translate(SUPERSCRIPTS), text)
+    text = re.sub(r'\\([a-zA-Z]+)\*? ?',
+                  lambda m: SYMBOLS.get(m.group(1), ''), text)
+    text = re.sub(r'[${}^_]', '', text).replace('\x00', '')
+    return '\n'.join(' '.join(line.split()) for line in text.strip().split('\n'))
+
+
+def _round(value):
+    return round(float(value), DIGITS)
+
+
+def _encoded(points):
+    """
+    flat [x0, y0, dx1, dy1, ...] of (n, 2) points in cm, in steps of STEP
+    """
+    steps = np.round(np.asarray(points, dtype=float) / STEP).astype(int)
+    return np.concatenate([steps[:1], np.diff(steps, axis=0)]).ravel().tolist()
+
+
+def _decoded(line):
+    """
+    (n, 2) points in cm of a line encoded by _encoded
+    """
+    return np.cumsum(np.array(line, dtype=float).reshape(-1, 2), axis=0) * STEP
+
+
+def _thinned(points, tolerance=STEP):
+    """
+    points of a polyline without those within tolerance of the chord of
+    their neighbours that are kept
+    """
+    points = np.asarray(points, dtype=float)
+    points = points[np.r_[True, (np.diff(points, axis=0) != 0).any(axis=1)]]
+    if len(points) < 3:
+        return points
+    keep = np.zeros(len(points), dtype=bool)
+    keep[[0, -1]] = True
+    todo = [(0, len(points) - 1)]
+    while todo:
+        i, j = todo.pop()
+        if j - i < 2:
+            continue
+        dx, dy = points[j] - points[i]
+        rest = points[i + 1:j] - points[i]
+        chord = math.hypot(dx, dy)
+        if chord > 0:
+            error = np.abs(rest[:, 0] * dy - rest[:, 1] * dx) / chord
+        else:
+            error = np.hypot(rest[:, 0], rest[:, 1])
+        worst = int(np.argmax(error))
+        if error[worst] > tolerance:
+            k = i + 1 + worst
+            keep[k] = True
+            todo.extend([(i, k), (k, j)])
+    return points[keep]
+
+
+def _color(attrs):
+    for a in attrs:
+        if isinstance(a, pyx.color.color):
+            rgb = a.rgb()
+            return '#%02x%02x%02x' % tuple(int(round(255 * max(0.0, min(1.0, v))))
+                                           for v in (rgb.r, rgb.g, rgb.b))
+    return '#000000'
+
+
+def _trafo(attrs):
+    total = pyx.trafo.identity
+    for a in attrs:
+        if isinstance(a, pyx.trafo.trafo_pt):
+            total = a * total
+    return total
+
+
+def _polylines(path, trafo):
+    """
+    encoded points (see _encoded) of the subpaths of a pyx path
+    """
+    scale = 1.0 / pyx.unit.topt(1.0)
+    lines = []
+    for subpath in path.normpath().transformed(trafo).normsubpaths:
+        points = [subpath.atbegin_pt()]
+        for item in subpath.normsubpathitems:
+            if isinstance(item, normpath.normcurve_pt):
+                points.extend(item.at_pt([(k + 1.0) / CURVE_STEPS for k in range(CURVE_STEPS)]))
+            else:
+                points.append(item.atend_pt())
+        if subpath.closed:
+            points.append(points[0])
+        lines.append(_encoded(_thinned(np.array(points) * scale)))
+    return lines
+
+
+class RecordingCanvas:
+    """
+    stands in for a pyx canvas and keeps what is drawn on it as plain data
+    """
+
+    def __init__(self):
+        self.paths = {}  # (width, color, filled, dashed) -> polylines
+        self.texts = {}  # (angle, halign, valign, size, color) -> [x, y, text] lists
+
+    def stroke(self, path, attrs=()):
+        self.draw(path, attrs)
+
+    def fill(self, path, attrs=()):
+        self.draw(path, [pyx.deco.filled] + list(attrs))
+
+    def draw(self, path, attrs=()):
+        attrs = list(attrs)
+        width = pyx.style.linewidth.normal.width
+        dashed = False
+        for a in attrs:
+            if isinstance(a, pyx.style.linewidth):
+                width = a.width
+            elif isinstance(a, (pyx.style.linestyle, pyx.style.dash)):
+                dashed = a is not pyx.style.linestyle.solid
+        filled = any(isinstance(a, type(pyx.deco.filled)) for a in attrs)
+        key = (_round(pyx.unit.tocm(width)), _color(attrs), filled, dashed)
+        self.paths.setdefault(key, []).extend(_polylines(path, _trafo(attrs)))
+
+    def text(self, x, y, tex, attrs=()):
+        attrs = list(attrs)
+        trafo = _trafo(attrs)
+        (a, b), (c, d) = trafo.matrix
+        scale = 1.0 / pyx.unit.topt(1.0)
+        halign, valign, size = 0.0, None, SIZES['normalsize']
+        for attr in attrs:
+            if isinstance(attr, pyx.text.boxhalign):
+                halign = attr.boxhalign
+            elif isinstance(attr, pyx.text.valign):
+                valign = attr.valign
+            elif isinstance(attr, pyx.text.size):
+                size = SIZES.get(attr.size, size)
+        match = SIZE_COMMAND.match(tex)
+        if match:
+            size = SIZES[match.group(1)]
+        text = plain_text(tex)
+        if not text:
+            return
+        key = (round(math.degrees(math.atan2(c, a)), 2), halign, valign, size, _color(attrs))
+        self.texts.setdefault(key, []).append([_round(x + trafo.vector[0] * scale),
+                                               _round(y + trafo.vector[1] * scale), text])
+
+    def settextengine(self, engine):
+        pass
+
+    def insert(self, item, attrs=()):
+        return item
+
+
+def _simplify(points, u, tolerance):
+    """
+    indices of the points to keep so that every dropped point lies within
+    tolerance of where interpolating u linearly between the kept ones
+    would put it
+    """
+    keep = np.zeros(len(u), dtype=bool)
+    keep[[0, -1]] = True
+    todo = [(0, len(u) - 1)]
+    while todo:
+        i, j = todo.pop()
+        if j - i < 2:
+            continue
+        k = np.arange(i + 1, j)
+        t = (u[k] - u[i]) / (u[j] - u[i]) if u[j] != u[i] else np.zeros(len(k))
+        expected = points[i] + t[:, None] * (points[j] - points[i])
+        error = np.hypot(*(points[k] - expected).T)
+        worst = np.argmax(error)
+        if error[worst] > tolerance:
+            keep[k[worst]] = True
+            todo.extend([(i, k[worst]), (k[worst], j)])
+    return np.nonzero(keep)[0]
+
+
+def _scales(nomo, tolerance=SCALE_TOLERANCE_MM / 10.0):
+    """
+    readable scales: atom lines with the value of every point, thinned to
+    tolerance (cm)
+    """
+    scales = []
+    for number, block in enumerate(nomo.blocks):
+        for atom in block.atom_stack:
+            if not hasattr(atom, 'line') or len(atom.line) < 2:
+                continue
+            # pynomo doubles the first point
+            line = np.array(atom.line[1:], dtype=float)
+            values = np.array(atom.value_list[1:], dtype=float)
+            keep = _simplify(line, values, tolerance)
+            line, values = line[keep], values[keep]
+            params = atom.params
+            scales.append({'block': number,
+                           'title': plain_text(str(params.get('title', ''))),
+                           'tag': params.get('tag', 'none'),
+                           'log': 'log' in str(params.get('scale_type', '')),
+                           'p': _encoded(line),
+                           'u': [float('%.8g' % u) for u in values]})
+    return scales
+
+
+def export_nomogram(nomo):
+    """
+    JSON-able dict of a computed StagedNomographer
+    """
+    canvas = RecordingCanvas()
+    nomo.paint(canvas)
+    texts = []
+    xs, ys = [], []
+    for key, items in canvas.texts.items():
+        group = dict((name, value) for name, value in zip('ahvsc', key)
+                     if TEXT_DEFAULTS[name] != value)
+        group['l'] = items
+        texts.append(group)
+        xs.extend(item[0] for item in items)
+        ys.extend(item[1] for item in items)
+    paths = []
+    for (width, color, filled, dashed), lines in canvas.paths.items():
+        group = {'w': width, 'c': color, 'p': lines}
+        if filled:
+            group['f'] = True
+        if dashed:
+            group['d'] = True
+        paths.append(group)
+        for line in lines:
+            points = _decoded(line)
+            xs.extend([points[:, 0].min(), points[:, 0].max()])
+            ys.extend([points[:, 1].min(), points[:, 1].max()])
+    blocks = [{'type': block.ref_block_params.get('block_type'),
+               'trafo': [float(block.alpha1), float(block.beta1), float(block.gamma1),
+                         float(block.alpha2), float(block.beta2), float(block.gamma2),
+                         float(block.alpha3), float(block.beta3), float(block.gamma3)]}
+              for block in nomo.blocks]
+    return {'format': FORMAT,
+            'title': plain_text(str(nomo.params.get('title_str', ''))),
+            'bbox': [_round(min(xs)), _round(min(ys)), _round(max(xs)), _round(max(ys))]
+            if xs else [0, 0, 1, 1],
+            'paths': paths, 'texts': texts,
+            'scales': _scales(nomo), 'blocks': blocks}
+
+
+def export_script(path, outdir=None):
+    """
+    computes a script and writes its JSON next to its output (or into
+    outdir), returns the JSON path
+    """
+    sampling.install()
+    type5.install()
+    script = load_script(path)
+    params = dict(script.main_params)
+    nomo = StagedNomographer(params, draw=False)
+    target = os.path.splitext(output_path(script, outdir))[0] + '.json'
+    with open(target, 'w') as f:
+        json.dump(export_nomogram(nomo), f, separators=(',', ':'))
+    return target
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m nomotools.export',
+                                     description=__doc__.split('\n\n')[1].strip())
+    parser.add_argument('paths', nargs='+', help='scripts or directories')
+    parser.add_argument('--outdir', help='write the JSON files here (e.g. viewer)')
+    args = parser.parse_args(argv)
+    if args.outdir:
+        os.makedirs(args.outdir, exist_ok=True)
+    failed = 0
+    for path in discover_scripts(args.paths):
+        try:
+            target = export_script(path, args.outdir and os.path.abspath(args.outdir))
+        except Exception:
+            failed += 1
+            print("%s: %s" % (path, traceback.format_exc().strip().splitlines()[-1]))
+        else:
+            print("%s: %s (%.0f kB)" % (path, target, os.path.getsize(target) / 1024.0))
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
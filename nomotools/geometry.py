@@ -0,0 +1,228 @@
+"""
+    geometry.py
+
+    Computed nomogram geometry kept as a numpy archive.
+
+    Everything StagedNomographer.compute() works out before drawing (block
+    transformations, sampled atom lines, type_5 contours and isopleth
+    solutions) is written to an uncompressed .npz file named by a key on
+    the definition without its COSMETIC_KEYS.  A later build with only new
+    titles, texts or isopleth styles maps the archive into memory, builds
+    the blocks with the stored contours and skips alignment, the
+    transformations, line sampling and the isopleth solve.  Tick positions
+    are still worked out while drawing, from the restored transformations.
+
+    Copyright (C) 2026  Daniel Boulet
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+import hashlib
+import json
+import os
+import struct
+import zipfile
+
+import numpy as np
+from pynomo.nomo_wrapper import Nomo_Atom_Grid
+
+from . import cache, sampling, type5
+from .staged import COSMETIC_KEYS
+
+FORMAT = 1  # bump when the arrays below change meaning
+DEFAULT_DIR = os.path.join(cache.DEFAULT_DIR, 'geometry')
+DEFAULT_MAX_BYTES = 100 * 1024 * 1024
+
+_headers = {(1, 0): np.lib.format.read_array_header_1_0,
+            (2, 0): np.lib.format.read_array_header_2_0}
+
+
+def geometry_key(script):
+    """
+    key for the geometry of a loaded NomoScript: its fingerprint without
+    COSMETIC_KEYS, plus the sampling tolerance the lines were made with
+    """
+    key = ['geometry', FORMAT,
+           cache.fingerprint(script, cache.IGNORED_KEYS + COSMETIC_KEYS),
+           sampling.get_tolerance()]
+    return hashlib.sha256(json.dumps(key).encode()).hexdigest()
+
+
+def load_arrays(path):
+    """
+    name -> array of the .npz archive at path; members stored without
+    compression are views of one read-only memory map of the file
+    """
+    data = None
+    arrays = {}
+    with zipfile.ZipFile(path) as archive, open(path, 'rb') as f:
+        for info in archive.infolist():
+            name = info.filename[:-len('.npy')]
+            if info.compress_type != zipfile.ZIP_STORED:
+                with archive.open(info) as member:
+                    arrays[name] = np.lib.format.read_array(member)
+                continue
+            f.seek(info.header_offset + 26)
+            name_length, extra_length = struct.unpack('<HH', f.read(4))
+            f.seek(name_length + extra_length, os.SEEK_CUR)
+            shape, fortran_order, dtype = _headers[np.lib.format.read_magic(f)](f)
+            if data is None:
+                data = np.memmap(path, dtype=np.uint8, mode='r')
+            arrays[name] = np.ndarray(shape, dtype, buffer=data, offset=f.tell(),
+                                      order='F' if fortran_order else 'C')
+    return arrays
+
+
+def geometry_arrays(nomo):
+    """
+    arrays holding the computed geometry of a StagedNomographer, or None
+    if some of it cannot be stored
+    """
+    arrays = {'layout': np.array([len(block.atom_stack) for block in nomo.blocks])}
+    for i, block in enumerate(nomo.blocks):
+        arrays['trafo_%d' % i] = np.array(block.trafo_stack, dtype=float)
+        for j, atom in enumerate(block.atom_stack):
+            if hasattr(atom, 'line'):
+                arrays['line_%d_%d' % (i, j)] = np.array(atom.line, dtype=float).reshape(-1, 2)
+                arrays['values_%d_%d' % (i, j)] = np.array(atom.value_list, dtype=float)
+        if block.ref_block_params.get('block_type') == 'type_5':
+            lines = type5.contours(block)
+            if lines is None:
+                return None
+            for k, line in enumerate(lines):
+                arrays['contour_%d_%d' % (i, k)] = line
+    if nomo.params['draw_isopleths']:
+        for i, isopleth in enumerate(nomo.isopleths.isopleth_list):
+            rows = isopleth.draw_coordinates
+            lengths = [len(row) for row in rows]
+            coords = np.full((len(rows), max(lengths + [0])), np.nan)
+            for n, row in enumerate(rows):
+                coords[n, :len(row)] = row
+            others = [(n, g, x, y) for n, groups in enumerate(isopleth.other_points)
+                      for g, points in enumerate(groups) for x, y in points]
+            arrays['isopleth_%d' % i] = coords
+            arrays['isopleth_%d_lengths' % i] = np.array(lengths, dtype=int)
+            arrays['others_%d' % i] = np.array(others, dtype=float).reshape(-1, 4)
+            arrays['others_%d_groups' % i] = np.array(
+                [len(groups) for groups in isopleth.other_points], dtype=int)
+    return arrays
+
+
+class GeometryFile:
+    """
+    geometry of one nomogram in an .npz archive at path, see
+    StagedNomographer's geometry argument
+    """
+
+    def __init__(self, path, store=None):
+        self.path = path
+        self.store = store
+        self.arrays = None
+
+    def load(self):
+        """
+        maps the archive if there is one, returns whether there was
+        """
+        try:
+            self.arrays = load_arrays(self.path)
+        except (OSError, ValueError, KeyError, zipfile.BadZipFile):
+            self.arrays = None
+            return False
+        os.utime(self.path)  # mark as recently used
+        return True
+
+    def preset(self, block_params):
+        """
+        lets the type_5 blocks of block_params take their stored contours
+        """
+        for i, p in enumerate(block_params):
+            if p.get('block_type') != 'type_5':
+                continue
+            lines = []
+            while 'contour_%d_%d' % (i, len(lines)) in self.arrays:
+                lines.append(self.arrays['contour_%d_%d' % (i, len(lines))])
+            if lines:
+                type5.preset_contours(p, lines)
+
+    def restore(self, nomo):
+        """
+        puts the stored transformations, lines and isopleths into the
+        freshly built blocks of nomo; False (and nomo untouched) if the
+        archive does not fit them
+        """
+        arrays = self.arrays
+        layout = [len(block.atom_stack) for block in nomo.blocks]
+        if arrays.get('layout') is None or arrays['layout'].tolist() != layout:
+            return False
+        for i, block in enumerate(nomo.blocks):
+            if 'trafo_%d' % i not in arrays:
+                return False
+            for j, atom in enumerate(block.atom_stack):
+                if not isinstance(atom, Nomo_Atom_Grid) and 'line_%d_%d' % (i, j) not in arrays:
+                    return False
+        isopleth_list = nomo.isopleths.isopleth_list
+        if nomo.params['draw_isopleths'] and \
+                any('isopleth_%d' % i not in arrays for i in range(len(isopleth_list))):
+            return False
+        for i, block in enumerate(nomo.blocks):
+            block.trafo_stack = list(np.array(arrays['trafo_%d' % i]))
+            block._calculate_total_trafo_mat_()
+            for j, atom in enumerate(block.atom_stack):
+                if 'line_%d_%d' % (i, j) not in arrays:
+                    continue
+                line = list(map(tuple, arrays['line_%d_%d' % (i, j)].tolist()))
+                values = arrays['values_%d_%d' % (i, j)].tolist()
+                atom.line = line
+                atom.value_list = values
+                atom.sections = [(x1, y1, x0, y0) for (x0, y0), (x1, y1) in zip(line, line[1:])]
+                atom.section_values = [[u1, u0] for u0, u1 in zip(values, values[1:])]
+        if nomo.params['draw_isopleths']:
+            for i, isopleth in enumerate(isopleth_list):
+                isopleth.draw_coordinates = [
+                    row[:length].tolist() for row, length in
+                    zip(arrays['isopleth_%d' % i], arrays['isopleth_%d_lengths' % i])]
+                isopleth.other_points = [[[] for g in range(groups)]
+                                         for groups in arrays['others_%d_groups' % i]]
+                for n, g, x, y in arrays['others_%d' % i].tolist():
+                    isopleth.other_points[int(n)][int(g)].append((x, y))
+        return True
+
+    def save(self, nomo):
+        """
+        writes the geometry of nomo, returns False if it cannot be stored
+        """
+        arrays = geometry_arrays(nomo)
+        if arrays is None:
+            return False
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        # write and rename so that a reader never maps a partial archive
+        tmp = '%s.%d.tmp' % (self.path, os.getpid())
+        with open(tmp, 'wb') as f:
+            np.savez(f, **arrays)
+        os.replace(tmp, self.path)
+        if self.store is not None:
+            self.store.trim()
+        return True
+
+
+class GeometryStore(cache.RenderCache):
+    """
+    directory of GeometryFiles named by geometry_key, trimmed to a size
+    limit like the render cache
+    """
+
+    def __init__(self, directory=DEFAULT_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        super().__init__(directory, max_bytes)
+
+    def file_for(self, script):
+        return GeometryFile(self._artifact(geometry_key(script), '.npz'), self)
@@ -0,0 +1,228 @@
+"""
+    instrument.py
+
+    Per-phase timing of nomogram builds.
+
+    With 'debug': 'profile' in the main params, StagedNomographer records
+    for every build phase (and every block inside the per-block phases) the
+    wall time, the part of it spent typesetting with LaTeX, the number of
+    calls into the script's own functions and the peak memory allocated.
+    The result is printed as a table and written as JSON next to the
+    output file (<output>.profile.json).
+
+    Copyright (C) 2026  Daniel Boulet
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+import contextlib
+import functools
+import inspect
+import json
+import time
+import tracemalloc
+
+MB = 1024.0 * 1024.0
+
+
+class _TimedEngine(object):
+    """
+    text engine proxy that books the time spent typesetting on instrument
+    """
+
+    def __init__(self, engine, instrument):
+        self._engine = engine
+        self._instrument = instrument
+
+    def __getattr__(self, name):
+        return getattr(self._engine, name)
+
+    def _timed(self, method, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            self._instrument.latex_seconds += time.perf_counter() - start
+            self._instrument.labels += 1
+
+    def text(self, *args, **kwargs):
+        return self._timed(self._engine.text, *args, **kwargs)
+
+    def text_pt(self, *args, **kwargs):
+        return self._timed(self._engine.text_pt, *args, **kwargs)
+
+
+class Instrument(object):
+    """
+    collects one record per phase:
+        {'phase', 'block', 'seconds', 'latex_seconds', 'labels', 'calls', 'peak_mb'}
+    and per user function:
+        {'function', 'calls', 'seconds'}
+    """
+
+    def __init__(self, trace_memory=True):
+        self.trace_memory = trace_memory
+        self.phases = []
+        self.functions = {}
+        self.latex_seconds = 0.0
+        self.labels = 0
+        self.calls = 0
+        self._wrapped = []
+        self._started_tracing = False
+        self._start = None
+        self.total_seconds = 0.0
+
+    def start(self):
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        self._start = time.perf_counter()
+
+    def stop(self):
+        self.total_seconds = time.perf_counter() - self._start
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+        self.restore_functions()
+
+    @contextlib.contextmanager
+    def phase(self, name, block=None):
+        """
+        times the with-body as phase name (of block number block)
+        """
+        latex_seconds, labels, calls = self.latex_seconds, self.labels, self.calls
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            base = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1] - base if tracing else 0
+            self.phases.append({'phase': name,
+                                'block': block,
+                                'seconds': seconds,
+                                'latex_seconds': self.latex_seconds - latex_seconds,
+                                'labels': self.labels - labels,
+                                'calls': self.calls - calls,
+                                'peak_mb': peak / MB})
+
+    def wrap_functions(self, block_params):
+        """
+        replaces the functions found in block_params (axis functions, u_func,
+        align_func, ...) by counting wrappers until stop() is called
+        """
+        for number, params in enumerate(block_params):
+            self._wrap(params, 'block %i' % number)
+
+    def _wrap(self, obj, path):
+        if isinstance(obj, dict):
+            items = list(obj.items())
+        elif isinstance(obj, list):
+            items = list(enumerate(obj))
+        else:
+            return
+        for key, value in items:
+            name = '%s.%s' % (path, key)
+            if inspect.isfunction(value):
+                if not hasattr(value, 'instrument_name'):
+                    obj[key] = self._counting(value, name)
+                    self._wrapped.append((obj, key, value))
+            elif isinstance(value, (dict, list)):
+                self._wrap(value, name)
+
+    def _counting(self, func, name):
+        record = self.functions.setdefault(name, {'function': name, 'calls': 0,
+                                                  'seconds': 0.0})
+
+        @functools.wraps(func)
+        def counted(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record['calls'] += 1
+                record['seconds'] += time.perf_counter() - start
+                self.calls += 1
+
+        counted.instrument_name = name
+        return counted
+
+    def restore_functions(self):
+        """
+        puts the original functions back into the params
+        """
+        for obj, key, func in reversed(self._wrapped):
+            obj[key] = func
+        self._wrapped = []
+
+    def timed_engine(self, engine):
+        """
+        text engine to use for canvases whose typesetting should be timed
+        """
+        return _TimedEngine(engine, self)
+
+    def report(self):
+        """
+        everything recorded as a JSON-able dict
+        """
+        return {'total_seconds': self.total_seconds,
+                'latex_seconds': self.latex_seconds,
+                'labels': self.labels,
+                'peak_mb': max([p['peak_mb'] for p in self.phases] or [0.0]),
+                'phases': self.phases,
+                'functions': sorted(self.functions.values(),
+                                    key=lambda f: -f['calls'])}
+
+    def write_json(self, filename):
+        with open(filename, 'w') as f:
+            json.dump(self.report(), f, indent=1)
+
+    def format_table(self):
+        """
+        human readable version of report()
+        """
+        lines = ["%-24s %6s %10s %10s %7s %10s %9s" % (
+            "phase", "block", "seconds", "latex", "labels", "calls", "peak MB")]
+        for p in self.phases:
+            lines.append("%-24s %6s %10.4f %10.4f %7i %10i %9.2f" % (
+                p['phase'], '' if p['block'] is None else p['block'],
+                p['seconds'], p['latex_seconds'], p['labels'], p['calls'], p['peak_mb']))
+        lines.append("-" * len(lines[0]))
+        lines.append("%-24s %6s %10.4f %10.4f %7i %10i %9.2f" % (
+            "total", '', self.total_seconds, self.latex_seconds, self.labels,
+            self.calls, self.report()['peak_mb']))
+        if self.functions:
+            lines.append("")
+            lines.append("%-50s %10s %10s" % ("function", "calls", "seconds"))
+            for f in self.report()['functions']:
+                lines.append("%-50s %10i %10.4f" % (f['function'], f['calls'], f['seconds']))
+        return "\n".join(lines)
+
+
+def profile_requested(params):
+    """
+    True if the main params ask for a profile ('debug': 'profile')
+    """
+    return params.get('debug') == 'profile'
+
+
+def phase(instrument, name, block=None):
+    """
+    instrument.phase(name, block), or a no-op context without an instrument
+    """
+    if instrument is None:
+        return contextlib.nullcontext()
+    return instrument.phase(name, block)
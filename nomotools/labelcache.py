@@ -0,0 +1,205 @@
+"""
+    labelcache.py
+
+    Disk-backed cache of typeset labels shared across runs.
+
+    Tick labels such as '$%3.1f$' numbers or the 'A'..'H' arrows of
+    vf_calculator.py are typeset again on every render although the result
+    never changes.  Once installed, every text typeset through a PyX
+    MultiEngine is looked up by (expanded LaTeX string, engine settings,
+    preamble, PyX version) and, when found, rebuilt from the stored dvi
+    output without talking to TeX.  Fonts are stored by reference and
+    reloaded from their tfm files, so entries stay small.
+
+    Storing needs the dvi page right after typesetting, which PyX provides
+    in texipc mode as used by nomotools.engine; other engines still read
+    from the cache but do not add to it.
+
+    Copyright (C) 2026  Daniel Boulet
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+import hashlib
+import io
+import os
+import pickle
+import sqlite3
+import time
+
+from pyx import attr, canvas, style, trafo, unit, version
+from pyx import text
+from pyx.dvi import texfont
+
+from .cache import DEFAULT_DIR as CACHE_DIR
+
+DEFAULT_PATH = os.path.join(CACHE_DIR, 'labels', 'labels.sqlite')
+DEFAULT_MAX_BYTES = 50 * 1024 * 1024
+
+# engine keyword arguments that change the typeset result
+ENGINE_KEYS = ['cmd', 'docclass', 'docopt', 'lfs', 'texenc', 'pyxgraphics']
+
+_store = None
+_original_text_pt = None
+
+
+class _Pickler(pickle.Pickler):
+    """
+    stores TeX fonts by name and drops references to running engines
+    """
+
+    def persistent_id(self, obj):
+        if type(obj) is texfont.TeXfont:
+            return ('texfont', obj.name, obj.q, obj.d, obj.tfmconv, obj.pyxconv)
+        if isinstance(obj, (text.SingleEngine, text.MultiEngine)):
+            return ('engine',)
+        return None
+
+
+class _Unpickler(pickle.Unpickler):
+
+    fonts = {}
+
+    def persistent_load(self, pid):
+        if pid[0] == 'engine':
+            return text.defaulttextengine
+        font = self.fonts.get(pid)
+        if font is None:
+            name, q, d, tfmconv, pyxconv = pid[1:]
+            font = self.fonts[pid] = texfont.TeXfont(name, 0, q, d, tfmconv, pyxconv)
+        return font
+
+
+class LabelStore:
+    """
+    sqlite table of pickled label output with least recently used trimming
+    """
+
+    def __init__(self, path=DEFAULT_PATH, max_bytes=DEFAULT_MAX_BYTES):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.max_bytes = max_bytes
+        self.memory = {}
+        self.db = sqlite3.connect(path, timeout=30.0)
+        self.db.execute('CREATE TABLE IF NOT EXISTS labels '
+                        '(key TEXT PRIMARY KEY, data BLOB, used REAL)')
+        self.db.commit()
+
+    def get(self, key):
+        """
+        (extents, items, markers) for key or None
+        """
+        entry = self.memory.get(key)
+        if entry is not None:
+            return entry
+        row = self.db.execute('SELECT data FROM labels WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return None
+        try:
+            entry = _Unpickler(io.BytesIO(row[0])).load()
+        except Exception:
+            return None
+        self.db.execute('UPDATE labels SET used = ? WHERE key = ?', (time.time(), key))
+        self.db.commit()
+        self.memory[key] = entry
+        return entry
+
+    def put(self, key, entry):
+        data = io.BytesIO()
+        try:
+            _Pickler(data, pickle.HIGHEST_PROTOCOL).dump(entry)
+        except Exception:
+            return  # something in the dvi output we cannot store
+        self.memory[key] = entry
+        self.db.execute('INSERT OR REPLACE INTO labels VALUES (?, ?, ?)',
+                        (key, data.getvalue(), time.time()))
+        self.db.commit()
+        self.trim()
+
+    def trim(self):
+        total = self.db.execute('SELECT COALESCE(SUM(LENGTH(data)), 0) FROM labels').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self.db.execute('SELECT key, LENGTH(data) FROM labels '
+                                         'ORDER BY used').fetchall():
+            self.db.execute('DELETE FROM labels WHERE key = ?', (key,))
+            total -= size
+            if total <= self.max_bytes * 0.9:
+                break
+        self.db.commit()
+
+
+def _label_key(engine, expr, singlecharmode):
+    settings = [repr(engine.kwargs.get(key)) for key in ENGINE_KEYS]
+    preambles = [expr for expr, texmessages in engine.preambles]
+    data = repr([engine.cls.__name__, settings, preambles, expr,
+                 singlecharmode, version.version])
+    return hashlib.sha256(data.encode()).hexdigest()
+
+
+def _cached_text_pt(self, x_pt, y_pt, expr, textattrs=[], texmessages=[],
+                    fontmap=None, singlecharmode=False):
+    """
+    MultiEngine.text_pt answering from the label store when possible
+    """
+    if fontmap is not None:
+        return _original_text_pt(self, x_pt, y_pt, expr, textattrs, texmessages,
+                                 fontmap, singlecharmode)
+    # same attribute handling as SingleEngine.text_pt
+    attrs = attr.mergeattrs(textattrs)
+    attr.checkattrs(attrs, [text.textattr, trafo.trafo_pt, style.fillstyle])
+    trafos = attr.getattrs(attrs, [trafo.trafo_pt])
+    fillstyles = attr.getattrs(attrs, [style.fillstyle])
+    expanded = expr.tex if isinstance(expr, text.MultiEngineText) else expr
+    for ta in attr.getattrs(attrs, [text.textattr])[::-1]:
+        expanded = ta.apply(expanded)
+    key = _label_key(self, expanded, singlecharmode)
+
+    entry = _store.get(key)
+    if entry is None:
+        box = _original_text_pt(self, x_pt, y_pt, expr, textattrs, texmessages,
+                                fontmap, singlecharmode)
+        if box._dvicanvas is not None:
+            extents = [unit.topt(length) / unit.scale['x']
+                       for length in [box.left, box.right, box.height, box.depth]]
+            _store.put(key, (extents, box._dvicanvas.items, box._dvicanvas.markers))
+        return box
+
+    extents, items, markers = entry
+    box = text.textextbox_pt(x_pt, y_pt, *extents, do_finish=self.instance.do_finish,
+                             fontmap=fontmap, singlecharmode=singlecharmode,
+                             fillstyles=fillstyles)
+    dvicanvas = canvas.canvas([box.texttrafo] + fillstyles)
+    dvicanvas.items = list(items)
+    dvicanvas.markers = markers
+    box._dvicanvas = dvicanvas
+    for t in trafos:
+        box.reltransform(t)
+    return box
+
+
+def _cached_text(self, x, y, *args, **kwargs):
+    return self.text_pt(unit.topt(x), unit.topt(y), *args, **kwargs)
+
+
+def install(path=DEFAULT_PATH, max_bytes=DEFAULT_MAX_BYTES):
+    """
+    routes all PyX MultiEngine typesetting through the label store at path
+    """
+    global _store, _original_text_pt
+    if _store is not None:
+        return _store
+    _store = LabelStore(path, max_bytes)
+    _original_text_pt = text.MultiEngine.text_pt
+    text.MultiEngine.text_pt = _cached_text_pt
+    text.MultiEngine.text = _cached_text
+    return _store
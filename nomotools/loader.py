@@ -0,0 +1,189 @@
+"""
+    loader.py
+
+    Load the main_params of a nomogram script without rendering it.
+
+    The script is executed with Nomographer replaced by a stub that captures
+    its params, and with pyx.text.set/preamble recorded instead of starting a
+    new LaTeX process, so the caller decides how and where to render.  Its
+    Nomo_Block_Type_5 is nomotools.type5.ScriptBlock, which keeps a grid the
+    script builds for the real build of the same block.
+
+    Copyright (C) 2026  Daniel Boulet
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+import ast
+import builtins
+import os
+import sys
+
+# directories scanned when no script is given on the command line
+SCRIPT_DIRS = ["ghpage_src", "templates", "tutorials", "."]
+
+
+class NomoScript:
+    """
+    main_params of one script plus the text engine settings it asked for
+    """
+
+    def __init__(self, path, main_params, engine, preambles, namespace):
+        self.path = path
+        self.name = os.path.splitext(os.path.basename(path))[0]
+        self.main_params = main_params
+        self.engine = engine  # pyx engine class, None for pyx default
+        self.preambles = preambles  # list of preamble strings
+        self.namespace = namespace  # live module globals of the script
+
+    def engine_key(self):
+        """
+        scripts with equal keys can share one texrunner
+        """
+        return (self.engine, tuple(self.preambles))
+
+
+class _Captured(Exception):
+    pass
+
+
+def _override(tree, overrides, path):
+    """
+    replaces the value of every top level NAME = ... of the names in
+    overrides by a lookup in the _nomo_overrides global
+    """
+    found = set()
+    for node in tree.body:
+        if not isinstance(node, (ast.Assign, ast.AnnAssign)) or node.value is None:
+            continue
+        targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+        names = [t.id for t in targets if isinstance(t, ast.Name) and t.id in overrides]
+        if names:
+            lookup = ast.Subscript(value=ast.Name(id='_nomo_overrides', ctx=ast.Load()),
+                                   slice=ast.Constant(value=names[0]), ctx=ast.Load())
+            node.value = ast.copy_location(lookup, node.value)
+            found.update(names)
+    missing = set(overrides) - found
+    if missing:
+        raise ValueError("%s does not assign %s" % (path, ', '.join(sorted(missing))))
+    return ast.fix_missing_locations(tree)
+
+
+def load_script(path, overrides=None):
+    """
+    executes script at path and returns NomoScript without drawing anything;
+    overrides maps names the script assigns at top level to the values
+    they get instead
+    """
+    # imported here so that discovering scripts stays cheap
+    import pynomo.nomographer
+    import pyx
+    from . import type5
+
+    path = os.path.abspath(path)
+    captured = {}
+    preambles = []
+
+    def capture_nomographer(params, *args, **kwargs):
+        captured['main_params'] = params
+        raise _Captured()
+
+    def record_set(engine=None, cls=None, mode=None, *args, **kwargs):
+        captured['engine'] = engine or cls
+
+    def record_preamble(expr, texmessages=[]):
+        preambles.append(expr)
+
+    with open(path) as f:
+        source = f.read()
+    if overrides:
+        code = compile(_override(ast.parse(source, path), overrides, path), path, 'exec')
+    else:
+        code = compile(source, path, 'exec')
+    namespace = {'__name__': '__main__', '__file__': path,
+                 '__builtins__': builtins, '_nomo_overrides': dict(overrides or {})}
+    saved = (pynomo.nomographer.Nomographer, pynomo.nomographer.Nomo_Block_Type_5,
+             pyx.text.set, pyx.text.preamble, sys.argv, list(sys.path), os.getcwd())
+    pynomo.nomographer.Nomographer = capture_nomographer
+    # a type_5 block the script builds to align with is kept for the build
+    pynomo.nomographer.Nomo_Block_Type_5 = type5.ScriptBlock
+    pyx.text.set = record_set
+    pyx.text.preamble = record_preamble
+    # scripts name their output after sys.argv[0] and expect to run from
+    # their own directory
+    sys.argv = [os.path.basename(path)]
+    sys.path.insert(0, os.path.dirname(path))
+    os.chdir(os.path.dirname(path))
+    try:
+        exec(code, namespace)
+    except _Captured:
+        pass
+    finally:
+        (pynomo.nomographer.Nomographer, pynomo.nomographer.Nomo_Block_Type_5,
+         pyx.text.set, pyx.text.preamble, sys.argv, sys.path[:], cwd) = saved
+        os.chdir(cwd)
+    if 'main_params' not in captured:
+        if 'main_params' not in namespace:
+            raise ValueError("%s does not define main_params" % path)
+        captured['main_params'] = namespace['main_params']
+    return NomoScript(path, captured['main_params'], captured.get('engine'),
+                      preambles, namespace)
+
+
+def is_nomo_script(path):
+    """
+    True if path looks like a script that ends with Nomographer(...)
+    """
+    if not path.endswith('.py') or os.path.basename(path).startswith('_'):
+        return False
+    with open(path) as f:
+        return 'Nomographer(' in f.read()
+
+
+def discover_scripts(paths=None, root=None):
+    """
+    returns sorted list of nomogram scripts found in paths (files or
+    directories, default SCRIPT_DIRS relative to the repository root)
+    """
+    if root is None:
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if not paths:
+        paths = [os.path.join(root, d) for d in SCRIPT_DIRS]
+    scripts = []
+    for p in paths:
+        if os.path.isdir(p):
+            for name in sorted(os.listdir(p)):
+                full = os.path.join(p, name)
+                if os.path.isfile(full) and is_nomo_script(full):
+                    scripts.append(os.path.abspath(full))
+        elif is_nomo_script(p):
+            scripts.append(os.path.abspath(p))
+    return scripts
+
+
+def output_path(script, outdir=None, ext=None):
+    """
+    explicit output file for script, next to it unless outdir is given;
+    the extension follows the script's own filename (tutorials write eps)
+    """
+    if isinstance(script, NomoScript):
+        path = script.path
+        if ext is None:
+            filename = script.main_params.get('filename', '')
+            if isinstance(filename, str):
+                ext = os.path.splitext(filename)[1]
+    else:
+        path = script
+    ext = ext or '.pdf'
+    name = os.path.splitext(os.path.basename(path))[0] + ext
+    return os.path.join(outdir or os.path.dirname(os.path.abspath(path)), name)
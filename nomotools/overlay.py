@@ -0,0 +1,425 @@
+"""
+    overlay.py
+
+    Overlay many measured operating points on a nomogram.
+
+    usage: python -m nomotools.overlay SCRIPT CSV [--mode lines|density] ...
+
+    The CSV is read in chunks.  Every chunk is solved with
+    nomotools.evaluate, and the points where the isopleths cross the axes
+    are computed as arrays from the aligned geometry of
+    nomotools.staged.  In 'lines' mode all isopleths of one style become a
+    single path.  In 'density' mode the crossing points are binned into
+    small cells that are shaded by count, so the output size does not grow
+    with the number of rows.
+
+    CSV columns are matched to axes by tag name (values in the units of
+    the first axis carrying the tag) or by 'BLOCK:POSITION', e.g. '6:0' for
+    the u value of the seventh block; --map renames columns to either.
+
+    Copyright (C) 2026  Daniel Boulet
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+import argparse
+import csv
+import io
+import os
+import sys
+
+import numpy as np
+import pyx
+from pynomo.isopleth import Isopleth_Block
+
+from . import engine, labelcache, sampling, type5
+from .evaluate import Evaluator, call
+from .loader import load_script, output_path
+from .staged import StagedNomographer
+
+CHUNK_ROWS = 50000
+DENSITY_LEVELS = 8
+
+
+def read_chunks(path, columns, style_column=None, chunk_rows=CHUNK_ROWS):
+    """
+    yields ({column: float array}, style list or None) for chunks of the
+    csv at path
+    """
+    with open(path, newline='') as f:
+        reader = csv.DictReader(f)
+        missing = [c for c in list(columns) + [style_column] if c and c not in reader.fieldnames]
+        if missing:
+            raise ValueError("%s has no column(s) %s" % (path, ', '.join(missing)))
+        while True:
+            rows = [row for _, row in zip(range(chunk_rows), reader)]
+            if not rows:
+                return
+            data = {}
+            for column in columns:
+                values = np.empty(len(rows))
+                for i, row in enumerate(rows):
+                    try:
+                        values[i] = float(row[column])
+                    except (TypeError, ValueError):
+                        values[i] = np.nan
+                data[column] = values
+            styles = [row[style_column] for row in rows] if style_column else None
+            yield data, styles
+
+
+def _point(atom, u):
+    return call(atom.give_x, u), call(atom.give_y, u)
+
+
+def _intersect(p, q, a, b):
+    """
+    intersection of lines p-q and a-b, all points as (x, y) of arrays
+    """
+    d1x, d1y = q[0] - p[0], q[1] - p[1]
+    d2x, d2y = b[0] - a[0], b[1] - a[1]
+    with np.errstate(all='ignore'):
+        t = ((a[0] - p[0]) * d2y - (a[1] - p[1]) * d2x) / (d1x * d2y - d1y * d2x)
+    return p[0] + t * d1x, p[1] + t * d1y
+
+
+def _ends(atom):
+    (x0, y0), (x1, y1) = atom.line[0], atom.line[-1]
+    return (x0, y0), (x1, y1)
+
+
+def _farthest_pair(p1, p2, p3):
+    """
+    vectorized Isopleth_Block.find_farthest_pair, as segments (n, 4)
+    """
+    pairs = [(p1, p2), (p1, p3), (p2, p3)]
+    dist = np.array([np.hypot(a[0] - b[0], a[1] - b[1]) for a, b in pairs])
+    segments = np.array([[a[0], a[1], b[0], b[1]] for a, b in pairs])
+    pick = np.argmax(np.nan_to_num(dist, nan=-1.0), axis=0)
+    return np.take_along_axis(segments, pick[None, None, :], axis=0)[0].T
+
+
+class RawPath(pyx.path.path):
+    """
+    many segments, circles or square cells written straight from a numpy
+    array instead of one pyx path item each; only supports being stroked
+    or filled
+    """
+
+    __slots__ = 'kind', 'data', 'size'
+
+    # bezier handle length for a quarter circle
+    _kappa = 0.5522847498
+
+    def __init__(self, kind, data, size=0.0):
+        pyx.path.path.__init__(self)
+        factor = pyx.unit.topt(1)
+        self.kind = kind  # 'segments' (x1, y1, x2, y2), 'circles' or 'cells' (x, y)
+        self.data = np.asarray(data, dtype=float).reshape(-1, 4 if kind == 'segments' else 2) * factor
+        self.size = size * factor  # circle radius or cell width
+
+    def bbox(self):
+        d = self.data
+        if not len(d):
+            return pyx.bbox.empty()
+        if self.kind == 'segments':
+            xs, ys = d[:, 0::2], d[:, 1::2]
+            return pyx.bbox.bbox_pt(xs.min(), ys.min(), xs.max(), ys.max())
+        low = 0.0 if self.kind == 'cells' else self.size
+        high = self.size
+        return pyx.bbox.bbox_pt(d[:, 0].min() - low, d[:, 1].min() - low,
+                                d[:, 0].max() + high, d[:, 1].max() + high)
+
+    def _columns(self, flip=1.0):
+        x, y = self.data[:, 0], flip * self.data[:, 1]
+        r = self.size
+        if self.kind == 'segments':
+            return np.column_stack([x, y, self.data[:, 2], flip * self.data[:, 3]])
+        if self.kind == 'cells':
+            return np.column_stack([x, y])
+        k = self._kappa * r
+        return np.column_stack([x + r, y,
+                                x + r, y + k, x + k, y + r, x, y + r,
+                                x - k, y + r, x - r, y + k, x - r, y,
+                                x - r, y - k, x - k, y - r, x, y - r,
+                                x + k, y - r, x + r, y - k, x + r, y])
+
+    def _write(self, file, fmt, flip=1.0):
+        if len(self.data):
+            buffer = io.StringIO()
+            np.savetxt(buffer, self._columns(flip), fmt=fmt)
+            file.write(buffer.getvalue())
+
+    def outputPDF(self, file, writer):
+        w = '%.3f' % self.size
+        self._write(file, {'segments': '%.3f %.3f m %.3f %.3f l',
+                           'cells': '%.3f %.3f ' + w + ' ' + w + ' re',
+                           'circles': '%.3f %.3f m' + ' %.3f %.3f %.3f %.3f %.3f %.3f c' * 4 + ' h',
+                           }[self.kind])
+
+    def outputPS(self, file, writer):
+        w = '%.3f' % self.size
+        self._write(file, {'segments': '%.3f %.3f moveto %.3f %.3f lineto',
+                           'cells': '%.3f %.3f moveto ' + w + ' 0 rlineto 0 ' + w +
+                                    ' rlineto -' + w + ' 0 rlineto closepath',
+                           'circles': '%.3f %.3f moveto' + ' %.3f %.3f %.3f %.3f %.3f %.3f curveto' * 4
+                                      + ' closepath',
+                           }[self.kind])
+
+    def returnSVGdata(self, inverse_y=True):
+        w = '%.3f' % self.size
+        buffer = io.StringIO()
+        self._write(buffer, {'segments': 'M%.3f %.3fL%.3f %.3f',
+                             'cells': 'M%.3f %.3fh' + w + 'v-' + w + 'h-' + w + 'Z',
+                             'circles': 'M%.3f %.3f' + 'C%.3f %.3f %.3f %.3f %.3f %.3f' * 4 + 'Z',
+                             }[self.kind], -1.0 if inverse_y else 1.0)
+        return buffer.getvalue().replace('\n', '')
+
+
+class Overlay:
+    """
+    isopleth segments and axis crossings of many rows on a computed
+    StagedNomographer
+    """
+
+    def __init__(self, nomo):
+        self.nomo = nomo
+        self.evaluator = Evaluator(nomo.params)
+        self.segments = {}  # style index -> list of (n, 4) arrays
+        self.points = {}  # style index -> list of (n, 2) arrays
+
+    def template(self):
+        return [['x'] * block.size for block in self.evaluator.blocks]
+
+    def position(self, name):
+        """
+        (block, position) addressed by a tag or 'BLOCK:POSITION'
+        """
+        if name in self.evaluator.owner:
+            return self.evaluator.owner[name]
+        try:
+            b, k = [int(part) for part in name.split(':')]
+        except ValueError:
+            raise ValueError("%r is neither a tag nor BLOCK:POSITION" % name)
+        return b, k
+
+    def add(self, columns, style=0):
+        """
+        adds isopleths for {name: array} columns; style is an index into
+        isopleth_params, one per row or for all rows
+        """
+        rows = self.template()
+        for name, values in columns.items():
+            b, k = self.position(name)
+            rows[b][k] = values
+        solved = self.evaluator.solve(rows)
+        n = len(next(iter(columns.values())))
+        style = np.broadcast_to(np.asarray(style), (n,))
+        segments, points = [], []
+        for block, values in zip(self.nomo.blocks, solved):
+            block_type = block.ref_block_params['block_type']
+            values = [np.broadcast_to(v, (n,)) for v in values]
+            if block_type == 'type_5':
+                segs, pts = self._type_5(block, values)
+            else:
+                pts = [_point(block.atom_stack[k], v) for k, v in enumerate(values)]
+                segs = self._lines(block, block_type, pts)  # may add crossings of refs
+            segments.extend(segs)
+            points.extend(pts)
+        for s in np.unique(style):
+            rows_s = style == s
+            for seg in segments:
+                seg = seg[rows_s]
+                self.segments.setdefault(s, []).append(seg[np.all(np.isfinite(seg), axis=1)])
+            for x, y in points:
+                pt = np.column_stack([x[rows_s], y[rows_s]])
+                self.points.setdefault(s, []).append(pt[np.all(np.isfinite(pt), axis=1)])
+
+    def _lines(self, block, block_type, pts):
+        if block_type in ['type_1', 'type_2']:
+            return [_farthest_pair(*pts)]
+        if block_type == 'type_4':
+            ref = _intersect(pts[0], pts[1], pts[2], pts[3])
+            segs = [_farthest_pair(pts[0], pts[1], ref), _farthest_pair(pts[2], pts[3], ref)]
+            pts.append(ref)
+            return segs
+        if block_type == 'type_3':
+            n = len(pts)
+            refs = block.atom_stack[n:n + n - 3]
+            segs = []
+            start = pts[0]
+            for idx, ref in enumerate(refs):
+                point = _intersect(start, pts[idx + 1], *_ends(ref))
+                segs.append(_farthest_pair(start, pts[idx + 1], point))
+                pts.append(point)
+                start = point
+            segs.append(_farthest_pair(start, pts[n - 2], pts[n - 1]))
+            return segs
+        return []  # type_8: crossing point only
+
+    def _type_5(self, block, values):
+        u, v, wd = values
+        grid = block.grid_box
+        x_wd = call(grid.params_wd['F'], wd)
+        y_u = call(grid.params_u['G'], u)
+
+        def trafo(x, y):
+            return block._give_trafo_x_(x, y), block._give_trafo_y_(x, y)
+
+        p_u = trafo(call(grid.params_u['F'], u), y_u)
+        p_v = trafo(x_wd, y_u)
+        p_wd = trafo(x_wd, call(grid.params_wd['G'], wd))
+        segs = [np.column_stack(p_u + p_v), np.column_stack(p_v + p_wd)]
+        return segs, [p_u, p_v, p_wd]
+
+    def draw_lines(self, c, styles, circles=False):
+        """
+        one stroked path of segments per style, plus one of circles at
+        the axis crossings if circles is True
+        """
+        parser = Isopleth_Block([], {'isopleth_values': []})
+        for s in sorted(self.segments):
+            p = styles[s % len(styles)]
+            attrs = parser.parse_isopleth_params(p)
+            segs = np.concatenate(self.segments[s])
+            if len(segs):
+                c.stroke(RawPath('segments', segs), attrs)
+            pts = np.concatenate(self.points[s])
+            radius = parser.parse_circle_size(p)
+            if circles and len(pts) and radius > 0:
+                marks = RawPath('circles', np.unique(np.round(pts, 3), axis=0), radius)
+                c.fill(marks, [pyx.color.rgb.white])
+                c.stroke(marks, [attrs[0]])
+
+    def draw_density(self, c, cell=0.1, color=pyx.color.cmyk.Red):
+        """
+        crossing points binned into cells of cell cm, shaded in
+        DENSITY_LEVELS steps of log count, one path per step
+        """
+        pts = [p for s in self.points for p in self.points[s]]
+        if not pts:
+            return
+        pts = np.concatenate(pts)
+        cells, counts = np.unique(np.floor(pts / cell).astype(np.int64), axis=0,
+                                  return_counts=True)
+        level = np.log(counts) / max(np.log(counts.max()), 1e-9)
+        step = np.minimum((level * DENSITY_LEVELS).astype(int), DENSITY_LEVELS - 1)
+        for s in range(DENSITY_LEVELS):
+            chosen = cells[step == s]
+            if len(chosen):
+                opacity = (s + 1.0) / DENSITY_LEVELS
+                c.fill(RawPath('cells', chosen * cell, cell),
+                       [color, pyx.color.transparency(1.0 - opacity)])
+
+
+def overlay(script, csv_path, filename=None, mode='lines', mapping=None, style_column=None,
+            cell=0.1, isopleths=True, circles=False, label_cache=labelcache.DEFAULT_PATH):
+    """
+    draws script with the rows of csv_path overlaid, returns the number
+    of rows read
+    """
+    mapping = mapping or {}
+    sampling.install()
+    type5.install()
+    nomo = StagedNomographer(dict(script.main_params), draw=False)
+    marks = Overlay(nomo)
+    with open(csv_path, newline='') as f:
+        header = next(csv.reader(f))
+    columns = [c for c in header if c in mapping or c in marks.evaluator.owner
+               or c.count(':') == 1]
+    if not columns:
+        raise ValueError("no column of %s names an axis" % csv_path)
+    style_index = {}
+    count = 0
+    for data, styles in read_chunks(csv_path, columns, style_column):
+        if styles is None:
+            style = 0
+        else:
+            style = [style_index.setdefault(name, len(style_index)) for name in styles]
+        marks.add({mapping.get(name, name): values for name, values in data.items()}, style)
+        count += len(next(iter(data.values()))) if data else 0
+    draw(nomo, script, marks, filename or output_path(script), mode, cell, isopleths, circles,
+         label_cache)
+    return count
+
+
+def draw(nomo, script, marks, filename, mode='lines', cell=0.1, isopleths=True, circles=False,
+         label_cache=labelcache.DEFAULT_PATH):
+    """
+    draws the computed nomo of script with the Overlay marks on top; nomo
+    can be drawn again with other marks afterwards
+    """
+    def paint(c):
+        if mode == 'density':
+            marks.draw_density(c, cell)
+        else:
+            marks.draw_lines(c, nomo.params['isopleth_params'], circles)
+
+    draw_on(nomo, script, filename, paint, isopleths, label_cache)
+
+
+def draw_on(nomo, script, filename, paint, isopleths=True, label_cache=labelcache.DEFAULT_PATH):
+    """
+    draws the computed nomo of script with paint(c) called after the
+    script's own post_func
+    """
+    if label_cache:
+        labelcache.install(label_cache)
+    engine.engine_for(script)
+    params = nomo.params
+    post = params['post_func']
+    draw_isopleths = params['draw_isopleths']
+
+    def post_func(c):
+        if post is not None:
+            post(c)
+        paint(c)
+
+    params['post_func'] = post_func
+    params['draw_isopleths'] = draw_isopleths and isopleths
+    try:
+        nomo.draw(filename)
+    finally:
+        params['post_func'] = post
+        params['draw_isopleths'] = draw_isopleths
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m nomotools.overlay',
+                                     description=__doc__.split('\n\n')[1].strip())
+    parser.add_argument('script')
+    parser.add_argument('csv')
+    parser.add_argument('-o', '--output', help='output file (default SCRIPT_overlay.pdf)')
+    parser.add_argument('--mode', choices=['lines', 'density'], default='lines')
+    parser.add_argument('--map', action='append', default=[], metavar='COLUMN=AXIS',
+                        help='read COLUMN as AXIS (tag or BLOCK:POSITION)')
+    parser.add_argument('--style-column', help='rows with equal values share an isopleth style')
+    parser.add_argument('--cell', type=float, default=1.0,
+                        help='density cell size in mm (default 1)')
+    parser.add_argument('--circles', action='store_true',
+                        help='mark axis crossings with circles in lines mode')
+    parser.add_argument('--no-isopleths', action='store_true',
+                        help="leave out the script's own example isopleths")
+    args = parser.parse_args(argv)
+
+    mapping = dict(item.split('=', 1) for item in args.map)
+    script = load_script(args.script)
+    output = args.output or os.path.splitext(output_path(script))[0] + '_overlay.pdf'
+    count = overlay(script, args.csv, output, args.mode, mapping, args.style_column,
+                    args.cell / 10.0, not args.no_isopleths, args.circles)
+    print("%d rows drawn into %s" % (count, output))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,360 @@
+"""
+    resolution.py
+
+    How finely every scale of a nomogram can be read.
+
+    For each axis of a computed nomogram the position on the final paper
+    (after 'scale paper') is sampled over its range, and the length of
+    paper per unit of the value, in mm, is its derivative along the scale.
+    A pencil line of width w mm then covers w / (mm per unit) units: the
+    reading error.  type_5 grids are read along their u lines, so the v
+    values of a grid are worked out the same way over a (u, wd) mesh.
+
+        python -m nomotools.resolution vf_calculator.py
+        python -m nomotools.resolution --pencil 0.3 --json-only vswr.py
+
+    writes SCRIPT_resolution.json with the figures of every scale and
+    SCRIPT_resolution.pdf with the scales shaded from green to red by their
+    relative reading error.  analyse() works on whole arrays, one call per
+    scale, so it is cheap enough to be run on every candidate of a search.
+
+    Copyright (C) 2026  Daniel Boulet
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+import pyx
+
+from . import overlay, sampling, type5
+from .evaluate import Evaluator, call, find_root
+from .export import plain_text
+from .loader import load_script, output_path
+from .overlay import RawPath
+from .staged import StagedNomographer
+
+PENCIL_MM = 0.5
+SAMPLES = 257
+GRID_SAMPLES = 65
+# relative reading errors in percent shaded from green to red, log spaced
+ERROR_RANGE = (0.1, 10.0)
+LEVELS = 8
+HEAT_WIDTH = 0.15  # cm
+HEAT_OPACITY = 0.5
+# values closer to zero than this part of the largest one have no
+# meaningful relative error
+ZERO_FRACTION = 0.01
+# labels are placed on 1-2-5 steps giving about this many per scale
+LABELS = 10
+
+
+def _samples(u_min, u_max, log, n):
+    u_min, u_max = sorted([float(u_min), float(u_max)])
+    if log and u_min > 0:
+        return np.geomspace(u_min, u_max, n)
+    return np.linspace(u_min, u_max, n)
+
+
+def _mm_per_unit(x, y, u, axis=-1):
+    """
+    |d(x, y)/du| in mm for positions in cm, by central differences
+    """
+    with np.errstate(all='ignore'):
+        dx = np.gradient(x, axis=axis)
+        dy = np.gradient(y, axis=axis)
+        du = np.gradient(u, axis=axis)
+        return 10.0 * np.hypot(dx, dy) / np.abs(du)
+
+
+class Resolution:
+    """
+    sampled values u of one scale, their positions x, y on paper in cm and
+    the mm of paper per unit at each; 2d arrays for type_5 grids
+    """
+
+    def __init__(self, kind, block, block_type, params, u, x, y, mm_per_unit):
+        self.kind = kind
+        self.block = block
+        self.block_type = block_type
+        self.title = plain_text(str(params.get('title', '')))
+        self.tag = params.get('tag', 'none')
+        self.log = 'log' in str(params.get('scale_type', ''))
+        self.u, self.x, self.y = u, x, y
+        self.mm_per_unit = mm_per_unit
+
+    def error(self, pencil=PENCIL_MM):
+        """
+        reading error in units for a pencil line of pencil mm
+        """
+        with np.errstate(all='ignore'):
+            return pencil / self.mm_per_unit
+
+    def relative_error(self, pencil=PENCIL_MM):
+        """
+        reading error in percent of the value read, nan near zero
+        """
+        size = np.abs(self.u)
+        with np.errstate(all='ignore'):
+            relative = 100.0 * self.error(pencil) / size
+        return np.where(size >= ZERO_FRACTION * np.nanmax(size), relative, np.nan)
+
+    def label_values(self):
+        """
+        values a scale of this range would label: 1, 2 and 5 per decade on
+        log scales, else a 1-2-5 step giving about LABELS of them
+        """
+        low, high = np.nanmin(self.u), np.nanmax(self.u)
+        if self.log and low > 0:
+            decades = 10.0 ** np.arange(np.floor(np.log10(low)), np.ceil(np.log10(high)) + 1)
+            values = np.outer(decades, [1.0, 2.0, 5.0]).ravel()
+        else:
+            raw = (high - low) / LABELS
+            if not raw > 0:
+                return np.empty(0)
+            step = 10.0 ** np.floor(np.log10(raw))
+            step *= min((m for m in [1.0, 2.0, 5.0, 10.0] if m * step >= raw), default=10.0)
+            values = step * np.arange(np.ceil(low / step), np.floor(high / step) + 1)
+        return values[(values >= low) & (values <= high)]
+
+    def label_spacing(self):
+        """
+        smallest distance in mm between neighbouring label_values() along
+        an axis; nan for grids and scales with fewer than two labels
+        """
+        values = self.label_values() if self.kind == 'axis' else np.empty(0)
+        if len(values) < 2:
+            return np.nan
+        order = np.argsort(self.u)
+        x = np.interp(values, self.u[order], self.x[order])
+        y = np.interp(values, self.u[order], self.y[order])
+        return 10.0 * np.nanmin(np.hypot(np.diff(x), np.diff(y)))
+
+    def report(self, pencil=PENCIL_MM):
+        """
+        JSON-able figures of the scale
+        """
+        def number(value):
+            return float('%.4g' % value) if np.isfinite(value) else None
+
+        mm = np.where(np.isfinite(self.mm_per_unit), self.mm_per_unit, np.nan)
+        error = self.error(pencil)
+        relative = self.relative_error(pencil)
+        finite = np.isfinite(mm)
+        entry = {'kind': self.kind, 'block': self.block, 'type': self.block_type,
+                 'title': self.title, 'tag': self.tag, 'log': self.log,
+                 'u_min': number(np.nanmin(self.u)), 'u_max': number(np.nanmax(self.u))}
+        if self.kind == 'axis':
+            length = np.nansum(np.hypot(np.diff(self.x), np.diff(self.y)))
+            entry['length_mm'] = number(10.0 * length)
+        if finite.any():
+            worst = np.nanargmin(mm)
+            entry.update({
+                'mm_per_unit': {'min': number(mm.flat[worst]), 'median': number(np.nanmedian(mm)),
+                                'max': number(np.nanmax(mm))},
+                'u_at_min': number(self.u.flat[worst]),
+                'error': number(np.nanmax(error)),
+                'relative_error_percent': number(np.nanmax(np.where(np.isfinite(relative),
+                                                                    relative, np.nan))),
+                'label_spacing_mm': number(self.label_spacing())})
+        return entry
+
+
+def _axis(number, block, atom, samples):
+    params = atom.params
+    u = _samples(params['u_min'], params['u_max'], 'log' in str(params.get('scale_type', '')),
+                 samples)
+    x, y = call(atom.give_x, u), call(atom.give_y, u)
+    return Resolution('axis', number, block.ref_block_params['block_type'], params, u, x, y,
+                      _mm_per_unit(x, y, u))
+
+
+def _grid(number, block, evaluated, samples):
+    """
+    v of a type_5 block over a (u, wd) mesh, read along the u lines
+    """
+    p = block.ref_block_params
+    grid = block.grid_box
+    u = _samples(min(p['u_values']), max(p['u_values']),
+                 'log' in str(p.get('u_scale_type', '')), samples)
+    x_min, x_max = evaluated.x_range()
+    wd = call(evaluated.wd_func_inv, np.linspace(x_min, x_max, samples))
+    u, wd = np.meshgrid(u, wd, indexing='ij')
+    v_min, v_max = evaluated.v_range
+    fu = evaluated.scales[0](u)
+    v = find_root(lambda t, x, fu: call(p['v_func'], x, t) - fu, v_min, v_max,
+                  call(evaluated.wd_func, wd), fu)
+    x_grid = call(grid.params_wd['F'], wd)
+    y_grid = call(grid.params_u['G'], u)
+    x, y = block._give_trafo_x_(x_grid, y_grid), block._give_trafo_y_(x_grid, y_grid)
+    params = {'title': p.get('v_title', ''), 'tag': p.get('v_tag', 'none'),
+              'scale_type': p.get('v_scale_type', '')}
+    return Resolution('grid', number, 'type_5', params, v, x, y, _mm_per_unit(x, y, v, axis=1))
+
+
+def analyse(nomo, samples=SAMPLES, grid_samples=GRID_SAMPLES):
+    """
+    Resolution of every read scale of a computed StagedNomographer:
+    reference lines, manual axes and axes without ticks are left out
+    """
+    evaluator = None
+    results = []
+    for number, block in enumerate(nomo.blocks):
+        for atom in block.atom_stack:
+            params = atom.params
+            if (params.get('reference') or str(params.get('scale_type', '')).startswith('manual')
+                    or not (params.get('tick_levels') or params.get('tick_text_levels'))):
+                continue
+            results.append(_axis(number, block, atom, samples))
+        if block.ref_block_params['block_type'] == 'type_5':
+            if evaluator is None:
+                evaluator = Evaluator(nomo.params)
+            results.append(_grid(number, block, evaluator.blocks[number], grid_samples))
+    return results
+
+
+def worst_relative_error(results, pencil=PENCIL_MM):
+    """
+    largest relative reading error in percent over all results
+    """
+    errors = [np.nanmax(np.where(np.isfinite(e), e, np.nan))
+              for e in (r.relative_error(pencil) for r in results) if np.isfinite(e).any()]
+    return max(errors) if errors else np.nan
+
+
+def smallest_label_spacing(results):
+    """
+    smallest label_spacing() in mm over all axes
+    """
+    spacings = [r.label_spacing() for r in results]
+    spacings = [s for s in spacings if np.isfinite(s)]
+    return min(spacings) if spacings else np.nan
+
+
+def report(results, pencil=PENCIL_MM):
+    return {'pencil_mm': pencil, 'scales': [r.report(pencil) for r in results]}
+
+
+def _levels(relative):
+    low, high = np.log10(ERROR_RANGE)
+    with np.errstate(all='ignore'):
+        level = (np.log10(relative) - low) / (high - low)
+    return np.clip(np.floor(level * LEVELS), 0, LEVELS - 1)
+
+
+def _color(level):
+    return pyx.color.gradient.GreenRed.getcolor((level + 0.5) / LEVELS)
+
+
+def heatmap(results, pencil=PENCIL_MM):
+    """
+    paint(c) shading every scale by the level of its relative reading
+    error, one path per level
+    """
+    def paint(c):
+        segments, dots = {}, {}
+        spacing = []
+        for r in results:
+            level = _levels(r.relative_error(pencil))
+            if r.kind == 'axis':
+                # a segment takes the larger error of its ends
+                seg_level = np.fmax(level[:-1], level[1:])
+                segs = np.column_stack([r.x[:-1], r.y[:-1], r.x[1:], r.y[1:]])
+                for s in range(LEVELS):
+                    chosen = segs[seg_level == s]
+                    segments.setdefault(s, []).append(chosen[np.all(np.isfinite(chosen), 1)])
+            else:
+                spacing.append(np.nanmedian(np.hypot(np.diff(r.x, axis=1), np.diff(r.y, axis=1))))
+                pts = np.column_stack([r.x.ravel(), r.y.ravel()])
+                for s in range(LEVELS):
+                    chosen = pts[level.ravel() == s]
+                    dots.setdefault(s, []).append(chosen[np.all(np.isfinite(chosen), 1)])
+        radius = 0.5 * min(spacing) if spacing else 0.0
+        for s in range(LEVELS):
+            attrs = [_color(s), pyx.color.transparency(1.0 - HEAT_OPACITY)]
+            segs = np.concatenate(segments.get(s, [np.empty((0, 4))]))
+            if len(segs):
+                c.stroke(RawPath('segments', segs),
+                         attrs + [pyx.style.linewidth(HEAT_WIDTH), pyx.style.linecap.round])
+            pts = np.concatenate(dots.get(s, [np.empty((0, 2))]))
+            if len(pts) and radius > 0:
+                c.fill(RawPath('circles', pts, radius), attrs)
+        if results:
+            _legend(c, pencil, min(np.nanmin(r.x) for r in results),
+                    min(np.nanmin(r.y) for r in results) - 1.5)
+
+    return paint
+
+
+def _legend(c, pencil, x, y):
+    edges = np.logspace(*np.log10(ERROR_RANGE), LEVELS + 1)
+    c.text(x, y + 0.5, r"reading error for a %g mm pencil line" % pencil, [pyx.text.size.small])
+    for s in range(LEVELS):
+        c.fill(pyx.path.rect(x + 1.5 * s, y, 1.5, 0.3), [_color(s)])
+        c.text(x + 1.5 * s, y - 0.4, r"%.2g\%%" % edges[s], [pyx.text.size.scriptsize])
+
+
+def analyse_script(script, samples=SAMPLES, grid_samples=GRID_SAMPLES):
+    """
+    (computed StagedNomographer, Resolution list) of a loaded script
+    """
+    sampling.install()
+    type5.install()
+    nomo = StagedNomographer(dict(script.main_params), draw=False)
+    return nomo, analyse(nomo, samples, grid_samples)
+
+
+def format_table(results, pencil=PENCIL_MM):
+    lines = ["%-5s %-5s %-30s %12s %12s %10s" % ("block", "kind", "title", "min mm/unit",
+                                                  "at u", "max err %")]
+    for entry in report(results, pencil)['scales']:
+        mm = entry.get('mm_per_unit', {}).get('min')
+        lines.append("%-5d %-5s %-30s %12s %12s %10s"
+                     % (entry['block'], entry['kind'], entry['title'][:30],
+                        '-' if mm is None else '%.4g' % mm,
+                        '-' if entry.get('u_at_min') is None else '%.4g' % entry['u_at_min'],
+                        '-' if entry.get('relative_error_percent') is None
+                        else '%.3g' % entry['relative_error_percent']))
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m nomotools.resolution',
+                                     description=__doc__.split('\n\n')[1].strip())
+    parser.add_argument('script')
+    parser.add_argument('--pencil', type=float, default=PENCIL_MM,
+                        help='pencil line width in mm (default %g)' % PENCIL_MM)
+    parser.add_argument('--samples', type=int, default=SAMPLES,
+                        help='points per axis (default %d)' % SAMPLES)
+    parser.add_argument('-o', '--output', help='heatmap file (default SCRIPT_resolution.pdf)')
+    parser.add_argument('--json-only', action='store_true', help='skip the heatmap')
+    args = parser.parse_args(argv)
+
+    script = load_script(args.script)
+    nomo, results = analyse_script(script, args.samples)
+    base = os.path.splitext(output_path(script))[0] + '_resolution'
+    with open(base + '.json', 'w') as f:
+        json.dump(dict(report(results, args.pencil), script=script.name), f, indent=1)
+    print(format_table(results, args.pencil))
+    if not args.json_only:
+        overlay.draw_on(nomo, script, args.output or base + '.pdf',
+                        heatmap(results, args.pencil), isopleths=False)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,430 @@
+"""
+    sampling.py
+
+    Vectorized sampling of axis lines.
+
+    pynomo walks every axis from u_min to u_max one step at a time,
+    calling the scale functions two or three times per step in pure
+    Python, in Nomo_Atom.calc_line_and_sections (isopleth geometry),
+    Axis_Wrapper (the transformation fit) and Nomo_Axis (the drawn main
+    line).  install() replaces these walks: functions that accept numpy
+    arrays are evaluated on whole arrays, and the lengths and bounding
+    boxes the transformation fit takes of Axis_Wrapper lines are found
+    on those arrays too.  Axis lines on paper (atom lines and drawn main
+    lines) get points only where the curve needs them: an interval is
+    halved until the curve stays within a chord tolerance of its chord,
+    TOLERANCE_MM millimetres on paper by default (set_tolerance() to
+    change, 0 for pynomo's equal arc length spacing).  Atom lines also
+    map values linearly along each chord, so for them the tolerance
+    bounds the distance between the point of a value and its linearly
+    interpolated position.  Reading a value back from a point on an atom
+    line (isopleth.py's interp_xy and friends) projects the point onto
+    the nearest section instead of interpolating in the section with the
+    nearest end point, which was only as accurate as the sections were
+    short.  Functions that only take scalars, or give non-finite values
+    inside the range, go through pynomo's original code unchanged.
+
+    Copyright (C) 2026  Daniel Boulet
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+import math
+import random
+import threading
+
+import numpy as np
+import pyx
+from pynomo import nomo_axis
+from pynomo.isopleth import Isopleth_Block, Isopleth_Block_Type_5
+from pynomo.nomo_axis import Nomo_Axis
+from pynomo.nomo_axis_func import Axis_Wrapper
+from pynomo.nomo_wrapper import Nomo_Atom
+
+PROBES = 7  # points where array and scalar results are compared
+FINE = 2  # a grid cell is refined while longer than 1/FINE section
+SPLIT = 8  # a too long grid cell is split into this many
+ROUNDS = 12  # refinement rounds before giving up
+TOLERANCE_MM = 0.01  # chord tolerance on paper
+MIN_INTERVALS = 16  # start of the adaptive subdivision
+MAX_DEPTH = 30  # halvings of a start interval before giving up
+CHECKS = np.array([0.25, 0.5, 0.75])  # where an interval is compared with its chord
+
+_tolerance = [TOLERANCE_MM / 10.0]  # in paper units (cm)
+
+_originals = {}
+# pynomo's scalar sampling seeds and draws from the shared random module
+_shared_random = threading.RLock()
+
+
+def as_array_func(func, start, stop):
+    """
+    func for numpy arrays of u, or None if func only takes scalars
+    """
+    u = np.linspace(start, stop, PROBES)
+    try:
+        with np.errstate(all='ignore'):
+            values = np.asarray(func(u), dtype=float)
+        scalars = np.array([func(float(x)) for x in u], dtype=float)
+    except Exception:
+        return None
+    if values.shape == ():
+        # ignores u, e.g. lambda u: 0.0
+        value = float(values)
+        if not np.allclose(scalars, value, rtol=1e-12, atol=0.0, equal_nan=True):
+            return None
+        return lambda u: np.full(np.shape(u), value)
+    if values.shape != u.shape or \
+            not np.allclose(values, scalars, rtol=1e-12, atol=1e-300, equal_nan=True):
+        return None
+    return func
+
+
+def _section_length(fx, fy, start, stop, sections, seed):
+    """
+    longest of the chord start-stop and the chords between 100 random pairs
+    (the same pairs pynomo draws), divided by sections
+    """
+    rng = random.Random(seed)
+    pairs = np.array([rng.uniform(start, stop) for dummy in range(200)])
+    u = np.concatenate([[start, stop], pairs])
+    with np.errstate(all='ignore'):
+        x, y = fx(u), fy(u)
+    length = np.hypot(x[0::2] - x[1::2], y[0::2] - y[1::2]).max()
+    return length / sections
+
+
+def arc_samples(f, g, start, stop, sections, seed=0.0, max_step=None):
+    """
+    parameters u between start and stop (both included) whose points
+    (f(u), g(u)) are about one section length apart, with u steps no larger
+    than max_step; returns (u, x, y) arrays or None if f or g only take
+    scalars or are not finite on [start, stop]
+    """
+    if not start < stop:
+        return None
+    fx, fy = as_array_func(f, start, stop), as_array_func(g, start, stop)
+    if fx is None or fy is None:
+        return None
+    with np.errstate(all='ignore'):
+        section_length = _section_length(fx, fy, start, stop, sections, seed)
+        if not (np.isfinite(section_length) and section_length > 0):
+            return None
+        u = np.linspace(start, stop, int(sections) + 1)
+        x, y = fx(u), fy(u)
+        for dummy in range(ROUNDS):
+            if not (np.isfinite(x).all() and np.isfinite(y).all()):
+                return None
+            long_cells = np.nonzero(np.hypot(np.diff(x), np.diff(y)) > section_length / FINE)[0]
+            if len(long_cells) == 0:
+                break
+            steps = np.arange(1, SPLIT) / SPLIT
+            new_u = (u[long_cells, None] +
+                     (u[long_cells + 1] - u[long_cells])[:, None] * steps).ravel()
+            order = np.argsort(np.concatenate([u, new_u]), kind='stable')
+            u = np.concatenate([u, new_u])[order]
+            x = np.concatenate([x, fx(new_u)])[order]
+            y = np.concatenate([y, fy(new_u)])[order]
+        else:
+            return None
+        arc = np.concatenate([[0.0], np.cumsum(np.hypot(np.diff(x), np.diff(y)))])
+        inner = np.interp(np.arange(1, int(arc[-1] / section_length) + 1) * section_length,
+                          arc, u)
+        if max_step is not None:
+            count = int(math.ceil((stop - start) / max_step))
+            inner = np.union1d(inner, np.linspace(start, stop, count + 1))
+        inner = inner[(inner > start) & (inner < stop)]
+        u = np.concatenate([[start], inner, [stop]])
+        x, y = fx(u), fy(u)
+    if not (np.isfinite(x).all() and np.isfinite(y).all()):
+        return None
+    return u, x, y
+
+
+def set_tolerance(tolerance_mm):
+    """
+    chord tolerance of atom and main lines in paper millimetres;
+    0 or None for equal arc length spacing
+    """
+    _tolerance[0] = tolerance_mm / 10.0 if tolerance_mm else None
+
+
+def get_tolerance():
+    """
+    chord tolerance in paper units (cm), None for equal arc length spacing
+    """
+    return _tolerance[0]
+
+
+def adaptive_samples(f, g, start, stop, tolerance, parametric=False):
+    """
+    parameters u between start and stop (both included) such that the
+    curve (f(u), g(u)) stays within tolerance of the polyline through them;
+    with parametric=True the point of every u must also lie within tolerance
+    of its linearly interpolated position on the chord.  Returns (u, x, y)
+    arrays or None as arc_samples does.
+    """
+    if not start < stop:
+        return None
+    fx, fy = as_array_func(f, start, stop), as_array_func(g, start, stop)
+    if fx is None or fy is None:
+        return None
+    with np.errstate(all='ignore'):
+        u = np.linspace(start, stop, MIN_INTERVALS + 1)
+        x, y = fx(u), fy(u)
+        if not (np.isfinite(x).all() and np.isfinite(y).all()):
+            return None
+        done_u, done_x, done_y = [u], [x], [y]
+        a, b = u[:-1], u[1:]
+        xa, ya, xb, yb = x[:-1], y[:-1], x[1:], y[1:]
+        for dummy in range(MAX_DEPTH):
+            # curve at CHECKS of every open interval
+            t = np.tile(CHECKS, len(a))
+            uc = np.repeat(a, len(CHECKS)) + t * np.repeat(b - a, len(CHECKS))
+            xc, yc = fx(uc), fy(uc)
+            if not (np.isfinite(xc).all() and np.isfinite(yc).all()):
+                return None
+            x0, y0 = np.repeat(xa, len(CHECKS)), np.repeat(ya, len(CHECKS))
+            dx, dy = np.repeat(xb - xa, len(CHECKS)), np.repeat(yb - ya, len(CHECKS))
+            if parametric:
+                error = np.hypot(xc - (x0 + t * dx), yc - (y0 + t * dy))
+            else:
+                chord = np.hypot(dx, dy)
+                error = np.where(chord > 0,
+                                 np.abs((xc - x0) * dy - (yc - y0) * dx) / np.where(chord > 0, chord, 1.0),
+                                 np.hypot(xc - x0, yc - y0))
+            split = (error.reshape(-1, len(CHECKS)) > tolerance).any(axis=1)
+            if not split.any():
+                break
+            # the midpoint is CHECKS[1] and already evaluated
+            mid = 1 + len(CHECKS) * np.nonzero(split)[0]
+            um, xm, ym = uc[mid], xc[mid], yc[mid]
+            done_u.append(um)
+            done_x.append(xm)
+            done_y.append(ym)
+            a, b = np.concatenate([a[split], um]), np.concatenate([um, b[split]])
+            xa, ya = np.concatenate([xa[split], xm]), np.concatenate([ya[split], ym])
+            xb, yb = np.concatenate([xm, xb[split]]), np.concatenate([ym, yb[split]])
+        else:
+            return None
+    u = np.concatenate(done_u)
+    order = np.argsort(u, kind='stable')
+    return u[order], np.concatenate(done_x)[order], np.concatenate(done_y)[order]
+
+
+def _atom_line(atom):
+    p = atom.params
+    if p['reference'] == False:
+        start, stop, f, g = p['u_min'], p['u_max'], atom.give_x, atom.give_y
+    else:
+        start, stop, f, g = atom.u_min_ref, atom.u_max_ref, atom.give_x_ref, atom.give_y_ref
+    if start > stop:
+        start, stop = stop, start
+    if _tolerance[0]:
+        return adaptive_samples(f, g, start, stop, _tolerance[0], parametric=True)
+    return arc_samples(f, g, start, stop, 1000.0, seed=0.0, max_step=math.fabs(stop - start) / 100.0)
+
+
+def calc_line_and_sections(self):
+    """
+    Nomo_Atom.calc_line_and_sections on arrays
+    """
+    samples = _atom_line(self)
+    if samples is None:
+        return _originals['calc_line_and_sections'](self)
+    u, x, y = samples
+    # pynomo repeats the first point
+    u, x, y = [a.tolist() for a in (np.insert(u, 0, u[0]), np.insert(x, 0, x[0]),
+                                    np.insert(y, 0, y[0]))]
+    self.value_list = u
+    self.line = list(zip(x, y))
+    self.sections = list(zip(x[1:], y[1:], x[:-1], y[:-1]))
+    self.section_values = list(map(list, zip(u[1:], u[:-1])))
+
+
+def read_value(atom, x, y):
+    """
+    value of the point (x, y) on the line of atom: the point is projected
+    onto the nearest section and the section's values are interpolated
+    """
+    u = np.asarray(atom.value_list, dtype=float)
+    line = np.asarray(atom.line, dtype=float)
+    x0, y0 = line[:-1, 0], line[:-1, 1]
+    dx, dy = np.diff(line[:, 0]), np.diff(line[:, 1])
+    length2 = dx * dx + dy * dy
+    with np.errstate(all='ignore'):
+        t = np.clip(np.where(length2 > 0, ((x - x0) * dx + (y - y0) * dy) / length2, 0.0), 0.0, 1.0)
+    i = np.argmin(np.hypot(x0 + t * dx - x, y0 + t * dy - y))
+    return float(u[i] + t[i] * (u[i + 1] - u[i]))
+
+
+def interp_xy(self, x, y, atom):
+    """
+    Isopleth_Block.interp_xy through read_value
+    """
+    if not hasattr(atom, 'value_list'):
+        return _originals['interp_xy'](self, x, y, atom)
+    return read_value(atom, x, y)
+
+
+def u_x_y_interp(self, x, y):
+    """
+    Isopleth_Block_Type_5.u_x_y_interp through read_value
+    """
+    return read_value(self.nomo_block.atom_u, x, y)
+
+
+def wd_x_y_interp(self, x, y):
+    """
+    Isopleth_Block_Type_5.wd_x_y_interp through read_value
+    """
+    return read_value(self.nomo_block.atom_wd, x, y)
+
+
+def _calculate_points_(self):
+    """
+    Axis_Wrapper._calculate_points_ on arrays
+    """
+    samples = arc_samples(self.f, self.g, self.start, self.stop, self.sections, seed=0.1)
+    if samples is None:
+        self.line_arrays = None
+        with _shared_random:
+            return _originals['_calculate_points_'](self)
+    u, x, y = samples
+    self.line_arrays = np.insert(x, 0, x[0]), np.insert(y, 0, y[0])
+    x, y = self.line_arrays[0].tolist(), self.line_arrays[1].tolist()
+    self.line = list(zip(x, y))
+    self.sections = list(zip(x[2:], y[2:], x[1:-1], y[1:-1]))
+
+
+def _trafo_line(self):
+    """
+    transformed x and y arrays of the line of an Axis_Wrapper sampled by
+    _calculate_points_ above, None if pynomo sampled it
+    """
+    line = getattr(self, 'line_arrays', None)
+    if line is None:
+        return None
+    x, y = line
+    w = self.alpha3 * x + self.beta3 * y + self.gamma3
+    return ((self.alpha1 * x + self.beta1 * y + self.gamma1) / w,
+            (self.alpha2 * x + self.beta2 * y + self.gamma2) / w)
+
+
+def calc_length(self):
+    """
+    Axis_Wrapper.calc_length on arrays
+    """
+    line = _trafo_line(self)
+    if line is None:
+        return _originals['calc_length'](self)
+    x, y = line
+    self.length = float(np.hypot(np.diff(x[1:]), np.diff(y[1:])).sum())
+    return self.length
+
+
+def calc_bound_box(self):
+    """
+    Axis_Wrapper.calc_bound_box on arrays
+    """
+    line = _trafo_line(self)
+    if line is None:
+        return _originals['calc_bound_box'](self)
+    x, y = line
+    x_left, x_right = float(x.min()), float(x.max())
+    y_bottom, y_top = float(y.min()), float(y.max())
+    if x_left == x_right:
+        x_left = x_right - 1e-2 * abs(y_top - y_bottom)
+    if y_top == y_bottom:
+        y_top = y_bottom + 1e-2 * abs(x_left - x_right)
+    self.x_left, self.x_right, self.y_top, self.y_bottom = x_left, x_right, y_top, y_bottom
+    return x_left, x_right, y_bottom, y_top
+
+
+def _main_line_samples(start, stop, f, g, sections):
+    if start > stop:
+        start, stop = stop, start
+    if _tolerance[0]:
+        return adaptive_samples(f, g, start, stop, _tolerance[0])
+    return arc_samples(f, g, start, stop, sections, seed=0.0)
+
+
+def _make_main_line_(self, start, stop, main_line, f, g, sections=350.0):
+    """
+    Nomo_Axis._make_main_line_ on arrays, as a single multilineto
+    """
+    samples = _main_line_samples(start, stop, f, g, sections)
+    if samples is None:
+        with _shared_random:
+            return _originals['_make_main_line_'](self, start, stop, main_line, f, g,
+                                                  sections)
+    u, x, y = samples
+    scale = pyx.unit.topt(1.0)
+    main_line.append(pyx.path.moveto_pt(x[0] * scale, y[0] * scale))
+    points = np.column_stack([np.insert(x, 0, x[0]), np.insert(y, 0, y[0])]) * scale
+    main_line.append(pyx.path.multilineto_pt(points.tolist()))
+
+
+def calc_main_line_coords(start, stop, f, g, sections=350.0):
+    """
+    nomo_axis.calc_main_line_coords on arrays
+    """
+    samples = _main_line_samples(start, stop, f, g, sections)
+    if samples is None:
+        with _shared_random:
+            return _originals['calc_main_line_coords'](start, stop, f, g, sections)
+    u, x, y = samples
+    return list(zip(np.insert(x, 0, x[0]).tolist(), np.insert(y, 0, y[0]).tolist()))
+
+
+def install():
+    """
+    routes pynomo's axis line sampling through the array versions above
+    """
+    if _originals:
+        return
+    _originals['calc_line_and_sections'] = Nomo_Atom.calc_line_and_sections
+    _originals['_calculate_points_'] = Axis_Wrapper._calculate_points_
+    _originals['calc_length'] = Axis_Wrapper.calc_length
+    _originals['calc_bound_box'] = Axis_Wrapper.calc_bound_box
+    _originals['_make_main_line_'] = Nomo_Axis._make_main_line_
+    _originals['calc_main_line_coords'] = nomo_axis.calc_main_line_coords
+    _originals['interp_xy'] = Isopleth_Block.interp_xy
+    _originals['u_x_y_interp'] = Isopleth_Block_Type_5.u_x_y_interp
+    _originals['wd_x_y_interp'] = Isopleth_Block_Type_5.wd_x_y_interp
+    Nomo_Atom.calc_line_and_sections = calc_line_and_sections
+    Axis_Wrapper._calculate_points_ = _calculate_points_
+    Axis_Wrapper.calc_length = calc_length
+    Axis_Wrapper.calc_bound_box = calc_bound_box
+    Isopleth_Block.interp_xy = interp_xy
+    Isopleth_Block_Type_5.u_x_y_interp = u_x_y_interp
+    Isopleth_Block_Type_5.wd_x_y_interp = wd_x_y_interp
+    Nomo_Axis._make_main_line_ = _make_main_line_
+    nomo_axis.calc_main_line_coords = calc_main_line_coords
+
+
+def uninstall():
+    """
+    puts pynomo's scalar sampling back
+    """
+    if not _originals:
+        return
+    Nomo_Atom.calc_line_and_sections = _originals.pop('calc_line_and_sections')
+    Axis_Wrapper._calculate_points_ = _originals.pop('_calculate_points_')
+    Axis_Wrapper.calc_length = _originals.pop('calc_length')
+    Axis_Wrapper.calc_bound_box = _originals.pop('calc_bound_box')
+    Isopleth_Block.interp_xy = _originals.pop('interp_xy')
+    Isopleth_Block_Type_5.u_x_y_interp = _originals.pop('u_x_y_interp')
+    Isopleth_Block_Type_5.wd_x_y_interp = _originals.pop('wd_x_y_interp')
+    Nomo_Axis._make_main_line_ = _originals.pop('_make_main_line_')
+    nomo_axis.calc_main_line_coords = _originals.pop('calc_main_line_coords')
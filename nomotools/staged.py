@@ -0,0 +1,475 @@
+"""
+    staged.py
+
+    Nomographer split into a geometry stage and a drawing stage.
+
+    StagedNomographer builds blocks, aligns them along the tag graph
+    (nomotools.align), finds the transformations and solves the isopleths
+    once; draw() can then be called again with new titles, extra texts or
+    isopleth styles without redoing any of that.
+
+    With workers > 1 the per block work (building each block, the lines
+    the transformation is fitted to and the isopleth lines) runs on a
+    thread pool; alignment, transformations, isopleths and drawing stay
+    serial.
+
+    The computed geometry can be kept in a nomotools.geometry archive, so
+    that a later build of the same definition with other COSMETIC_KEYS
+    only builds the blocks and draws.
+
+    Nomograms that have block params dicts in common can take those blocks
+    from a SharedBlocks built once (see nomotools.cables).
+
+    With 'debug': 'profile' every phase of the build is timed through
+    nomotools.instrument.
+
+    Copyright (C) 2026  Daniel Boulet
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+import concurrent.futures
+import copy
+import os
+import re
+from pprint import pprint
+
+import pyx
+from pynomo.isopleth import Isopleth_Wrapper
+from pynomo.nomo_axis_func import Axes_Wrapper, Axis_Wrapper
+from pynomo.nomo_wrapper import Nomo_Wrapper
+from pynomo.nomo_wrapper import Nomo_Block_Type_1
+from pynomo.nomo_wrapper import Nomo_Block_Type_2
+from pynomo.nomo_wrapper import Nomo_Block_Type_3
+from pynomo.nomo_wrapper import Nomo_Block_Type_4
+from pynomo.nomo_wrapper import Nomo_Block_Type_5
+from pynomo.nomo_wrapper import Nomo_Block_Type_6
+from pynomo.nomo_wrapper import Nomo_Block_Type_7
+from pynomo.nomo_wrapper import Nomo_Block_Type_8
+from pynomo.nomo_wrapper import Nomo_Block_Type_9
+from pynomo.nomo_wrapper import Nomo_Block_Type_10
+from pynomo.nomographer import Nomographer
+
+from .align import align_blocks
+from .instrument import Instrument, phase, profile_requested
+
+# main params that are only drawn on top of the finished geometry
+COSMETIC_KEYS = ['title_str', 'title_x', 'title_y', 'title_color', 'title_box_width',
+                 'extra_texts', 'isopleth_params', 'make_grid', 'draw_lines',
+                 'line_params', 'pre_func', 'post_func', 'debug']
+
+
+class SharedBlocks:
+    """
+    blocks of block params dicts that several nomograms have in common.
+    The first StagedNomographer(..., shared=...) holding one of these very
+    dicts in its block_params builds the block; later ones take it back in
+    the state it was built in, and also reuse the lines the paper
+    transformation is fitted to while the block is aligned as before.
+    Blocks are changed by every build, so one nomogram at a time uses them.
+    """
+
+    def __init__(self, block_params):
+        self.block_params = list(block_params)  # keeps the ids below in use
+        self.ids = set(id(p) for p in self.block_params)
+        # pynomo writes the solutions over the 'x' of isopleth_values
+        self.isopleth_values = {id(p): copy.deepcopy(p['isopleth_values'])
+                                for p in self.block_params if 'isopleth_values' in p}
+        self.blocks = {}  # id -> (block, its trafo_stack when built)
+        self._axes = {}  # id -> (block trafo when aligned, Axis_Wrapper list)
+
+    def take(self, block_para):
+        """
+        shared block of block_para as it was built, None if there is none
+        """
+        entry = self.blocks.get(id(block_para))
+        if entry is None:
+            return None
+        block, trafo_stack = entry
+        if id(block_para) in self.isopleth_values:
+            block_para['isopleth_values'] = copy.deepcopy(self.isopleth_values[id(block_para)])
+        block.trafo_stack = list(trafo_stack)
+        block._calculate_total_trafo_mat_()
+        block.aligned = False
+        return block
+
+    def keep(self, block_para, block):
+        """
+        remembers block, just built, if block_para is shared
+        """
+        if id(block_para) in self.ids:
+            self.blocks[id(block_para)] = (block, list(block.trafo_stack))
+
+    def axes(self, block, make):
+        """
+        make(block), unless block is shared and was aligned to the same
+        place when the last list was made
+        """
+        key = id(block.ref_block_params)
+        if key not in self.ids:
+            return make(block)
+        trafo = (block.alpha1, block.beta1, block.gamma1, block.alpha2, block.beta2,
+                 block.gamma2, block.alpha3, block.beta3, block.gamma3)
+        cached = self._axes.get(key)
+        if cached is None or cached[0] != trafo:
+            cached = (trafo, make(block))
+            self._axes[key] = cached
+        return cached[1]
+
+
+class StagedNomographer(Nomographer):
+    """
+    same result as Nomographer(params), but keeps the computed geometry
+    so that restyle() only redraws
+    """
+
+    def __init__(self, params, draw=True, instrument=None, workers=1, geometry=None,
+                 shared=None):
+        """
+        instrument: nomotools.instrument.Instrument to record the build in;
+        the caller reports it.  Without one, 'debug': 'profile' makes and
+        writes its own.
+        workers: threads computing blocks side by side; a profiled build
+        always runs on one so that its phases can be timed.
+        geometry: nomotools.geometry.GeometryFile the geometry is taken
+        from if it holds one, and saved to otherwise
+        shared: SharedBlocks to take blocks from
+        """
+        self.params = params
+        self.instrument = instrument
+        self.workers = workers
+        self.geometry = geometry
+        self.shared = shared
+        report = False
+        if instrument is None and profile_requested(params):
+            self.instrument = Instrument()
+            report = draw
+        if self.instrument is not None:
+            self.instrument.start()
+            self.instrument.wrap_functions(params['block_params'])
+        try:
+            self.compute()
+            if draw:
+                self.draw()
+        finally:
+            if self.instrument is not None:
+                self.instrument.stop()
+        if report:
+            self.write_profile()
+        for block_para in params['block_params']:
+            if block_para.get('debug'):
+                print("##### SINGLE BLOCK PARAMS #######")
+                pprint(block_para)
+        if params['debug'] is True:
+            print("##### MAIN PARAMS #######")
+            pprint(params)
+
+    def write_profile(self, filename=None):
+        """
+        prints the profile table and writes it as JSON, by default next to
+        the (first) output file
+        """
+        if filename is None:
+            output = self.wrapper.filename
+            if isinstance(output, list):
+                output = output[0]
+            filename = os.path.splitext(output)[0] + '.profile.json'
+        print(self.instrument.format_table())
+        self.instrument.write_json(filename)
+        return filename
+
+    def _make_block_(self, p):
+        """
+        block of p['block_type'] built the way Nomographer builds it
+        """
+        block_type = p['block_type']
+        if block_type in ['type_1', 'type_2', 'type_7', 'type_10']:
+            getattr(self, '_check_block_%s_params_' % block_type)(p)
+            block = {'type_1': Nomo_Block_Type_1, 'type_2': Nomo_Block_Type_2,
+                     'type_7': Nomo_Block_Type_7, 'type_10': Nomo_Block_Type_10,
+                     }[block_type](mirror_x=p['mirror_x'], mirror_y=p['mirror_y'])
+            for name in ['f1_params', 'f2_params', 'f3_params']:
+                self._check_axis_params_(p[name])
+            block.define_F1(p['f1_params'])
+            block.define_F2(p['f2_params'])
+            block.define_F3(p['f3_params'])
+            if block_type == 'type_1':
+                block.set_block(width=p['width'], height=p['height'],
+                                proportion=p['proportion'])
+            elif block_type == 'type_7':
+                block.set_block(width_1=p['width_1'], angle_u=p['angle_u'],
+                                angle_v=p['angle_v'])
+            else:
+                block.set_block(width=p['width'], height=p['height'])
+        elif block_type == 'type_3':
+            self._check_block_type_3_params_(p)
+            block = Nomo_Block_Type_3(mirror_x=p['mirror_x'], mirror_y=p['mirror_y'])
+            for axis_params in p['f_params']:
+                self._check_axis_params_(axis_params)
+                block.add_F(axis_params)
+            block.set_block(width=p['width'], height=p['height'],
+                            reference_padding=p['reference_padding'],
+                            reference_titles=p['reference_titles'],
+                            reference_color=p['reference_color'])
+        elif block_type == 'type_4':
+            self._check_block_type_4_params_(p)
+            block = Nomo_Block_Type_4(mirror_x=p['mirror_x'], mirror_y=p['mirror_y'])
+            for name in ['f1_params', 'f2_params', 'f3_params', 'f4_params']:
+                self._check_axis_params_(p[name])
+            block.define_F1(p['f1_params'])
+            block.define_F2(p['f2_params'])
+            block.define_F3(p['f3_params'])
+            block.define_F4(p['f4_params'])
+            block.set_block(width=p['width'], height=p['height'],
+                            float_axis=p['float_axis'], padding=p['padding'],
+                            reference_color=p['reference_color'])
+        elif block_type == 'type_5':
+            self._check_block_type_5_params_(p)
+            block = Nomo_Block_Type_5(mirror_x=p['mirror_x'], mirror_y=p['mirror_y'])
+            block.define_block(p)
+            block.set_block()
+        elif block_type == 'type_6':
+            self._check_block_type_6_params_(p)
+            block = Nomo_Block_Type_6(mirror_x=p['mirror_x'], mirror_y=p['mirror_y'])
+            block.define(params1=p['f1_params'], params2=p['f2_params'])
+            block.set_block(width=p['width'], height=p['height'], type=p['type'],
+                            x_empty=p['x_empty'], y_empty=p['y_empty'],
+                            curve_const=p['curve_const'],
+                            ladder_color=p['ladder_color'])
+        elif block_type == 'type_8':
+            self._check_block_type_8_params_(p)
+            block = Nomo_Block_Type_8(mirror_x=p['mirror_x'], mirror_y=p['mirror_y'])
+            self._check_axis_params_(p['f_params'])
+            block.define_F(p['f_params'])
+            block.set_block(length=p['length'])
+        elif block_type == 'type_9':
+            self._check_block_type_9_params_(p)
+            block = Nomo_Block_Type_9(mirror_x=p['mirror_x'], mirror_y=p['mirror_y'])
+            for name in ['f1_params', 'f2_params', 'f3_params']:
+                self._check_axis_params_(p[name])
+            block.define_determinant(p['f1_params'], p['f2_params'], p['f3_params'],
+                                     transform_ini=p['transform_ini'])
+            block.set_block(width=p['width'], height=p['height'],
+                            ignore_transforms=p['ignore_transforms'])
+        else:
+            raise ValueError("unknown block_type %r" % block_type)
+        block.ref_block_params = p
+        return block
+
+    def _block_axes_(self, block):
+        """
+        Axis_Wrapper list of block, as Nomo_Wrapper.build_axes_wrapper
+        makes it
+        """
+        axes = []
+        for atom in block.atom_stack:
+            if atom.params['reference']:
+                axes.append(Axis_Wrapper(atom.give_x_ref, atom.give_y_ref,
+                                         atom.u_min_ref, atom.u_max_ref))
+            elif atom.params['grid']:
+                u0, u1 = atom.params['u_start'], atom.params['u_stop']
+                v0, v1 = atom.params['v_start'], atom.params['v_stop']
+                # bound now: the wrappers evaluate them again after this loop
+                for v in [v0, v1]:
+                    axes.append(Axis_Wrapper(lambda u, atom=atom, v=v: atom.give_x_grid(u, v),
+                                             lambda u, atom=atom, v=v: atom.give_y_grid(u, v),
+                                             u0, u1))
+                for u in [u0, u1]:
+                    axes.append(Axis_Wrapper(lambda v, atom=atom, u=u: atom.give_x_grid(u, v),
+                                             lambda v, atom=atom, u=u: atom.give_y_grid(u, v),
+                                             v0, v1))
+            else:
+                axes.append(Axis_Wrapper(atom.give_x, atom.give_y,
+                                         atom.params['u_min'], atom.params['u_max']))
+                for extra_axis in atom.params['extra_params']:
+                    axes.append(Axis_Wrapper(atom.give_x, atom.give_y,
+                                             extra_axis['u_min'], extra_axis['u_max']))
+        return axes
+
+    def _map_(self, pool, func, *iterables):
+        """
+        list(map(func, *iterables)), on pool unless it is None
+        """
+        if pool is None:
+            return list(map(func, *iterables))
+        return list(pool.map(func, *iterables))
+
+    def compute(self):
+        """
+        blocks, alignment, transformations and isopleth solutions
+        """
+        params = self.params
+        instrument = self.instrument
+        with phase(instrument, 'check params'):
+            self._check_params_(params)
+            wrapper = Nomo_Wrapper(params=params,
+                                   paper_width=params['paper_width'],
+                                   paper_height=params['paper_height'],
+                                   filename=params['filename'])
+            isopleths = Isopleth_Wrapper(params)
+        self.wrapper = wrapper
+        self.isopleths = isopleths
+        pool = None
+        if self.workers > 1 and instrument is None and len(params['block_params']) > 1:
+            pool = concurrent.futures.ThreadPoolExecutor(self.workers)
+        try:
+            self._compute_(params, wrapper, isopleths, pool)
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+    def _compute_(self, params, wrapper, isopleths, pool):
+        instrument = self.instrument
+        shared = self.shared
+        saved = False
+        if self.geometry is not None:
+            with phase(instrument, 'load geometry'):
+                saved = self.geometry.load()
+                if saved:
+                    self.geometry.preset(params['block_params'])
+
+        def build(number, block_para):
+            with phase(instrument, 'build %s' % block_para.get('block_type'), number):
+                block = shared.take(block_para) if shared is not None else None
+                if block is None:
+                    block = self._make_block_(block_para)
+                    if shared is not None:
+                        shared.keep(block_para, block)
+                return block
+
+        def block_axes(block):
+            if shared is None:
+                return self._block_axes_(block)
+            return shared.axes(block, self._block_axes_)
+
+        def sample_lines(number, block):
+            with phase(instrument, 'sample lines', number):
+                for atom in block.atom_stack:
+                    atom.calc_line_and_sections()
+
+        self.blocks = self._map_(pool, build, range(len(params['block_params'])),
+                                 params['block_params'])
+        for block, block_para in zip(self.blocks, params['block_params']):
+            wrapper.add_block(block)
+            isopleths.add_isopleth_block(block, block_para)
+        if saved:
+            with phase(instrument, 'restore geometry'):
+                restored = self.geometry.restore(self)
+            if restored:
+                self.alignment = None
+                return
+        with phase(instrument, 'align blocks'):
+            self.alignment = align_blocks(wrapper)
+        with phase(instrument, 'axes wrapper'):
+            if pool is None and shared is None:
+                wrapper.build_axes_wrapper()
+            else:
+                wrapper.axes_wrapper = Axes_Wrapper(paper_width=wrapper.paper_width,
+                                                    paper_height=wrapper.paper_height)
+                for axes in self._map_(pool, block_axes, wrapper.block_stack):
+                    for axis in axes:
+                        wrapper.axes_wrapper.add_axis(axis)
+        with phase(instrument, 'transformations'):
+            for trafo in params['transformations']:
+                if len(trafo) > 1:
+                    wrapper.do_transformation(method=trafo[0], params=trafo[1])
+                else:
+                    wrapper.do_transformation(method=trafo[0])
+        self._map_(pool, sample_lines, range(len(self.blocks)), self.blocks)
+        if params['draw_isopleths']:
+            with phase(instrument, 'solve isopleths'):
+                isopleths._solve_()
+        if self.geometry is not None:
+            with phase(instrument, 'save geometry'):
+                self.geometry.save(self)
+
+    def draw(self, filename=None):
+        """
+        draws the computed nomogram into filename (default params['filename'])
+        """
+        instrument = self.instrument
+        wrapper = self.wrapper
+        c = pyx.canvas.canvas()
+        if instrument is not None:
+            c.settextengine(instrument.timed_engine(c.textengine))
+        self.paint(c)
+        wrapper.filename = filename or self.params['filename']
+        with phase(instrument, 'write'):
+            filenames = wrapper.filename
+            if not isinstance(filenames, list):
+                filenames = [filenames]
+            for filename_this in filenames:
+                if re.search(r"\.eps$", filename_this):
+                    c.writeEPSfile(filename_this)
+                elif re.search(r"\.svg$", filename_this):
+                    c.writeSVGfile(filename_this)
+                else:
+                    c.writePDFfile(filename_this)
+        self.canvas = c
+
+    def paint(self, c):
+        """
+        draws the computed nomogram onto canvas c; anything with pyx's
+        stroke, fill and text methods will do (see nomotools.export)
+        """
+        params = self.params
+        instrument = self.instrument
+        wrapper = self.wrapper
+        with phase(instrument, 'background'):
+            if params['make_grid']:
+                self._make_grid_(params, c)
+            if params['pre_func'] is not None:
+                params['pre_func'](c)
+            if params['draw_lines']:
+                self._draw_lines_(params, c)
+        if params['draw_isopleths']:
+            with phase(instrument, 'draw isopleths'):
+                for isopleth in self.isopleths.isopleth_list:
+                    isopleth.draw(c, params['isopleth_params'])
+        # Nomo_Wrapper.draw_nomogram one step at a time
+        for number, block in enumerate(wrapper.block_stack):
+            with phase(instrument, 'draw axes and ticks', number):
+                block.draw(c)
+        with phase(instrument, 'titles'):
+            wrapper._draw_title_(c)
+            wrapper._draw_extra_texts_(c)
+            if params['post_func'] is not None:
+                params['post_func'](c)
+
+    def restyle(self, params, filename=None):
+        """
+        takes the COSMETIC_KEYS of params and draws again; the rest of
+        params must describe the same geometry as before
+        """
+        defaults = Nomo_Wrapper(paper_width=self.params['paper_width'],
+                                paper_height=self.params['paper_height']).params
+        self._check_params_(defaults)
+        for key in COSMETIC_KEYS:
+            if key in params:
+                value = params[key]
+            else:
+                value = defaults.get(key)
+            self.params[key] = value
+            self.wrapper.params[key] = value
+        self.isopleths.nomographer_params = self.params['isopleth_params']
+        self.instrument = None
+        if profile_requested(self.params):
+            self.instrument = Instrument()
+            self.instrument.start()
+        try:
+            self.draw(filename)
+        finally:
+            if self.instrument is not None:
+                self.instrument.stop()
+        if self.instrument is not None:
+            self.write_profile()
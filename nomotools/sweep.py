@@ -0,0 +1,265 @@
+"""
+    sweep.py
+
+    Search script parameters and paper sizes for the most readable nomogram.
+
+    Each candidate is the script with some of its top level names set to
+    other values (nomotools.loader overrides), optionally on another paper
+    size, computed without drawing and scored with nomotools.resolution:
+    the worst relative reading error of a pencil line and the tightest
+    spacing of labels on 1-2-5 steps, each against a target.  The score is
+    the smaller of the two ratios, so a candidate is only as good as its
+    least readable scale.  No LaTeX runs until the best candidate is drawn.
+
+    The script is loaded once per set of overrides, and its paper sizes
+    take the blocks and axes built for the first one (staged.SharedBlocks),
+    so that only the fit to paper, the atom lines and the isopleths are
+    redone.  Other overrides change the scale functions themselves, so
+    their blocks are built again.
+
+        python -m nomotools.sweep vf_calculator.py --set scalingFactor=0.5:3:26
+        python -m nomotools.sweep vf_calculator.py --set scalingFactor=1,2,3 \\
+            --paper 20x28 --paper 28x20 -j 8 --no-render
+
+    Copyright (C) 2026  Daniel Boulet
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+import argparse
+import concurrent.futures
+import itertools
+import multiprocessing
+import os
+import sys
+import time
+
+import numpy as np
+
+from . import batch, labelcache, resolution, sampling, type5
+from .loader import load_script, output_path
+from .staged import SharedBlocks, StagedNomographer
+
+# a scale meets the targets with at most this relative reading error in
+# percent and at least this much paper between neighbouring labels in mm
+TARGET_ERROR = 1.0
+TARGET_SPACING = 5.0
+
+
+def parse_set(text):
+    """
+    (name, values) of NAME=v1,v2,... or NAME=start:stop:count
+    """
+    name, _, spec = text.partition('=')
+    if not name or not spec:
+        raise ValueError("expected NAME=VALUES, got %r" % text)
+    if ':' in spec:
+        start, stop, count = spec.split(':')
+        return name, [float(v) for v in np.linspace(float(start), float(stop), int(count))]
+    values = []
+    for item in spec.split(','):
+        try:
+            values.append(int(item))
+        except ValueError:
+            values.append(float(item))
+    return name, values
+
+
+def parse_paper(text):
+    """
+    (width, height) in cm of WIDTHxHEIGHT
+    """
+    width, _, height = text.lower().partition('x')
+    return float(width), float(height)
+
+
+def candidates(sets, papers=None):
+    """
+    every combination of the (name, values) sets and papers as
+    (overrides, paper or None) pairs, the papers of one set of overrides
+    next to each other
+    """
+    names = [name for name, _ in sets]
+    combos = itertools.product(*[values for _, values in sets])
+    return [(dict(zip(names, combo)), paper)
+            for combo, paper in itertools.product(list(combos), papers or [None])]
+
+
+def load_candidate(path, overrides, paper=None):
+    """
+    NomoScript of path with overrides, on paper (width, height) if given
+    """
+    script = load_script(path, overrides)
+    if paper is not None:
+        script.main_params['paper_width'], script.main_params['paper_height'] = paper
+    return script
+
+
+def score(results, pencil=resolution.PENCIL_MM, target_error=TARGET_ERROR,
+          target_spacing=TARGET_SPACING):
+    """
+    (score, worst relative error %, smallest label spacing mm) of the
+    resolution.analyse results of a candidate; nan figures are left out
+    """
+    error = resolution.worst_relative_error(results, pencil)
+    spacing = resolution.smallest_label_spacing(results)
+    ratios = [r for r in [target_error / error, spacing / target_spacing] if np.isfinite(r)]
+    return (min(ratios) if ratios else np.nan), error, spacing
+
+
+def _entry(overrides, paper):
+    return {'overrides': overrides, 'paper': paper, 'score': np.nan, 'error': np.nan,
+            'spacing': np.nan, 'failure': None}
+
+
+def _failure(e):
+    return "%s: %s" % (type(e).__name__, e)
+
+
+def evaluate(path, overrides, papers=(None,), pencil=resolution.PENCIL_MM,
+             target_error=TARGET_ERROR, target_spacing=TARGET_SPACING):
+    """
+    worker: figures of the candidates of one set of overrides, one dict per
+    paper of papers, 'failure' set if it could not be computed; the script
+    is loaded once and its blocks are shared between the papers
+    """
+    start = time.perf_counter()
+    entries = [_entry(overrides, paper) for paper in papers]
+    try:
+        script = load_script(path, overrides)
+    except Exception as e:
+        for entry in entries:
+            entry['failure'] = _failure(e)
+            entry['ms'] = 1000.0 * (time.perf_counter() - start)
+        return entries
+    shared = SharedBlocks(script.main_params['block_params']) if len(papers) > 1 else None
+    for entry in entries:
+        try:
+            params = dict(script.main_params)
+            if entry['paper'] is not None:
+                params['paper_width'], params['paper_height'] = entry['paper']
+            nomo = StagedNomographer(params, draw=False, shared=shared)
+            entry['score'], entry['error'], entry['spacing'] = score(
+                resolution.analyse(nomo), pencil, target_error, target_spacing)
+        except Exception as e:
+            entry['failure'] = _failure(e)
+        # the first paper also pays for loading the script
+        entry['ms'] = 1000.0 * (time.perf_counter() - start)
+        start = time.perf_counter()
+    return entries
+
+
+def _init_worker():
+    sampling.install()
+    type5.install()
+
+
+def sweep(path, candidates, jobs=None, pencil=resolution.PENCIL_MM,
+          target_error=TARGET_ERROR, target_spacing=TARGET_SPACING):
+    """
+    evaluates (overrides, paper) candidates of the script at path on jobs
+    worker processes, one set of overrides with all its papers per task;
+    returns their figures, best first
+    """
+    path = os.path.abspath(path)
+    args = (pencil, target_error, target_spacing)
+    groups = [(overrides, tuple(paper for _, paper in group))
+              for overrides, group in itertools.groupby(candidates, key=lambda c: c[0])]
+    if jobs == 1 or len(groups) < 2:
+        _init_worker()
+        results = [evaluate(path, overrides, papers, *args) for overrides, papers in groups]
+    else:
+        context = None
+        if 'fork' in multiprocessing.get_all_start_methods():
+            context = multiprocessing.get_context('fork')
+        with concurrent.futures.ProcessPoolExecutor(max_workers=jobs, mp_context=context,
+                                                    initializer=_init_worker) as pool:
+            futures = [pool.submit(evaluate, path, overrides, papers, *args)
+                       for overrides, papers in groups]
+            results = [future.result() for future in futures]
+    entries = [entry for result in results for entry in result]
+    return sorted(entries, key=lambda e: -np.nan_to_num(e['score'], nan=-np.inf))
+
+
+def render_best(path, entry, filename=None, label_cache=labelcache.DEFAULT_PATH):
+    """
+    draws the candidate entry of the script at path, returns the file name
+    """
+    script = load_candidate(path, entry['overrides'], entry['paper'])
+    filename = filename or os.path.splitext(output_path(script))[0] + '_best.pdf'
+    batch.render(script, filename, label_cache)
+    return filename
+
+
+def _describe(entry):
+    text = ' '.join('%s=%g' % item if isinstance(item[1], (int, float)) else '%s=%r' % item
+                    for item in sorted(entry['overrides'].items()))
+    if entry['paper'] is not None:
+        text += ' paper=%gx%g' % entry['paper']
+    return text or '(script as is)'
+
+
+def format_table(entries, limit=None):
+    lines = ["%-40s %8s %10s %10s %8s" % ("candidate", "score", "max err %", "labels mm", "ms")]
+    for entry in entries[:limit]:
+        if entry['failure']:
+            lines.append("%-40s FAILED: %s" % (_describe(entry), entry['failure']))
+            continue
+        lines.append("%-40s %8.3f %10.3g %10.3g %8.1f"
+                     % (_describe(entry), entry['score'], entry['error'], entry['spacing'],
+                        entry['ms']))
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m nomotools.sweep',
+                                     description=__doc__.split('\n\n')[1].strip())
+    parser.add_argument('script')
+    parser.add_argument('--set', action='append', default=[], metavar='NAME=VALUES',
+                        help='values of a top level name of the script: v1,v2,... or '
+                             'start:stop:count; every combination is tried')
+    parser.add_argument('--paper', action='append', default=[], metavar='WxH',
+                        help='paper size in cm to try, may be repeated')
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count(),
+                        help='worker processes (default: all cores)')
+    parser.add_argument('--pencil', type=float, default=resolution.PENCIL_MM,
+                        help='pencil line width in mm (default %g)' % resolution.PENCIL_MM)
+    parser.add_argument('--target-error', type=float, default=TARGET_ERROR,
+                        help='relative reading error aimed for, in %% (default %g)'
+                             % TARGET_ERROR)
+    parser.add_argument('--target-spacing', type=float, default=TARGET_SPACING,
+                        help='label spacing aimed for, in mm (default %g)' % TARGET_SPACING)
+    parser.add_argument('--top', type=int, default=10, help='candidates listed (default 10)')
+    parser.add_argument('-o', '--output', help='file for the best candidate '
+                                               '(default SCRIPT_best.pdf)')
+    parser.add_argument('--no-render', action='store_true', help='do not draw the best one')
+    args = parser.parse_args(argv)
+
+    sets = [parse_set(text) for text in args.set]
+    papers = [parse_paper(text) for text in args.paper]
+    start = time.perf_counter()
+    entries = sweep(args.script, candidates(sets, papers), args.jobs, args.pencil,
+                    args.target_error, args.target_spacing)
+    print(format_table(entries, args.top))
+    print("%d candidates in %.2fs" % (len(entries), time.perf_counter() - start))
+    best = entries[0]
+    if best['failure'] or not np.isfinite(best['score']):
+        print("no candidate could be scored")
+        return 1
+    if not args.no_render:
+        print("best: %s -> %s" % (_describe(best), render_best(args.script, best, args.output)))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,128 @@
+"""
+    texformat.py
+
+    Precompiled LaTeX formats for the preambles used by the scripts.
+
+    Every LaTeX start re-reads the article class and whatever the script adds
+    (vf_calculator.py loads the array package).  The first time a preamble is
+    seen it is dumped once with 'latex -ini' into .nomocache/formats/; later
+    engines start from that .fmt and skip the class and preamble entirely.
+    The format name is a hash of the preamble, document class and LaTeX/PyX
+    versions, so any change there produces a fresh format.
+
+    Copyright (C) 2026  Daniel Boulet
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+import hashlib
+import os
+import subprocess
+
+from pyx import config, text, version
+
+from .cache import DEFAULT_DIR as CACHE_DIR, tool_versions
+
+DEFAULT_DIR = os.path.join(CACHE_DIR, 'formats')
+
+# same LaTeX command PyX would use
+LATEX = config.getlist("text", "latex", ["latex"])
+
+
+def _format_source(preambles, docclass, docopt, directory):
+    # the graphics driver hack of SingleLatexEngine.do_start, pointing at a
+    # copy of pyx.def that lives as long as the format
+    lines = [r"\makeatletter",
+             r"\let\saveProcessOptions=\ProcessOptions",
+             r"\def\ProcessOptions{%",
+             r"\def\Gin@driver{" + directory.replace(os.sep, "/") + "/pyx.def}%",
+             r"\def\c@lor@namefile{dvipsnam.def}%",
+             r"\saveProcessOptions}",
+             r"\makeatother"]
+    if docopt is not None:
+        lines.append(r"\documentclass[%s]{%s}" % (docopt, docclass))
+    else:
+        lines.append(r"\documentclass{%s}" % docclass)
+    lines.extend(preambles)
+    lines.append(r"\dump")
+    return "\n".join(lines) + "\n"
+
+
+def format_for(preambles=(), docclass='article', docopt=None, directory=DEFAULT_DIR):
+    """
+    path of the .fmt for preambles, dumping it first if needed
+    """
+    os.makedirs(directory, exist_ok=True)
+    directory = os.path.abspath(directory)
+    source = _format_source(list(preambles), docclass, docopt, directory)
+    name = hashlib.sha256(repr([source, tool_versions()['latex'],
+                                version.version]).encode()).hexdigest()[:16]
+    fmt = os.path.join(directory, name + '.fmt')
+    if os.path.exists(fmt):
+        return fmt
+    pyxdef = os.path.join(directory, 'pyx.def')
+    if not os.path.exists(pyxdef):
+        with config.open("pyx.def", [config.format.pyx]) as src, \
+                open(pyxdef + '.%d' % os.getpid(), 'wb') as dest:
+            dest.write(src.read())
+        os.replace(pyxdef + '.%d' % os.getpid(), pyxdef)
+    # dump under a private job name so parallel builds do not collide
+    job = '%s-%d' % (name, os.getpid())
+    with open(os.path.join(directory, job + '.tex'), 'w') as f:
+        f.write(source)
+    proc = subprocess.run(LATEX + ['-ini', '-interaction=nonstopmode',
+                           '-jobname=' + job, '&latex', job + '.tex'],
+                          cwd=directory, stdout=subprocess.PIPE,
+                          stderr=subprocess.STDOUT, universal_newlines=True)
+    for ext in ['.tex', '.log']:
+        try:
+            os.remove(os.path.join(directory, job + ext))
+        except OSError:
+            pass
+    if proc.returncode != 0 or not os.path.exists(os.path.join(directory, job + '.fmt')):
+        raise RuntimeError("dumping LaTeX format %s failed:\n%s" % (fmt, proc.stdout[-2000:]))
+    os.replace(os.path.join(directory, job + '.fmt'), fmt)
+    return fmt
+
+
+class SingleFormatLatexEngine(text.SingleLatexEngine):
+    """
+    SingleLatexEngine started from a dumped format: the document class,
+    pyx graphics driver and preambles are already loaded
+    """
+
+    def __init__(self, fmt, **kwargs):
+        super().__init__(cmd=LATEX + ['-fmt=' + fmt], **kwargs)
+
+    def do_start(self):
+        text.SingleEngine.do_start(self)
+
+
+class FormatLatexEngine(text.MultiEngine):
+    """
+    restartable SingleFormatLatexEngine; preambles lists what is baked into
+    the format so label caches can tell formats apart
+    """
+
+    def __init__(self, preambles=(), docclass='article', docopt=None, **kwargs):
+        self.baked = list(preambles)
+        fmt = format_for(self.baked, docclass, docopt)
+        super().__init__(SingleFormatLatexEngine, fmt=fmt, docclass=docclass,
+                         docopt=docopt, **kwargs)
+
+    def preamble(self, expr, texmessages=[]):
+        raise ValueError("preambles of a FormatLatexEngine are fixed by its format")
+
+    def reset(self, reinit=False):
+        self.instance = self.cls(*self.args, **self.kwargs)
+        self.preambles = [(expr, []) for expr in self.baked]
@@ -0,0 +1,418 @@
+"""
+    type5.py
+
+    Type 5 (contour grid) blocks built once.
+
+    A script that aligns an N or Z chart with the bottom wd scale of a
+    type_5 block needs the wd range pynomo only finds by building the whole
+    contour grid, so it builds a block of its own first.  nomotools.loader
+    hands scripts ScriptBlock for Nomo_Block_Type_5: with install() in
+    effect it builds that block the way Nomographer would (type_5_block()),
+    keeps it, and the real build of the same params dict picks the kept
+    block up instead of computing the grid a second time.  The scripts
+    themselves stay plain pynomo scripts.
+
+    The v contours themselves are computed for all v values at once: the
+    ends of every contour are bracketed on one (v, x) array and refined
+    together, and the contours are subdivided only where they bend, until
+    no drawn line strays more than the print tolerance of nomotools.sampling
+    from the true curve.  An E192 resistor grid has 192 contours per family;
+    decade_labels() keeps their labels readable.
+
+    Copyright (C) 2026  Daniel Boulet
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+import math
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from pynomo.nomo_grid_box import Nomo_Grid_Box
+from pynomo.nomo_wrapper import Nomo_Block_Type_5
+from pynomo.nomographer import Nomographer
+from scipy import optimize
+
+from . import sampling
+
+CACHE_SIZE = 8  # blocks kept for params dicts not built yet
+END_STEP = 1.0 / 200  # of a contour, point fixing its label direction
+
+# id(params) -> (params, checked copy of params, built block)
+_blocks = OrderedDict()
+_blocks_lock = threading.Lock()  # blocks may be built on several threads
+# id(params) -> (params, contours) to take instead of tracing them
+_presets = {}
+_building = threading.local()  # contours for the grid box being built
+_originals = {}
+
+
+def _checked(block_params):
+    """
+    copy of block_params with Nomographer's type_5 defaults added
+    """
+    p = dict(block_params)
+    Nomographer._check_block_type_5_params_(None, p)
+    return p
+
+
+def _original(name):
+    """
+    pynomo's own Nomo_Block_Type_5 method, installed or not
+    """
+    return _originals.get(name) or getattr(Nomo_Block_Type_5, name)
+
+
+def _same(a, b):
+    if a.keys() != b.keys():
+        return False
+    for key in a:
+        if a[key] is b[key]:
+            continue
+        try:
+            if not bool(a[key] == b[key]):
+                return False
+        except Exception:
+            return False
+    return True
+
+
+def _lookup(block_params, consume):
+    """
+    kept block for block_params if the dict has not changed since
+    """
+    with _blocks_lock:
+        entry = _blocks.get(id(block_params))
+        if entry is None or entry[0] is not block_params:
+            return None
+        params, checked, block = entry
+        if not _same(checked, _checked(block_params)):
+            del _blocks[id(block_params)]
+            return None
+        if consume:
+            del _blocks[id(block_params)]
+        else:
+            _blocks.move_to_end(id(block_params))
+        return block
+
+
+def type_5_block(block_params, consume=False):
+    """
+    type_5 block of block_params, built on first use and kept until the
+    real build of the same dict takes it (or consume=True here)
+    """
+    block = _lookup(block_params, consume)
+    if block is not None:
+        return block
+    p = _checked(block_params)
+    block = Nomo_Block_Type_5(mirror_x=p['mirror_x'], mirror_y=p['mirror_y'])
+    _original('define_block')(block, p)
+    _original('set_block')(block)
+    if not consume:
+        with _blocks_lock:
+            _blocks[id(block_params)] = (block_params, p, block)
+            while len(_blocks) > CACHE_SIZE:
+                _blocks.popitem(last=False)
+    return block
+
+
+def type_5_wd_range(block_params):
+    """
+    (u_min, u_max) of the bottom wd scale of the type_5 block, i.e. what
+    an N chart aligned with it should span
+    """
+    params_wd = type_5_block(block_params).grid_box.params_wd
+    return params_wd['u_min'], params_wd['u_max']
+
+
+def type_5_x_range(block_params):
+    """
+    range of the horizontal grid coordinate of the type_5 block
+    """
+    grid = type_5_block(block_params).grid_box
+    return (min(grid.x_left_ini, grid.x_right_ini),
+            max(grid.x_left_ini, grid.x_right_ini))
+
+
+def preset_contours(block_params, lines):
+    """
+    lets the next build of block_params take lines, as given by
+    contours(), instead of tracing its v contours
+    """
+    _presets[id(block_params)] = (block_params, lines)
+
+
+def contours(block):
+    """
+    v contours of a built type_5 block before scaling, one (n, 2) array
+    per v value, or None if the block was built without install()
+    """
+    return getattr(block.grid_box, 'v_lines_ini', None)
+
+
+def define_block(self, params):
+    preset = _presets.pop(id(params), None)
+    block = _lookup(params, consume=True)
+    # a block kept before install() has pynomo's contours, not traced ones
+    if block is None or (block.x_mirror, block.y_mirror) != (self.x_mirror, self.y_mirror) \
+            or contours(block) is None:
+        _building.lines = preset[1] if preset is not None and preset[0] is params else None
+        try:
+            _originals['define_block'](self, params)
+        finally:
+            _building.lines = None
+        return
+    self.__dict__.update(block.__dict__)
+    self.params = params
+    self._kept = True
+
+
+def set_block(self):
+    if self.__dict__.pop('_kept', False):
+        return
+    _originals['set_block'](self)
+
+
+class ScriptBlock(Nomo_Block_Type_5):
+    """
+    Nomo_Block_Type_5 as nomotools.loader hands it to scripts; once
+    install() is in effect a block the script builds itself is made by
+    type_5_block() and kept for the real build of the same dict
+    """
+
+    def define_block(self, params):
+        if _originals:
+            p = _checked(params)
+            if (bool(p['mirror_x']), bool(p['mirror_y'])) == (self.x_mirror < 0,
+                                                               self.y_mirror < 0):
+                self.__dict__.update(type_5_block(params).__dict__)
+                self._kept = True
+                return
+        _original('define_block')(self, params)
+
+    def set_block(self):
+        if self.__dict__.pop('_kept', False):
+            return
+        _original('set_block')(self)
+
+
+def _grid_func(v_func, x, v):
+    """
+    v_func for equal length arrays of x and v, or None if it only takes
+    scalars
+    """
+    probe_x = np.linspace(x[0], x[-1], sampling.PROBES)
+    probe_v = np.resize(v, sampling.PROBES)
+    try:
+        with np.errstate(all='ignore'):
+            values = np.asarray(v_func(probe_x, probe_v), dtype=float)
+            scalars = np.array([v_func(float(a), float(b)) for a, b in zip(probe_x, probe_v)],
+                               dtype=float)
+    except Exception:
+        return None
+    if values.shape != probe_x.shape or \
+            not np.allclose(values, scalars, rtol=1e-12, atol=0.0, equal_nan=True):
+        return None
+
+    def func(x, v):
+        return np.asarray(v_func(x, v), dtype=float)
+
+    return func
+
+
+def _contour_end(grid_box, v_func, v, target, top):
+    """
+    x where contour v meets the target y, searched and clamped to a manual
+    x scale exactly as pynomo does it: the layout of existing grids depends
+    on where this search gives up
+    """
+    def func(x):
+        value = v_func(x.astype(complex), v)
+        if value.imag > 0:
+            return 1e10
+        if value.imag < 0 and top:
+            return -1e10
+        return (v_func(x, v) - target) ** 2
+
+    p = grid_box.params
+    guess = 1.0
+    if p['manual_x_scale'] == True:
+        guess = (p['x_min'] + p['x_max']) / 2.0
+    x = optimize.fmin(func, [guess], disp=0, ftol=1e-5, xtol=1e-5)[0]
+    if p['manual_x_scale'] == True:
+        x = min(max(x, min(p['x_min'], p['x_max'])), max(p['x_min'], p['x_max']))
+    return x
+
+
+def contour_samples(func, v, start, stop, x_factor, y_factor, tolerance):
+    """
+    points of every contour y = func(x, v[k]) from start[k] to stop[k],
+    subdivided until each stays within tolerance of its polyline once
+    scaled by x_factor, y_factor; list of (x, y) arrays or None if a
+    contour is not finite
+    """
+    checks = sampling.CHECKS
+    n = len(checks)
+    count = sampling.MIN_INTERVALS
+    t = np.linspace(0.0, 1.0, count + 1)
+    k = np.repeat(np.arange(len(v)), count + 1)
+    x = (start[:, None] + (stop - start)[:, None] * t).ravel()
+    # near the ends the contour direction places the v labels
+    x_end = np.concatenate([start + (stop - start) * END_STEP, stop - (stop - start) * END_STEP])
+    k_end = np.tile(np.arange(len(v)), 2)
+    with np.errstate(all='ignore'):
+        y = func(x, v[k])
+        y_end = func(x_end, v[k_end])
+        if not (np.isfinite(y).all() and np.isfinite(y_end).all()):
+            return None
+        done_k, done_x, done_y = [k, k_end], [x, x_end], [y, y_end]
+        last = np.arange(len(x)).reshape(len(v), count + 1)[:, :-1].ravel()
+        ka, xa, ya = k[last], x[last], y[last]
+        xb, yb = x[last + 1], y[last + 1]
+        for dummy in range(sampling.MAX_DEPTH):
+            kc = np.repeat(ka, n)
+            xc = np.repeat(xa, n) + np.tile(checks, len(xa)) * np.repeat(xb - xa, n)
+            yc = func(xc, v[kc])
+            if not np.isfinite(yc).all():
+                return None
+            x0, y0 = np.repeat(xa, n) * x_factor, np.repeat(ya, n) * y_factor
+            dx, dy = np.repeat(xb - xa, n) * x_factor, np.repeat(yb - ya, n) * y_factor
+            chord = np.hypot(dx, dy)
+            error = np.where(chord > 0,
+                             np.abs((xc * x_factor - x0) * dy - (yc * y_factor - y0) * dx) /
+                             np.where(chord > 0, chord, 1.0),
+                             np.hypot(xc * x_factor - x0, yc * y_factor - y0))
+            split = (error.reshape(-1, n) > tolerance).any(axis=1)
+            if not split.any():
+                break
+            mid = 1 + n * np.nonzero(split)[0]
+            km, xm, ym = kc[mid], xc[mid], yc[mid]
+            done_k.append(km)
+            done_x.append(xm)
+            done_y.append(ym)
+            ka = np.concatenate([ka[split], km])
+            xa, ya = np.concatenate([xa[split], xm]), np.concatenate([ya[split], ym])
+            xb, yb = np.concatenate([xm, xb[split]]), np.concatenate([ym, yb[split]])
+        else:
+            return None
+    k, x, y = np.concatenate(done_k), np.concatenate(done_x), np.concatenate(done_y)
+    order = np.lexsort((x, k))
+    bounds = np.searchsorted(k[order], np.arange(1, len(v)))
+    return list(zip(np.split(x[order], bounds), np.split(y[order], bounds)))
+
+
+def _v_sections(line):
+    # as Nomo_Grid_Box._build_v_line_, skipping the doubled first point
+    return [(x1, y1, x0, y0) for (x0, y0), (x1, y1) in zip(line[1:], line[2:])]
+
+
+def _build_v_lines_(self, v_func):
+    """
+    Nomo_Grid_Box._build_v_lines_ for all v values at once, or taken
+    from preset_contours(); keeps the unscaled lines for contours()
+    """
+    lines = getattr(_building, 'lines', None)
+    if lines is not None:
+        _building.lines = None
+        self.v_lines = [list(map(tuple, line.tolist())) for line in lines]
+        self.v_sections = [_v_sections(line) for line in self.v_lines]
+    else:
+        _trace_v_lines_(self, v_func)
+    self.v_lines_ini = [np.array(line, dtype=float).reshape(-1, 2) for line in self.v_lines]
+
+
+def _trace_v_lines_(self, v_func):
+    tolerance = sampling.get_tolerance()
+    v = np.array(self.params['v_values'], dtype=float)
+    fu = [self.u_func(u) for u in self.params['u_values']]
+    max_fu, min_fu = max(fu), min(fu)
+    func = _grid_func(v_func, np.array([self.params['x_min'], self.params['x_max']]), v) \
+        if tolerance and len(v) else None
+    lines = None
+    if func is not None:
+        x_top = np.array([_contour_end(self, v_func, value, max_fu, True) for value in v])
+        x_bottom = np.array([_contour_end(self, v_func, value, min_fu, False) for value in v])
+        start, stop = np.minimum(x_top, x_bottom), np.maximum(x_top, x_bottom)
+        # the factors _scale_and_mirror_ will scale the grid with
+        if self.params['manual_x_scale'] == True:
+            width = abs(self.params['x_max'] - self.params['x_min'])
+        else:
+            width = stop.max() - start.min()
+        with np.errstate(all='ignore'):
+            ends_y = np.concatenate([func(start, v), func(stop, v)])
+        height = max(max_fu, ends_y.max()) - min(min_fu, ends_y.min())
+        if width > 0 and height > 0 and (start < stop).all():
+            lines = contour_samples(func, v, start, stop, self.params['width'] / width,
+                                    self.params['height'] / height, tolerance)
+    if lines is None:
+        _originals['_build_v_lines_'](self, v_func)
+        return
+    self.v_lines = []
+    self.v_sections = []
+    for x, y in lines:
+        line = [(float(x[0]), float(y[0]))] + list(zip(x.tolist(), y.tolist()))
+        self.v_lines.append(line)
+        self.v_sections.append(_v_sections(line))
+
+
+def decade_labels(values, per_decade, text_format=r"$%3.1f$"):
+    """
+    manual_axis_data for u_manual_axis_data/v_manual_axis_data that labels
+    only the value nearest each of per_decade log spaced steps of every
+    decade; the other values keep their line but get an empty label
+    """
+    values = list(values)
+    logs = np.log10(values)
+    keep = set()
+    for decade in np.unique(np.floor(logs + 1e-9)):
+        in_decade = np.nonzero(np.floor(logs + 1e-9) == decade)[0]
+        for step in np.arange(per_decade) / float(per_decade):
+            keep.add(in_decade[np.argmin(np.abs(logs[in_decade] - decade - step))])
+    return dict((value, text_format % value if index in keep else '')
+                for index, value in enumerate(values))
+
+
+def clear():
+    """
+    forgets all kept blocks and preset contours
+    """
+    with _blocks_lock:
+        _blocks.clear()
+    _presets.clear()
+
+
+def install():
+    """
+    lets Nomo_Block_Type_5.define_block/set_block take a kept block and
+    computes type_5 contours on arrays
+    """
+    if _originals:
+        return
+    _originals['define_block'] = Nomo_Block_Type_5.define_block
+    _originals['set_block'] = Nomo_Block_Type_5.set_block
+    _originals['_build_v_lines_'] = Nomo_Grid_Box._build_v_lines_
+    Nomo_Block_Type_5.define_block = define_block
+    Nomo_Block_Type_5.set_block = set_block
+    Nomo_Grid_Box._build_v_lines_ = _build_v_lines_
+
+
+def uninstall():
+    """
+    puts pynomo's own define_block/set_block and contours back
+    """
+    if not _originals:
+        return
+    Nomo_Block_Type_5.define_block = _originals.pop('define_block')
+    Nomo_Block_Type_5.set_block = _originals.pop('set_block')
+    Nomo_Grid_Box._build_v_lines_ = _originals.pop('_build_v_lines_')
@@ -0,0 +1,155 @@
+"""
+    voltdiv.py
+
+    Voltage divider nomograms for every E-series.
+
+    ghpage_src/voltdiv_E24_resistors.py reads Ra and Rb off a type_5 grid of
+    the 24 values of E24.  Here the same chart is made for any series of
+    nomotools.eseries.SERIES by swapping the values of that grid.  Series
+    with more than LABELS_PER_DECADE values label only the value nearest
+    each E24 step (type5.decade_labels), the N chart is stretched over the
+    wd scale of the new grid and the title names the series:
+
+        python -m nomotools.voltdiv E96 E192
+        python -m nomotools.voltdiv --outdir out E12 E48
+
+    Copyright (C) 2026  Daniel Boulet
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+import argparse
+import os
+import sys
+import time
+import traceback
+
+from . import engine, eseries, geometry, labelcache, sampling, type5
+from .batch import render
+from .build import format_summary
+from .loader import NomoScript, load_script, output_path
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TEMPLATE = os.path.join(ROOT, 'ghpage_src', 'voltdiv_E24_resistors.py')
+TEMPLATE_SERIES = 'E24'  # series drawn by TEMPLATE, named in its file name and title
+LABELS_PER_DECADE = 24  # denser series label only the value nearest each E24 step
+TEXT_FORMAT = r"\normalsize{$%3.2f$}"  # labels of the three figure series
+
+
+def grid_block_index(block_params):
+    """
+    index of the one type_5 block, the Ra/Rb grid
+    """
+    found = [i for i, p in enumerate(block_params) if p.get('block_type') == 'type_5']
+    if len(found) != 1:
+        raise ValueError("template needs exactly one type_5 block, has %d" % len(found))
+    return found[0]
+
+
+def _aligned(block, tag, u_min, u_max):
+    """
+    block with the axis tagged tag spanning u_min..u_max
+    """
+    block = dict(block)
+    for key, axis in block.items():
+        if key.endswith('_params') and isinstance(axis, dict) and axis.get('tag') == tag:
+            block[key] = dict(axis, u_min=u_min, u_max=u_max)
+    return block
+
+
+def variant(script, series, template_series=TEMPLATE_SERIES):
+    """
+    NomoScript for series made from the loaded template script; needs
+    type5.install() so that the grid built here for the wd range is
+    taken over when the variant is drawn
+    """
+    name = series.upper()
+    values = eseries.decade_values(name)
+    params = dict(script.main_params)
+    block_params = list(params['block_params'])
+    index = grid_block_index(block_params)
+    grid = dict(block_params[index])
+    grid['u_values'] = values
+    grid['v_values'] = values
+    if len(values) > LABELS_PER_DECADE:
+        for axis in ['u', 'v']:
+            grid[axis + '_manual_axis_data'] = type5.decade_labels(values, LABELS_PER_DECADE,
+                                                                   TEXT_FORMAT)
+    grid['isopleth_values'] = [[min(values, key=lambda value: abs(value - row[0]))] + row[1:]
+                               for row in grid.get('isopleth_values', [])]
+    wd_min, wd_max = type5.type_5_wd_range(grid)
+    block_params = [_aligned(p, grid.get('wd_tag'), wd_min, wd_max) if i != index else grid
+                    for i, p in enumerate(block_params)]
+    params['block_params'] = block_params
+    described = name + ' series values'
+    if len(values) > LABELS_PER_DECADE:
+        described += ', every E24 step labelled'
+    params['title_str'] = params.get('title_str', '').replace(
+        template_series + ' series values', described)
+    path = os.path.join(os.path.dirname(script.path),
+                        script.name.replace(template_series, name) + '.py')
+    return NomoScript(path, params, script.engine, script.preambles, script.namespace)
+
+
+def build_series(names, template=TEMPLATE, outdir=None, label_cache=labelcache.DEFAULT_PATH,
+                 geometry_dir=geometry.DEFAULT_DIR):
+    """
+    renders the variant of template for every series in names, returns
+    (path, output, seconds, error, cached) per series like nomotools.build
+    """
+    if outdir:
+        os.makedirs(outdir, exist_ok=True)
+    sampling.install()
+    type5.install()
+    script = load_script(template)
+    results = []
+    for name in names:
+        start = time.perf_counter()
+        path = output = error = None
+        try:
+            nomo = variant(script, name)
+            path, output = nomo.path, output_path(nomo, outdir)
+            render(nomo, output, label_cache, geometry_dir=geometry_dir)
+        except Exception:
+            error = traceback.format_exc().strip().splitlines()[-1]
+        finally:
+            engine.close_all()
+        results.append((path or name, output, time.perf_counter() - start, error, False))
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m nomotools.voltdiv',
+                                     description=__doc__.split('\n\n')[1].strip())
+    parser.add_argument('series', nargs='+', choices=sorted(eseries.SERIES),
+                        metavar='SERIES', help='one of %s' % ', '.join(eseries.SERIES))
+    parser.add_argument('--template', default=TEMPLATE,
+                        help='script the variants are made from (default %(default)s)')
+    parser.add_argument('--outdir', help='write here instead of next to the template')
+    parser.add_argument('--no-label-cache', action='store_true',
+                        help='typeset every label instead of reusing .nomocache/labels')
+    parser.add_argument('--no-geometry-cache', action='store_true',
+                        help='compute every nomogram instead of reusing .nomocache/geometry')
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    results = build_series(args.series, args.template,
+                           args.outdir and os.path.abspath(args.outdir),
+                           None if args.no_label_cache else labelcache.DEFAULT_PATH,
+                           None if args.no_geometry_cache else geometry.DEFAULT_DIR)
+    print(format_summary(results, time.perf_counter() - start))
+    return 1 if any(result[3] for result in results) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,144 @@
+"""
+    watch.py
+
+    Re-render nomogram scripts as they are edited.
+
+    usage: python -m nomotools.watch [--outdir DIR] [script or dir ...]
+
+    The script tree is polled for changed modification times and only the
+    edited script is loaded and drawn again, in this already warm process
+    (pynomo/pyx imported, LaTeX running, labels cached).  When the edit only
+    touched titles, extra texts or other nomotools.staged.COSMETIC_KEYS, the
+    block geometry of the previous render is reused and just redrawn.
+
+    Copyright (C) 2026  Daniel Boulet
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+import argparse
+import os
+import sys
+import time
+import traceback
+
+from . import cache, engine, labelcache, sampling, type5
+from .loader import discover_scripts, load_script, output_path
+from .staged import COSMETIC_KEYS, StagedNomographer
+
+
+class Watcher:
+    """
+    keeps the last StagedNomographer of every rendered script
+    """
+
+    def __init__(self, paths=None, outdir=None, label_cache=labelcache.DEFAULT_PATH):
+        self.paths = paths
+        self.outdir = outdir
+        self.rendered = {}  # path -> (geometry key, StagedNomographer)
+        self.mtimes = {}
+        self.scanned = False  # mtimes holds every script seen by a first scan
+        if label_cache:
+            labelcache.install(label_cache)
+        sampling.install()
+        type5.install()
+
+    def changed(self):
+        """
+        scripts modified (or added) since the previous call
+        """
+        changed = []
+        for path in discover_scripts(self.paths):
+            try:
+                mtime = os.stat(path).st_mtime_ns
+            except OSError:
+                continue
+            if path in self.mtimes:
+                if self.mtimes[path] != mtime:
+                    changed.append(path)
+            elif self.scanned:
+                changed.append(path)
+            self.mtimes[path] = mtime
+        self.scanned = True
+        return changed
+
+    def render(self, path):
+        """
+        draws path again, returns 'restyled' or 'rendered'
+        """
+        script = load_script(path)
+        key = cache.fingerprint(script, cache.IGNORED_KEYS + COSMETIC_KEYS)
+        engine.engine_for(script)
+        filename = output_path(script, self.outdir)
+        previous = self.rendered.pop(path, None)
+        if previous is not None and previous[0] == key:
+            nomo = previous[1]
+            nomo.restyle(script.main_params, filename)
+            how = 'restyled'
+        else:
+            nomo = StagedNomographer(dict(script.main_params, filename=filename))
+            how = 'rendered'
+        self.rendered[path] = (key, nomo)
+        return how
+
+    def run(self, interval=0.2, initial=False):
+        if initial:
+            paths = discover_scripts(self.paths)
+        else:
+            paths = []
+        self.changed()  # remember current mtimes
+        root = os.getcwd()
+        while True:
+            for path in paths:
+                start = time.perf_counter()
+                try:
+                    how = self.render(path)
+                except Exception:
+                    print("%s: %s" % (os.path.relpath(path, root),
+                                      traceback.format_exc().strip().splitlines()[-1]))
+                else:
+                    print("%s: %s in %.2fs" % (os.path.relpath(path, root), how,
+                                               time.perf_counter() - start))
+                sys.stdout.flush()
+            time.sleep(interval)
+            paths = self.changed()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m nomotools.watch',
+                                     description=__doc__.split('\n\n')[1].strip())
+    parser.add_argument('paths', nargs='*',
+                        help='scripts or directories (default: all script directories)')
+    parser.add_argument('--outdir', help='write all output here instead of next to each script')
+    parser.add_argument('--interval', type=float, default=0.2,
+                        help='seconds between polls (default 0.2)')
+    parser.add_argument('--initial', action='store_true',
+                        help='render every script once at start')
+    parser.add_argument('--no-label-cache', action='store_true',
+                        help='typeset every label instead of reusing .nomocache/labels')
+    args = parser.parse_args(argv)
+
+    watcher = Watcher(args.paths, args.outdir,
+                      None if args.no_label_cache else labelcache.DEFAULT_PATH)
+    print("watching %d scripts, ^C to stop" % len(discover_scripts(args.paths)))
+    try:
+        watcher.run(args.interval, args.initial)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        engine.close_all()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -41,7 +41,7 @@ N_params_1 = {
 N_params_2 = {
     'u_min': 1.0,
     'u_max': 10.0,
-    'function': lambda u: log(u),
+    'function': lambda u: np.log(u),
     'title': 'u',
     'tick_levels': 3,
     'tick_text_levels': 2,
@@ -0,0 +1,33 @@
+from nomotools.align import AlignmentPlan
+
+
+class Atom:
+    def __init__(self, tag):
+        self.params = {'tag': tag, 'dtag': 'none', 'u_min': 1.0, 'u_max': 2.0,
+                       'align_func': lambda u: u}
+
+
+class Block:
+    def __init__(self, *tags):
+        self.atom_stack = [Atom(tag) for tag in tags]
+
+
+def test_chain_has_no_problems():
+    plan = AlignmentPlan([Block('a'), Block('a', 'b'), Block('b', 'c'), Block('c')])
+    assert [(step.block, step.parent, step.tag) for step in plan.steps] == \
+        [(1, 0, 'a'), (2, 1, 'b'), (3, 2, 'c')]
+    assert plan.links == [] and plan.problems == []
+
+
+def test_cycle_reported_while_planning():
+    plan = AlignmentPlan([Block('a', 'c'), Block('a', 'b'), Block('b', 'c')])
+    assert [(step.block, step.parent, step.tag) for step in plan.steps] == \
+        [(1, 0, 'a'), (2, 0, 'c')]
+    assert [(first, b, tag) for first, b, atom, other, tag in plan.links] == [(1, 2, 'b')]
+    assert plan.problems == ["tag 'b' links blocks 1 and 2, which other tags already "
+                             "place: a cycle that may conflict"]
+
+
+def test_one_tag_on_many_blocks_is_no_cycle():
+    plan = AlignmentPlan([Block('a'), Block('a'), Block('a')])
+    assert plan.problems == []
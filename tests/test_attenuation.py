@@ -0,0 +1,25 @@
+import numpy as np
+import pytest
+
+from nomotools import attenuation
+from nomotools.coax import CABLES, Cable
+
+
+def test_losses_match_cable_loss():
+    names = np.array(['LMR195', 'LMR400', 'RG0', 'LMR400'])
+    freq = np.array([7.1, 50.0, 14.2, 432.0])
+    length = np.array([20.0, 40.0, 10.0, 5.0])
+    result = attenuation.losses(names, freq, length)
+    for i in [0, 1, 3]:
+        assert result[i] == pytest.approx(length[i] * CABLES[names[i]].loss(freq[i]), rel=1e-12)
+    assert np.isnan(result[2])
+
+
+def test_losses_broadcast_and_cable_table():
+    cable = Cable('test', 1.0, 0.01)
+    freq = np.array([1.0, 100.0, 400.0])
+    result = attenuation.losses('test', freq, [[10.0], [20.0]], {'test': cable})
+    assert result.shape == (2, 3)
+    expected = np.outer([10.0, 20.0], (np.sqrt(freq) + 0.01 * freq) / 100.0 / 0.3048)
+    np.testing.assert_allclose(result, expected, rtol=1e-12)
+    assert np.isnan(attenuation.losses('LMR400', -1.0, 10.0))
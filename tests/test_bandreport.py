@@ -0,0 +1,51 @@
+import math
+
+import numpy as np
+import pytest
+
+from nomotools import bandreport
+
+
+@pytest.fixture(scope='module')
+def converters():
+    return bandreport.conversions()
+
+
+def datasheet_loss(k1, k2, freq, length):
+    """
+    dB of length m at freq MHz from the dB per 100 ft formula
+    """
+    return length * (k1 * math.sqrt(freq) + k2 * freq) / 100.0 / 0.3048
+
+
+def test_loss_at_upper_band_edge(converters):
+    results = bandreport.evaluate(['2m', '20m', '70cm'], ['LMR400', 'LMR195', 'LMR400'],
+                                  [30.0, 12.0, 45.0], [1.5, 1.3, 2.0], *converters)
+    np.testing.assert_allclose(results['freq'], [148.0, 14.35, 450.0])
+    expected = [datasheet_loss(0.122290, 0.000260, 148.0, 30.0),
+                datasheet_loss(0.356859, 0.000470, 14.35, 12.0),
+                datasheet_loss(0.122290, 0.000260, 450.0, 45.0)]
+    np.testing.assert_allclose(results['loss_db'], expected, rtol=1e-12)
+
+
+def test_antenna_return_loss_and_vswr(converters):
+    vswr = np.array([1.2, 1.5, 3.0])
+    results = bandreport.evaluate(['10m'] * 3, ['LMR195'] * 3, [20.0] * 3, vswr, *converters)
+    measured = -20.0 * np.log10((vswr - 1.0) / (vswr + 1.0))
+    np.testing.assert_allclose(results['measured_rl'], measured, rtol=1e-12)
+    antenna = measured - 2.0 * results['loss_db']
+    np.testing.assert_allclose(results['antenna_rl'], antenna, rtol=1e-12)
+    gamma = 10.0 ** (-antenna / 20.0)
+    np.testing.assert_allclose(results['antenna_vswr'], (1 + gamma) / (1 - gamma), rtol=1e-12)
+    assert (results['antenna_vswr'] > vswr).all()
+    assert list(results['status']) == ['ok'] * 3
+
+
+def test_status_of_bad_rows(converters):
+    results = bandreport.evaluate(['2m', '2m', '2m', '5m', '2m'],
+                                  ['LMR195', 'LMR195', 'RG0', 'LMR195', 'LMR195'],
+                                  [10.0, 400.0, 10.0, 10.0, -1.0],
+                                  [1.5, 1.1, 1.5, 1.5, 1.5], *converters)
+    assert list(results['status']) == ['ok', 'loss exceeds measurement', 'unknown cable',
+                                       'unknown band', 'bad value']
+    assert np.isnan(results['antenna_vswr'][1:4]).all()
@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from nomotools.eseries import DIGITS, DividerIndex, resistor_values
+
+
+def brute_force(values, vin, vout, k, tolerance=None, power=None, distinct=True):
+    """
+    (abs error, Ra + Rb) of the k best pairs, every pair tried
+    """
+    ra, rb = np.meshgrid(values, values, indexing='ij')
+    ra, rb = ra.ravel(), rb.ravel()
+    target = vout / vin
+    ratio = rb / (ra + rb)
+    error = np.abs(ratio - target) / target
+    keep = np.ones(len(ratio), dtype=bool)
+    if tolerance is not None:
+        keep &= error <= tolerance
+    if power is not None:
+        keep &= (vin / (ra + rb)) ** 2 * np.maximum(ra, rb) <= power
+    found = {}
+    for key, e, total in zip(np.round(ratio[keep], DIGITS), error[keep], (ra + rb)[keep]):
+        if not distinct:
+            key = len(found)
+        if key not in found or total < found[key][1]:
+            found[key] = (e, total)
+    return sorted(found.values())[:k]
+
+
+@pytest.fixture(scope='module')
+def index():
+    return DividerIndex('E24', range(1, 4))
+
+
+@pytest.mark.parametrize('options', [
+    {},
+    {'tolerance': 0.01},
+    {'power': 0.05},
+    {'tolerance': 0.002, 'power': 0.02},
+    {'distinct': False},
+])
+def test_query_matches_brute_force(index, options):
+    rng = np.random.default_rng(7)
+    vin = rng.uniform(3.0, 30.0, 40)
+    vout = vin * rng.uniform(0.02, 0.98, 40)
+    k = 5
+    pairs = index.query(vin, vout, k=k, **options)
+    values = resistor_values('E24', range(1, 4))
+    for i in range(len(vin)):
+        expected = brute_force(values, vin[i], vout[i], k, **options)
+        found = ~np.isnan(pairs.ra[i])
+        assert found.sum() == len(expected)
+        np.testing.assert_allclose(np.abs(pairs.error[i][found]),
+                                   [e for e, total in expected], rtol=1e-9, atol=1e-15)
+        if options.get('distinct', True):
+            np.testing.assert_allclose((pairs.ra + pairs.rb)[i][found],
+                                       [total for e, total in expected])
+
+
+def test_query_shape_and_vout(index):
+    vin = np.full((2, 3), 12.0)
+    vout = np.array([[1.0, 2.5, 3.3], [5.0, 6.0, 9.0]])
+    pairs = index.query(vin, vout, k=2)
+    assert pairs.ra.shape == (2, 3, 2)
+    np.testing.assert_allclose(pairs.vout, vin[..., None] * pairs.rb / (pairs.ra + pairs.rb))
@@ -0,0 +1,89 @@
+import math
+import os
+
+import numpy as np
+import pytest
+
+from nomotools.evaluate import Evaluator, Scale, find_root, solve_block
+from nomotools.loader import load_script
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_find_root_arrays():
+    c = np.array([0.5, 2.0, 10.0, 99.0])
+    root = find_root(lambda t, c: t ** 3 - c, 0.0, 10.0, c)
+    np.testing.assert_allclose(root, np.cbrt(c), rtol=1e-9)
+
+
+def test_find_root_bracket_ends_and_no_sign_change():
+    root = find_root(lambda t, c: t - c, np.zeros(4), np.full(4, 2.0),
+                     np.array([0.0, 2.0, 1.5, 3.0]))
+    np.testing.assert_allclose(root[:3], [0.0, 2.0, 1.5], rtol=1e-9)
+    assert np.isnan(root[3])
+
+
+def test_find_root_keeps_shape():
+    a = np.zeros((2, 3))
+    c = np.arange(1.0, 7.0).reshape(2, 3)
+    root = find_root(lambda t, c: np.log(t) - np.log(c), a + 0.5, a + 10.0, c)
+    assert root.shape == (2, 3)
+    np.testing.assert_allclose(root, c, rtol=1e-9)
+
+
+def test_scale_inverse_round_trip():
+    scale = Scale(lambda u: np.log10(u), 1.0, 1000.0)
+    u = np.array([1.0, 2.5, 37.0, 640.0, 1000.0])
+    np.testing.assert_allclose(scale.inverse(scale(u)), u, rtol=1e-9)
+
+
+def test_scale_inverse_decreasing_and_scalar_only():
+    scale = Scale(lambda u: 1.0 / math.sqrt(u), 4.0, 0.25)
+    u = np.array([0.25, 0.3, 1.7, 4.0])
+    np.testing.assert_allclose(scale.inverse(1.0 / np.sqrt(u)), u, rtol=1e-9)
+
+
+def test_scale_inverse_outside_is_nan():
+    scale = Scale(lambda u: u ** 2, 1.0, 3.0)
+    assert np.isnan(scale.inverse(np.array([0.5, 9.5]))).all()
+
+
+@pytest.fixture(scope='module')
+def true_vswr():
+    return load_script(os.path.join(ROOT, 'true_vswr_lmr400.py'))
+
+
+def test_evaluator_worked_example(true_vswr):
+    # 60 W forward, 5 W reflected, 75 m of LMR400 at 144 MHz, as on the chart
+    rows = Evaluator(true_vswr.main_params).solve()
+    measured_rl = rows[0][2]
+    loss = rows[6][2]
+    assert measured_rl == pytest.approx(10.79, abs=0.005)
+    assert loss == pytest.approx(3.70, abs=0.005)
+    assert rows[1][0] == pytest.approx(measured_rl, rel=1e-9)
+    assert rows[1][2] == pytest.approx(loss, rel=1e-9)
+    assert rows[5][0] == pytest.approx(5.20, abs=0.005)
+
+
+def test_evaluator_arrays_match_closed_form(true_vswr):
+    namespace = true_vswr.namespace
+    p_fwd = np.array([20.0, 60.0, 100.0])
+    p_ref = np.array([0.5, 5.0, 3.0])
+    length = np.array([40.0, 75.0, 100.0])
+    freq = np.array([50.0, 144.0, 30.0])
+    rows = Evaluator(true_vswr.main_params).solve(
+        [['x', 'x', 'x'], ['x', 'x', 'x'], [p_ref], [p_fwd], ['x'], ['x'],
+         [length, freq, 'x']])
+    true_rl = 10.0 * np.log10(p_fwd / p_ref) - 2.0 * length * namespace['cableloss'](freq)
+    np.testing.assert_allclose(rows[5][0], namespace['rl2vswr'](true_rl), rtol=1e-6)
+
+
+def test_type_5_round_trip(true_vswr):
+    block = true_vswr.main_params['block_params'][6]
+    assert block['block_type'] == 'type_5'
+    length = np.array([30.0, 75.0, 110.0])
+    freq = np.array([28.0, 144.0, 432.0])
+    loss = solve_block(block, [length, freq, 'x'])[2]
+    np.testing.assert_allclose(loss, length * true_vswr.namespace['cableloss'](freq), rtol=1e-6)
+    np.testing.assert_allclose(solve_block(block, ['x', freq, loss])[0], length, rtol=1e-6)
+    np.testing.assert_allclose(solve_block(block, [length, 'x', loss])[1], freq, rtol=1e-6)
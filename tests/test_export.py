@@ -0,0 +1,16 @@
+import pytest
+
+from nomotools.export import plain_text
+
+
+@pytest.mark.parametrize('tex, text', [
+    (r'\Large $\frac{V_{out}}{V_{in}}$', 'Vout/Vin'),
+    (r'$\frac{R_{b}}{R_{a}+R_{b}}$', 'Rb/(Ra+Rb)'),
+    (r'$\dfrac{\frac{a}{b}}{c}$', 'a/b/c'),
+    (r'$\frac{1}{2}$', '1/2'),
+    (r'area m^{2}', 'area m²'),
+    (r'$\Omega$ \\ \textbf{load}', 'Ω\nload'),
+    ('\\textbf{LMR400} \\\n\t\\par\\medskip (2021)', 'LMR400\n(2021)'),
+])
+def test_plain_text(tex, text):
+    assert plain_text(tex) == text
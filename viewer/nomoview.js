@@ -0,0 +1,257 @@
+/*
+    nomoview.js
+
+    Draws a nomogram exported by nomotools.export as SVG and reads it with
+    a straight edge: click two points to lay an edge across the chart, the
+    value is shown where it crosses every scale.  Clicks close to a scale
+    snap onto it, so an edge can start exactly at a value read before.
+
+    Copyright (C) 2026  Daniel Boulet
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+*/
+(function () {
+    'use strict';
+
+    var SVG = 'http://www.w3.org/2000/svg';
+    var MARGIN = 1.0;     // cm around the drawing
+    var SNAP = 0.3;       // cm, clicks this close to a scale land on it
+    var PT = 1 / 28.45;   // cm per point
+    var EDGE_COLOR = '#d0021b';
+    var STEP = 0.001;     // cm per unit of the exported lines (format 2)
+
+    function element(name, attrs, parent) {
+        var node = document.createElementNS(SVG, name);
+        Object.keys(attrs).forEach(function (key) {
+            node.setAttribute(key, attrs[key]);
+        });
+        if (parent) {
+            parent.appendChild(node);
+        }
+        return node;
+    }
+
+    // flat [x0, y0, x1, y1, ...] in cm of a line stored as steps from the
+    // previous point
+    function decode(line) {
+        var points = [], x = 0, y = 0;
+        for (var i = 0; i < line.length; i += 2) {
+            x += line[i];
+            y += line[i + 1];
+            points.push(x * STEP, y * STEP);
+        }
+        return points;
+    }
+
+    function format(u) {
+        return String(Number(u.toPrecision(4)));
+    }
+
+    // point of scale nearest to (x, y): {x, y, u, d}
+    function nearest(scale, x, y) {
+        var p = scale.p, u = scale.u, best = null;
+        for (var i = 0; i + 1 < u.length; i++) {
+            var x0 = p[2 * i], y0 = p[2 * i + 1], dx = p[2 * i + 2] - x0, dy = p[2 * i + 3] - y0;
+            var len2 = dx * dx + dy * dy;
+            var t = len2 > 0 ? ((x - x0) * dx + (y - y0) * dy) / len2 : 0;
+            t = Math.max(0, Math.min(1, t));
+            var px = x0 + t * dx, py = y0 + t * dy, d = Math.hypot(px - x, py - y);
+            if (best === null || d < best.d) {
+                best = {x: px, y: py, u: u[i] + t * (u[i + 1] - u[i]), d: d};
+            }
+        }
+        return best;
+    }
+
+    // points where the line through a and b crosses scale: [{x, y, u}]
+    function crossings(scale, a, b) {
+        var p = scale.p, u = scale.u, found = [];
+        var nx = a.y - b.y, ny = b.x - a.x;  // normal of the edge
+        var side = function (i) {
+            return (p[2 * i] - a.x) * nx + (p[2 * i + 1] - a.y) * ny;
+        };
+        var s0 = side(0);
+        for (var i = 0; i + 1 < u.length; i++) {
+            var s1 = side(i + 1);
+            if ((s0 <= 0 && s1 > 0) || (s0 >= 0 && s1 < 0)) {
+                var t = s0 / (s0 - s1);
+                found.push({x: p[2 * i] + t * (p[2 * i + 2] - p[2 * i]),
+                            y: p[2 * i + 1] + t * (p[2 * i + 3] - p[2 * i + 1]),
+                            u: u[i] + t * (u[i + 1] - u[i])});
+            }
+            s0 = s1;
+        }
+        return found;
+    }
+
+    function View(parent, data) {
+        var box = data.bbox;
+        data.paths.forEach(function (group) {
+            group.p = group.p.map(decode);
+        });
+        data.scales.forEach(function (scale) {
+            scale.p = decode(scale.p);
+        });
+        this.data = data;
+        this.top = box[3] + MARGIN;
+        this.svg = element('svg', {
+            viewBox: [box[0] - MARGIN, 0, box[2] - box[0] + 2 * MARGIN,
+                      box[3] - box[1] + 2 * MARGIN].join(' '),
+            width: '100%', style: 'max-height: 95vh; cursor: crosshair'}, parent);
+        this.drawing = element('g', {}, this.svg);
+        this.edges = element('g', {}, this.svg);
+        this.preview = element('g', {}, this.svg);
+        this.start = null;
+        this.draw();
+        this.svg.addEventListener('click', this.click.bind(this));
+        this.svg.addEventListener('mousemove', this.move.bind(this));
+        document.addEventListener('keydown', function (event) {
+            if (event.key === 'Escape') {
+                this.clear();
+            }
+        }.bind(this));
+    }
+
+    View.prototype.y = function (y) {
+        return this.top - y;
+    };
+
+    View.prototype.draw = function () {
+        var self = this;
+        this.data.paths.forEach(function (group) {
+            var d = group.p.map(function (line) {
+                var parts = [];
+                for (var i = 0; i < line.length; i += 2) {
+                    parts.push((i ? 'L' : 'M') + line[i].toFixed(3) + ' ' +
+                               self.y(line[i + 1]).toFixed(3));
+                }
+                return parts.join('');
+            }).join('');
+            element('path', group.f ? {d: d, fill: group.c} : {
+                d: d, fill: 'none', stroke: group.c, 'stroke-width': group.w,
+                'stroke-dasharray': group.d ? 4 * group.w + ' ' + 4 * group.w : 'none'
+            }, self.drawing);
+        });
+        var anchors = {0: 'start', 0.5: 'middle', 1: 'end'};
+        var baselines = {0: 'hanging', 0.5: 'central', 1: 'text-after-edge'};
+        // attributes left out of a text group have these values
+        var defaults = {a: 0, h: 0, v: null, s: 10, c: '#000000'};
+        this.data.texts.forEach(function (group) {
+            var t = {};
+            Object.keys(defaults).forEach(function (key) {
+                t[key] = key in group ? group[key] : defaults[key];
+            });
+            group.l.forEach(function (item) {
+                var x = item[0], y = self.y(item[1]);
+                var node = element('text', {
+                    x: x, y: y, fill: t.c, 'font-size': t.s * PT,
+                    'font-family': 'serif',
+                    'text-anchor': anchors[t.h] || 'start',
+                    'dominant-baseline': t.v === null ? 'alphabetic' : baselines[t.v] || 'alphabetic',
+                    transform: t.a ? 'rotate(' + (-t.a) + ' ' + x + ' ' + y + ')' : ''
+                }, self.drawing);
+                item[2].split('\n').forEach(function (line, i) {
+                    var span = element('tspan', {x: x, dy: i ? '1.2em' : 0}, node);
+                    span.textContent = line;
+                });
+            });
+        });
+    };
+
+    // chart coordinates of a mouse event, snapped onto a close scale
+    View.prototype.point = function (event) {
+        var m = this.svg.getScreenCTM().inverse();
+        var x = m.a * event.clientX + m.c * event.clientY + m.e;
+        var y = this.top - (m.b * event.clientX + m.d * event.clientY + m.f);
+        var best = null;
+        this.data.scales.forEach(function (scale) {
+            var near = nearest(scale, x, y);
+            if (near && near.d < SNAP && (best === null || near.d < best.d)) {
+                best = near;
+            }
+        });
+        return best ? {x: best.x, y: best.y, u: best.u} : {x: x, y: y, u: null};
+    };
+
+    View.prototype.mark = function (parent, x, y, label) {
+        var size = 0.1;
+        element('circle', {cx: x, cy: this.y(y), r: size, fill: 'white',
+                           stroke: EDGE_COLOR, 'stroke-width': 0.03}, parent);
+        if (label !== null) {
+            var text = element('text', {x: x + 2 * size, y: this.y(y) - 2 * size,
+                                        fill: EDGE_COLOR, 'font-size': 0.35,
+                                        'font-family': 'sans-serif', 'font-weight': 'bold',
+                                        stroke: 'white', 'stroke-width': 0.08,
+                                        'paint-order': 'stroke'}, parent);
+            text.textContent = label;
+        }
+    };
+
+    View.prototype.edge = function (parent, a, b) {
+        var self = this, box = this.data.bbox;
+        var dx = b.x - a.x, dy = b.y - a.y, len = Math.hypot(dx, dy);
+        if (len === 0) {
+            return;
+        }
+        var reach = Math.hypot(box[2] - box[0], box[3] - box[1]) / len;
+        element('line', {x1: a.x - reach * dx, y1: this.y(a.y - reach * dy),
+                         x2: b.x + reach * dx, y2: this.y(b.y + reach * dy),
+                         stroke: EDGE_COLOR, 'stroke-width': 0.025}, parent);
+        this.data.scales.forEach(function (scale) {
+            crossings(scale, a, b).forEach(function (c) {
+                self.mark(parent, c.x, c.y, format(c.u));
+            });
+        });
+    };
+
+    View.prototype.click = function (event) {
+        var p = this.point(event);
+        if (this.start === null) {
+            this.start = p;
+        } else {
+            this.edge(element('g', {}, this.edges), this.start, p);
+            this.start = null;
+        }
+        this.move(event);
+    };
+
+    View.prototype.move = function (event) {
+        var p = this.point(event);
+        this.preview.textContent = '';
+        if (this.start !== null) {
+            this.edge(this.preview, this.start, p);
+        } else if (p.u !== null) {
+            this.mark(this.preview, p.x, p.y, format(p.u));
+        }
+    };
+
+    View.prototype.clear = function () {
+        this.edges.textContent = '';
+        this.start = null;
+    };
+
+    window.nomoview = {
+        View: View,
+        load: function (parent, url) {
+            return fetch(url).then(function (response) {
+                if (!response.ok) {
+                    throw new Error(url + ': ' + response.status);
+                }
+                return response.json();
+            }).then(function (data) {
+                return new View(parent, data);
+            });
+        }
+    };
+}());